@@ -1,22 +1,59 @@
-from modules.cache.espaCy_cache import get_cache
-from modules.utils.spaCy_utils import string_tokenizer, string_sintactical_analysis, get_nlp_punctuation_marks
+import functools
+import itertools
 
+from spacy.language import Language
+from spacy.tokens import Token
 
-def espacy(word, word_pos, phrase):
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME, get_cache_index, get_pattern_contexts, resolve_word_contexts
+from modules.utils.spaCy_models import get_default_model, get_default_profile, get_nlp
+from modules.utils.spaCy_utils import get_token_index_at_offset, string_analysis, string_analysis_pipe, \
+    string_sintactical_analysis, words_analysis, words_analysis_pipe
+from modules.utils.vanilla_utils import LRUCache, TTLCache, get_nlp_punctuation_marks, get_phrase_window
+
+if not Token.has_extension('espacy_pos'):
+    Token.set_extension('espacy_pos', default=None)
+
+DEFAULT_MEMO_SIZE = 100000
+
+# Builds the memo of the espacy results of a cache, None while the memoization is disabled
+_espacy_memo_factory = None
+# cache_name -> (cache_index, generation, model_name, memo)
+_espacy_memos = {}
+
+
+def espacy(word, word_pos, phrase, cache_name=DEFAULT_CACHE_NAME, window=None, window_unit='tokens',
+           tokenized_phrase=None, analyzed_phrase=None):
     """
     This function takes in a word, its part of speech, and the phrase it is in.
     It then checks to see if the word is in the cache, and if it is, it returns
     the part of speech that the word should be. If the word is not in the cache,
     it returns the original part of speech.
+    The phrase is only analyzed when its context can change the result (see get_context_free_pos).
+    With a window, only the part of the phrase around the word is analyzed (see get_phrase_window), so long
+    phrases cost the same as short ones. If the tokens and pos tags of the phrase are already known, they can be
+    given instead, and the phrase is not analyzed at all. If only its tokens are known, the pipeline runs directly
+    on them (see words_analysis), without tokenizing the phrase again. A window only applies to the phrase
+    string, so it can not be combined with precomputed tokens or pos tags.
+    If the memoization is enabled (see enable_espacy_memoization), repeated triples whose result depends on
+    their context are answered from the memo.
 
     Parameters:
         word (str): The word to be checked
         word_pos (str): The part of speech of the word
         phrase (str): The phrase the word is in
+        cache_name (str): The name of the cache to be used
+        window (int): The number of tokens or characters analyzed at each side of the word, None for the whole phrase
+        window_unit (str): 'tokens' or 'chars'
+        tokenized_phrase (list): The precomputed tokens of the phrase, None to tokenize the phrase
+        analyzed_phrase (list): The precomputed pos tags of the tokens of the phrase, None to analyze the tokens
 
     Returns:
         corrected_pos (str): The corrected part of speech
 
+    Raises:
+        ValueError: If a window is given together with tokenized_phrase or analyzed_phrase,
+            or if analyzed_phrase is given without tokenized_phrase.
+
     Example:
         >>> espacy('el', 'DET', 'el perro')
 
@@ -26,21 +63,406 @@ def espacy(word, word_pos, phrase):
         >>> espacy('perro', 'NOUN', 'el perro')
 
         'NOUN'
-    """
-    cache = get_cache()
 
-    corrected_pos = word_pos
 
-    if word in cache.keys():
-        corrected_pos = get_corrected_pos(word, word_pos, phrase, cache)
+        >>> espacy('casa', 'NOUN', long_paragraph, window=5)
+
+        'ADJ'
+
+
+        >>> espacy('casa', 'NOUN', 'la casa vieja', tokenized_phrase=['la', 'casa', 'vieja'], analyzed_phrase=['DET', 'NOUN', 'ADJ'])
+
+        'ADJ'
+
+
+        >>> espacy('casa', 'NOUN', 'la casa vieja', tokenized_phrase=['la', 'casa', 'vieja'])
+
+        'ADJ'
+    """
+    if window is not None and (tokenized_phrase is not None or analyzed_phrase is not None):
+        raise ValueError('A window can not be applied to a precomputed tokenized_phrase or analyzed_phrase')
+    if analyzed_phrase is not None and tokenized_phrase is None:
+        raise ValueError('An analyzed_phrase needs the tokenized_phrase it was computed from')
+
+    cache_index = get_cache_index(cache_name)
+
+    corrected_pos = get_context_free_pos(word, word_pos, cache_index)
+    if corrected_pos is not None:
+        return corrected_pos
+
+    precomputed = tokenized_phrase is not None
+    # Only the results that depend on the context are memoized. The precomputed tokens and tags may differ from
+    # the ones of the analysis, so those results are not memoized either
+    memo = get_espacy_memo(cache_name, cache_index) if not precomputed else None
+    memo_key = (word, word_pos, phrase) if window is None else (word, word_pos, phrase, window, window_unit)
+
+    if memo is not None:
+        corrected_pos = memo.get(memo_key)
+        if corrected_pos is not None:
+            return corrected_pos
+
+    if precomputed:
+        if analyzed_phrase is None:
+            tokenized_phrase, analyzed_phrase = words_analysis(tokenized_phrase)
+        corrected_pos = get_corrected_pos_from_analysis(word, word_pos, tokenized_phrase, analyzed_phrase, cache_index)
+    else:
+        corrected_pos = get_corrected_pos(word, word_pos, phrase, cache_index, window, window_unit)
 
     if not isinstance(corrected_pos, str) or corrected_pos == '':
         corrected_pos = word_pos
 
+    if memo is not None:
+        memo.put(memo_key, corrected_pos)
+
     return corrected_pos
 
 
-def get_corrected_pos(word, word_pos, phrase, cache):
+def espacy_batch(items, batch_size=64, n_process=1, cache_name=DEFAULT_CACHE_NAME, window=None, window_unit='tokens'):
+    """
+    This function corrects the part of speech of many words at once.
+    Items whose result depends on their context (and is not memoized) are grouped by phrase,
+    so each unique phrase (or window of a phrase) is analyzed only once,
+    and the phrases are streamed through spaCy's nlp.pipe.
+    The phrase of an item can also be given as a list of words, which is analyzed without tokenizing it again,
+    but then no window can be used, as in espacy.
+    The result of each item is the same one espacy returns for it.
+
+    Parameters:
+        items (iterable): (word, word_pos, phrase) triples, the phrase being a string or a list of words
+        batch_size (int): The number of phrases processed together by the pipeline
+        n_process (int): The number of processes used by the pipeline
+        cache_name (str): The name of the cache to be used
+        window (int): The number of tokens or characters analyzed at each side of each word, None for the whole phrase
+        window_unit (str): 'tokens' or 'chars'
+
+    Returns:
+        corrected_pos_list (list): The corrected part of speech of each item, in the same order as the input
+
+    Raises:
+        ValueError: If a window is given and the phrase of an item is a list of words.
+
+    Example:
+        >>> espacy_batch([('el', 'DET', 'el perro'), ('perro', 'NOUN', 'el perro')])
+
+        ['DET', 'NOUN']
+    """
+    cache_index = get_cache_index(cache_name)
+    memo = get_espacy_memo(cache_name, cache_index)
+
+    # The words of the tokenized phrases are kept as tuples, so they can be grouped like the string phrases
+    items = [(word, word_pos, phrase if isinstance(phrase, str) else tuple(phrase)) for word, word_pos, phrase in items]
+    if window is not None and not all(isinstance(phrase, str) for _, _, phrase in items):
+        raise ValueError('A window can not be applied to a phrase given as a list of words')
+    corrected_pos_list = [word_pos for _, word_pos, _ in items]
+    memo_keys = [item if window is None else item + (window, window_unit) for item in items]
+
+    # Indexes of the items to be corrected, grouped by the phrase (or window of the phrase) to be analyzed
+    phrase_items = {}
+    for index, (word, word_pos, phrase) in enumerate(items):
+        if get_context_free_pos(word, word_pos, cache_index) is None:
+            corrected_pos = memo.get(memo_keys[index]) if memo is not None else None
+            if corrected_pos is not None:
+                corrected_pos_list[index] = corrected_pos
+            else:
+                if window is not None:
+                    phrase = get_phrase_window(phrase, word, window, window_unit)
+                phrase_items.setdefault(phrase, []).append(index)
+
+    phrases = [phrase for phrase in phrase_items if isinstance(phrase, str)]
+    tokenized_phrases = [phrase for phrase in phrase_items if not isinstance(phrase, str)]
+    analyzed_phrases = itertools.chain(
+        string_analysis_pipe(phrases, ''.join(get_nlp_punctuation_marks()), batch_size, n_process),
+        words_analysis_pipe(tokenized_phrases, batch_size, n_process))
+
+    for phrase, (tokenized_phrase, analyzed_phrase) in zip(phrases + tokenized_phrases, analyzed_phrases):
+        for index in phrase_items[phrase]:
+            word, word_pos, _ = items[index]
+            corrected_pos = get_corrected_pos_from_analysis(word, word_pos, tokenized_phrase, analyzed_phrase, cache_index)
+
+            if isinstance(corrected_pos, str) and corrected_pos != '':
+                corrected_pos_list[index] = corrected_pos
+
+            if memo is not None:
+                memo.put(memo_keys[index], corrected_pos_list[index])
+
+    return corrected_pos_list
+
+
+def espacy_at(phrase, targets, word_pos_list=None, target_unit='char', cache_name=DEFAULT_CACHE_NAME):
+    """
+    This function corrects the part of speech of words given by their position in a phrase,
+    instead of by their text, so a word that appears more than once is corrected with the context of the right
+    occurrence. The phrase is analyzed once, and each target is resolved in O(1) through the character offset to
+    token index map of the doc.
+    As in correct_doc, each target word is looked up in the cache by its lowercased text.
+
+    Parameters:
+        phrase (str or Doc): The phrase, or an already analyzed spaCy Doc
+        targets (list): The character offsets (any character of the word) or the token indexes of the words
+        word_pos_list (list): The part of speech of each target word, None to use the ones of the analysis
+        target_unit (str): 'char' if the targets are character offsets, 'token' if they are token indexes
+        cache_name (str): The name of the cache to be used
+
+    Returns:
+        corrected_pos_list (list): The corrected part of speech of each target word, in the same order as the targets
+
+    Example:
+        >>> espacy_at('la casa y la casa vieja', [3, 13])
+
+        ['NOUN', 'ADJ']
+
+        >>> espacy_at('la casa y la casa vieja', [1, 4], target_unit='token')
+
+        ['NOUN', 'ADJ']
+    """
+    cache_index = get_cache_index(cache_name)
+
+    doc = phrase
+    if isinstance(doc, str):
+        doc = get_nlp()(doc)
+
+    if target_unit == 'char':
+        token_indexes = [get_token_index_at_offset(doc, char_offset) for char_offset in targets]
+    elif target_unit == 'token':
+        token_indexes = list(targets)
+    else:
+        raise ValueError('Unknown target unit: ' + str(target_unit))
+
+    if word_pos_list is None:
+        word_pos_list = [doc[token_index].pos_ for token_index in token_indexes]
+
+    corrected_pos_list = []
+
+    for token_index, word_pos in zip(token_indexes, word_pos_list):
+        token = doc[token_index]
+        word = token.text.lower()
+        corrected_pos = get_context_free_pos(word, word_pos, cache_index)
+
+        if corrected_pos is None:
+            previous_word_pos = doc[token_index - 1].pos_ if token_index > 0 else ''
+            next_word_pos = doc[token_index + 1].pos_ if token_index < len(doc) - 1 else ''
+            corrected_pos = get_corrected_pos_from_context(word, word_pos, previous_word_pos, next_word_pos, cache_index)
+
+        if not isinstance(corrected_pos, str) or corrected_pos == '':
+            corrected_pos = word_pos
+
+        corrected_pos_list.append(corrected_pos)
+
+    return corrected_pos_list
+
+
+def enable_espacy_memoization(max_size=DEFAULT_MEMO_SIZE, policy='lru', ttl=None, max_memory=None):
+    """
+    This function enables the memoization of the results of espacy and espacy_batch.
+    Each cache has its own memo, keyed by the (word, word_pos, phrase) triple. The memo is dropped automatically
+    when the cache files (or the shared cache generation, or the default model) change, so it never returns
+    a result of an older version of the cache.
+
+    Parameters:
+        max_size (int): The maximum number of memoized triples of each cache, None for no limit.
+        policy (str or function): The eviction policy. 'lru' evicts the least recently used triples,
+            'ttl' also expires the triples ttl seconds after they were memoized.
+            A function returning a new memo object (with get, put, clear and stats methods) can be given instead.
+        ttl (float): The seconds a triple is kept with the 'ttl' policy.
+        max_memory (int): The maximum estimated size of the memo of each cache in bytes, None for no limit.
+
+    Example:
+        >>> enable_espacy_memoization(max_size=50000)
+
+        >>> enable_espacy_memoization(policy='ttl', ttl=3600)
+
+        >>> enable_espacy_memoization(policy=lambda: LRUCache(max_size=1000))
+    """
+    global _espacy_memo_factory
+
+    if callable(policy):
+        memo_factory = policy
+    elif policy == 'lru':
+        memo_factory = functools.partial(LRUCache, max_size, max_memory)
+    elif policy == 'ttl':
+        if ttl is None:
+            raise ValueError("The 'ttl' memoization policy needs a ttl")
+        memo_factory = functools.partial(TTLCache, ttl, max_size, max_memory)
+    else:
+        raise ValueError('Unknown memoization policy: ' + str(policy))
+
+    _espacy_memo_factory = memo_factory
+    _espacy_memos.clear()
+
+
+def disable_espacy_memoization():
+    """
+    This function disables the memoization of the results of espacy and drops every memo.
+
+    Example:
+        >>> disable_espacy_memoization()
+    """
+    global _espacy_memo_factory
+
+    _espacy_memo_factory = None
+    _espacy_memos.clear()
+
+
+def get_espacy_memo(cache_name, cache_index):
+    """
+    This function returns the memo of the espacy results of a cache, or None if the memoization is disabled.
+    A new, empty memo replaces the current one if the cache index, the shared cache generation or the default
+    model (or profile) changed since it was created.
+
+    Example:
+        >>> get_espacy_memo('default', get_cache_index())
+
+        <modules.utils.vanilla_utils.LRUCache object at 0x7f0b1c2d3e50>
+    """
+    memo_factory = _espacy_memo_factory
+    if memo_factory is None:
+        return None
+
+    generation = getattr(cache_index, 'generation', None)
+    model_name = get_default_model(), get_default_profile()
+
+    loaded_cache_index, loaded_generation, loaded_model_name, memo = _espacy_memos.get(cache_name, (None, None, None, None))
+
+    if memo is None or loaded_cache_index is not cache_index or loaded_generation != generation \
+            or loaded_model_name != model_name:
+        memo = memo_factory()
+        _espacy_memos[cache_name] = cache_index, generation, model_name, memo
+
+    return memo
+
+
+def get_espacy_memoization_stats(cache_name=DEFAULT_CACHE_NAME):
+    """
+    This function returns the hits, misses, hit rate, evictions and size of the memo of a cache,
+    or None if the cache has no memo.
+
+    Example:
+        >>> get_espacy_memoization_stats()
+
+        {'hits': 9500, 'misses': 500, 'hit_rate': 0.95, 'evictions': 0, 'size': 500, 'memory': 0}
+    """
+    memo = _espacy_memos.get(cache_name, (None, None, None, None))[3]
+
+    return memo.stats() if memo is not None else None
+
+
+def correct_doc(text_or_doc, cache_name=DEFAULT_CACHE_NAME):
+    """
+    This function corrects the part of speech of every word of a whole document with a single parse.
+    Every token whose lowercased text is in the cache is looked up using the pos of its neighbour tokens,
+    any other token keeps the part of speech given by spaCy.
+
+    Parameters:
+        text_or_doc (str or Doc): The raw text to be parsed or an already parsed spaCy Doc
+        cache_name (str): The name of the cache to be used
+
+    Returns:
+        corrected_pos_list (list): The corrected part of speech of each token of the document
+
+    Example:
+        >>> correct_doc('Esta es la casa vieja')
+
+        ['PRON', 'AUX', 'DET', 'ADJ', 'ADJ']
+    """
+    cache_index = get_cache_index(cache_name)
+
+    doc = text_or_doc
+    if isinstance(doc, str):
+        doc = get_nlp()(doc)
+
+    corrected_pos_list = []
+
+    for token in doc:
+        word = token.text.lower()
+        corrected_pos = token.pos_
+
+        if word in cache_index:
+            previous_word_pos = doc[token.i - 1].pos_ if token.i > 0 else ''
+            next_word_pos = doc[token.i + 1].pos_ if token.i < len(doc) - 1 else ''
+            corrected_pos = get_corrected_pos_from_context(word, token.pos_, previous_word_pos, next_word_pos, cache_index)
+
+            if not isinstance(corrected_pos, str) or corrected_pos == '':
+                corrected_pos = token.pos_
+
+        corrected_pos_list.append(corrected_pos)
+
+    return corrected_pos_list
+
+
+@Language.factory('espacy_corrector', default_config={'cache_name': DEFAULT_CACHE_NAME})
+def create_espacy_corrector(nlp, name, cache_name):
+    """
+    This function creates the 'espacy_corrector' pipeline component.
+    The component must be added after the component that assigns the pos tags (tagger or morphologizer).
+    It writes the corrected part of speech of every token to the Token._.espacy_pos extension,
+    so texts streamed through nlp.pipe are corrected in the same pass that tags them.
+    The cache used by the component can be chosen with its 'cache_name' setting.
+
+    Example:
+        >>> nlp = spacy.load('es_core_news_md')
+        >>> nlp.add_pipe('espacy_corrector')
+        >>> [token._.espacy_pos for token in nlp('Esta es la casa vieja')]
+
+        ['PRON', 'AUX', 'DET', 'ADJ', 'ADJ']
+
+        >>> nlp.add_pipe('espacy_corrector', config={'cache_name': 'medicine'})
+    """
+    return functools.partial(espacy_corrector, cache_name=cache_name)
+
+
+def espacy_corrector(doc, cache_name=DEFAULT_CACHE_NAME):
+    """
+    This function is the 'espacy_corrector' pipeline component.
+    It stores the result of correct_doc for each token in Token._.espacy_pos and returns the same doc.
+
+    Example:
+        >>> doc = espacy_corrector(nlp('la casa vieja'))
+        >>> [token._.espacy_pos for token in doc]
+
+        ['DET', 'ADJ', 'ADJ']
+    """
+    for token, corrected_pos in zip(doc, correct_doc(doc, cache_name)):
+        token._.espacy_pos = corrected_pos
+
+    return doc
+
+
+def get_context_free_pos(word, word_pos, cache_index):
+    """
+    This function answers from the decision summary of a word (see compile_cache_index) when the context
+    of the word can not change its corrected pos, so the phrase does not have to be analyzed.
+    That happens when the word is not in the cache, when no pattern of the word has word_pos,
+    or when every pattern of the word with word_pos corrects it to word_pos itself.
+
+    Parameters:
+        word (str): The word to be corrected.
+        word_pos (str): The pos of the word to be corrected.
+        cache_index (dict): The flat cache index returned by get_cache_index.
+
+    Returns:
+        word_pos (str): The corrected pos of the word, or None if it depends on the context of the word.
+
+    Example:
+        >>> get_context_free_pos('perro', 'NOUN', cache_index)
+
+        'NOUN'
+
+        >>> get_context_free_pos('casa', 'NOUN', cache_index)
+
+        None
+    """
+    word_summary = cache_index.get(word)
+    if word_summary is None:
+        return word_pos
+
+    corrected_pos_set = word_summary.get(word_pos)
+    if corrected_pos_set is None or corrected_pos_set <= {word_pos}:
+        return word_pos
+
+    return None
+
+
+def get_corrected_pos(word, word_pos, phrase, cache_index, window=None, window_unit='tokens'):
     """
     This function is a part of the cache system. It is used to get the corrected pos of a word
     from the cache.
@@ -49,33 +471,85 @@ def get_corrected_pos(word, word_pos, phrase, cache):
         word (str): The word to be corrected.
         word_pos (str): The pos of the word to be corrected.
         phrase (str): The phrase where the word is.
-        cache (dict): The cache dictionary.
+        cache_index (dict): The flat cache index returned by get_cache_index.
+        window (int): The number of tokens or characters analyzed at each side of the word, None for the whole phrase.
+        window_unit (str): 'tokens' or 'chars'.
 
     Returns:
         word_pos (str): The corrected pos of the word.
 
     Example:
-        >>> get_corrected_pos('casa', 'NOUN', 'Esta es la casa de Maria', cache)
+        >>> get_corrected_pos('casa', 'NOUN', 'Esta es la casa de Maria', cache_index)
+
+        'NOUN'
+
+        >>> get_corrected_pos('casa', 'NOUN', 'Esta es la casa de Maria', cache_index, window=1)
 
         'NOUN'
     """
+    if window is not None:
+        phrase = get_phrase_window(phrase, word, window, window_unit)
 
-    tokenized_phrase = string_tokenizer(phrase, ''.join(get_nlp_punctuation_marks()), False)
-    analyzed_phrase = string_sintactical_analysis(phrase, ''.join(get_nlp_punctuation_marks()), False)
+    tokenized_phrase, analyzed_phrase = string_analysis(phrase, ''.join(get_nlp_punctuation_marks()), False)
+
+    return get_corrected_pos_from_analysis(word, word_pos, tokenized_phrase, analyzed_phrase, cache_index)
+
+
+def get_corrected_pos_from_analysis(word, word_pos, tokenized_phrase, analyzed_phrase, cache_index):
+    """
+    This function gets the corrected pos of a word from the cache, given the tokens and the pos tags
+    of the phrase where the word is.
+
+    Parameters:
+        word (str): The word to be corrected.
+        word_pos (str): The pos of the word to be corrected.
+        tokenized_phrase (list): The tokens of the phrase where the word is.
+        analyzed_phrase (list): The pos tags of the phrase where the word is.
+        cache_index (dict): The flat cache index returned by get_cache_index.
+
+    Returns:
+        word_pos (str): The corrected pos of the word.
+
+    Example:
+        >>> get_corrected_pos_from_analysis('casa', 'NOUN', ['la', 'casa', 'vieja'], ['DET', 'NOUN', 'ADJ'], cache_index)
+
+        'ADJ'
+    """
     next_word_pos, previous_word_pos = get_surrounding_words_pos(word, tokenized_phrase, analyzed_phrase)
-    spacy_tag_pattern = pack_words(previous_word_pos, word_pos, next_word_pos)
 
-    if (spacy_tag_pattern in cache[word].keys()) or (spacy_tag_pattern.replace(' ', '\t') in cache[word].keys()) or (spacy_tag_pattern.replace(' ', '') in cache[word].keys()):
-        word_pos = get_corrected_pos_from_cache(cache, spacy_tag_pattern, word)
+    return get_corrected_pos_from_context(word, word_pos, previous_word_pos, next_word_pos, cache_index)
 
-    return word_pos
+
+def get_corrected_pos_from_context(word, word_pos, previous_word_pos, next_word_pos, cache_index):
+    """
+    This function gets the corrected pos of a word from the cache, given the pos of the words
+    before and after it.
+
+    Parameters:
+        word (str): The word to be corrected.
+        word_pos (str): The pos of the word to be corrected.
+        previous_word_pos (str): The pos of the previous word, '' if there is no previous word.
+        next_word_pos (str): The pos of the next word, '' if there is no next word.
+        cache_index (dict): The flat cache index returned by get_cache_index.
+
+    Returns:
+        word_pos (str): The corrected pos of the word.
+
+    Example:
+        >>> get_corrected_pos_from_context('casa', 'NOUN', 'DET', 'ADJ', cache_index)
+
+        'ADJ'
+    """
+    return cache_index.get((word, previous_word_pos, word_pos, next_word_pos), word_pos)
 
 
 def get_corrected_pos_from_cache(cache, spacy_tag_pattern, word):
     """
     This function takes a cache and a spacy tag pattern as inputs.
-    It returns the first key in the cache[word][spacy_tag_pattern] that is a valid key.
-    If no such key exists, it returns None.
+    It returns the corrected pos of the word for the pattern, resolved like the compiled cache index does
+    (see resolve_word_contexts): among every pattern of the word that matches the same context, the corrected pos
+    with the highest support wins, and ties are resolved by the order of the file.
+    If no pattern of the word matches the spacy tag pattern, it returns None.
 
     Example:
         >>> cache = {'the': {'DET': {'DT': True, 'PDT': True, 'WDT': True}, 'PRP$': {'PRP$': True}, 'WP': {'WP': True}}}
@@ -83,11 +557,18 @@ def get_corrected_pos_from_cache(cache, spacy_tag_pattern, word):
         >>> get_corrected_pos_from_cache(cache, spacy_tag_pattern, 'the')
 
         'DT'
+
+        >>> get_corrected_pos_from_cache({'casa': {'DET NOUN ADJ': {'NOUN': ['la casa'], 'ADJ': ['de Casa Vieja', 'una casa vieja']}}}, 'DET NOUN ADJ', 'casa')
+
+        'ADJ'
     """
-    spacy_tag_pattern_keys = cache[word][spacy_tag_pattern.replace(' ', '')]
-    iterator = iter(spacy_tag_pattern_keys)
+    word_contexts = resolve_word_contexts(cache[word])
 
-    return iterator.__next__()
+    for context in get_pattern_contexts(spacy_tag_pattern):
+        if context in word_contexts:
+            return word_contexts[context]
+
+    return None
 
 
 def analize_syntactically(text_to_analyze):
@@ -174,4 +655,6 @@ def get_surrounding_words_pos(word, tokenized_phrase, analyzed_phrase):
 
 
 if __name__ == '__main__':
-    print(espacy('femenino', 'Descripción esquemática del ciclo sexual femenino', 'NOUN'))
+    from modules.cli.espaCy_corpus import main
+
+    main()
@@ -1,25 +1,707 @@
+import argparse
+import contextlib
+import io
+import json
 import os
+import threading
+from types import MappingProxyType
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-def get_cache():
+from modules.utils.vanilla_utils import get_spacy_pos_tags, write_file_atomically
+
+
+COMPILED_CACHE_FORMAT = 'espaCy-cache'
+COMPILED_CACHE_VERSION = 5
+COMPILED_CACHE_EXTENSION = '.json'
+CACHE_JOURNAL_EXTENSION = '.journal'
+CACHE_LOCK_EXTENSION = '.lock'
+
+DEFAULT_CACHE_NAME = 'default'
+CACHE_FILE_NAME = 'caché'
+CACHE_FILE_EXTENSION = '.txt'
+# word, spacy_tag_pattern and corrected_rae_pos, the columns of the table that group the phrase contexts
+TABLE_GROUPING_COLUMNS = 3
+
+_cache_configs = {}
+_cache_snapshots = {}
+_cache_snapshot_lock = threading.Lock()
+_cache_stats = {}
+_cache_write_locks = {}
+_shared_cache_indexes = {}
+
+
+def get_cache(cache_name=DEFAULT_CACHE_NAME):
     """
-        This function checks if the file is empty, if it is, it creates inside the pattern of the 'caché.txt' file.
-        If the file is not empty, it reads the file and returns the content of the file.
-        :return: The content of the file.
+        This function returns an in-memory snapshot of the content of the 'caché.txt' file.
+        The file is only parsed the first time the cache is requested and whenever its mtime or size changes,
+        any other call is served from memory.
+        If the file is empty, it creates inside the pattern of the 'caché.txt' file.
+        If the snapshot was loaded from the compiled cache file, the nested cache is only read from that file
+        the first time it is requested.
+        :param cache_name: The name of the cache, see configure_cache.
+        :return: The content of the file as a read-only nested dict.
 
     Example:
         >>> get_cache()
-        ['1,2,3,4,5,6,7,8,9,10', '1,2,3,4,5,6,7,8,9,10', '1,2,3,4,5,6,7,8,9,10', '1,2,3,4,5,6,7,8,9,10']
+        mappingproxy({'casa': mappingproxy({'DET NOUN ADJ': mappingproxy({'ADJ': ('de Casa Vieja',)})})})
+    """
+    while True:
+        cache, cache_index = get_cache_snapshot(cache_name)
+        if cache is None:
+            cache = load_snapshot_cache(cache_name, cache_index)
+        if cache is not None:
+            return cache
+
+
+def load_snapshot_cache(cache_name, cache_index):
+    """
+    Reads the nested cache of a snapshot loaded from the compiled cache file, and stores it in the snapshot.
+    Returns None if the cache files changed since the snapshot was loaded, so the snapshot has to be reloaded.
+
+    Raises:
+        ValueError: If the nested cache of the compiled cache file can not be read.
+
+    Example:
+        >>> load_snapshot_cache('default', get_cache_index())
+        mappingproxy({'casa': mappingproxy({'DET NOUN ADJ': mappingproxy({'ADJ': ('de Casa Vieja',)})})})
+    """
+    with _cache_snapshot_lock:
+        signature, snapshot = _cache_snapshots.get(cache_name, (None, None))
+        if snapshot is None or snapshot[1] is not cache_index:
+            return None
+        if snapshot[0] is not None:
+            return snapshot[0]
+
+        try:
+            cache = read_compiled_nested_cache(cache_name)
+        except OSError:
+            cache = None
+
+        if cache is None or get_cache_file_signature(cache_name) != signature:
+            _cache_snapshots.pop(cache_name, None)
+            return None
+
+        cache = freeze_cache(cache)
+        _cache_snapshots[cache_name] = signature, (cache, cache_index)
+
+        return cache
+
+
+def get_cache_index(cache_name=DEFAULT_CACHE_NAME):
+    """
+        This function returns the flat lookup index compiled from the current cache snapshot.
+        See compile_cache_index for its structure.
+        If the process is attached to a shared cache (see espaCy_shared_cache), the shared index is returned instead,
+        after attaching to its last published generation.
+
+    Example:
+        >>> get_cache_index()
+        {'casa': {'NOUN': frozenset({'ADJ'})}, ('casa', 'DET', 'NOUN', 'ADJ'): 'ADJ'}
+    """
+    shared_cache_index = _shared_cache_indexes.get(cache_name)
+    if shared_cache_index is not None:
+        shared_cache_index.refresh()
+        return shared_cache_index
+
+    return get_cache_snapshot(cache_name)[1]
+
+
+def set_shared_cache_index(cache_name, cache_index):
+    """
+    Makes get_cache_index return a shared cache index for a cache, or the index of its files again if cache_index is None.
+
+    Example:
+        >>> set_shared_cache_index('default', SharedCacheIndex('espacy_cache'))
     """
-    if file_is_empty():
-        return initialize_table([], False)
+    if cache_index is None:
+        _shared_cache_indexes.pop(cache_name, None)
     else:
-        return read_table()
+        _shared_cache_indexes[cache_name] = cache_index
+
+
+def get_cache_snapshot(cache_name=DEFAULT_CACHE_NAME):
+    """
+        This function returns the (cache, cache_index) pair loaded from the 'caché.txt' file (or its compiled version)
+        and the patterns added to its journal.
+        Both are built together when the files are parsed, so they always belong to the same version of the files.
+        When the index is loaded from the compiled cache file, the nested cache is None until get_cache reads it.
+
+    Example:
+        >>> get_cache_snapshot()
+        (mappingproxy({'casa': ...}), {'casa': {'NOUN': frozenset({'ADJ'})}, ('casa', 'DET', 'NOUN', 'ADJ'): 'ADJ'})
+    """
+    signature = get_cache_file_signature(cache_name)
+    stats = get_cache_counters(cache_name)
+    loaded_signature, snapshot = _cache_snapshots.get(cache_name, (None, None))
+
+    if snapshot is not None and signature == loaded_signature:
+        stats['hits'] += 1
+        return snapshot
+
+    with _cache_snapshot_lock:
+        # Another thread may have reloaded the snapshot while we were waiting for the lock
+        signature = get_cache_file_signature(cache_name)
+        loaded_signature, snapshot = _cache_snapshots.get(cache_name, (None, None))
+        if snapshot is not None and signature == loaded_signature:
+            stats['hits'] += 1
+            return snapshot
+
+        stats['misses'] += 1
+        if snapshot is not None:
+            stats['reloads'] += 1
+
+        cache, cache_index = None, read_compiled_cache_if_current(cache_name)
+        # Patterns added with add_patterns since the last compaction
+        journal_entries = read_journal(cache_name)
+
+        if cache_index is not None and journal_entries:
+            # The journal is merged into the nested cache, so it is read from the compiled file right away
+            try:
+                cache, _, _ = read_compiled_cache(cache_name)
+            except (OSError, ValueError):
+                cache_index = None
+
+        if cache_index is None:
+            initialize_cache_file(cache_name)
+
+            # The signature is taken before reading, so a write racing with the read triggers a new reload
+            signature = get_cache_file_signature(cache_name)
+            cache = read_table(cache_name)
+
+        if journal_entries:
+            cache, cache_index = merge_cache(cache, journal_entries), None
+
+        if cache_index is None:
+            cache_index = compile_cache_index(cache)
+
+        snapshot = freeze_cache(cache) if cache is not None else None, cache_index
+        _cache_snapshots[cache_name] = signature, snapshot
+
+        return snapshot
+
+
+def compile_cache_index(cache):
+    """
+    Compiles a nested cache dict into a flat lookup index, so each lookup is a single hash probe.
+    The index holds two kinds of keys:
+        word: The decision summary of every word of the cache, a dict that maps each pos found in the patterns
+            of the word to the frozenset of corrected pos of those patterns. It tells whether the context of the
+            word can change the result: if word_pos is not in the summary, or its only corrected pos is word_pos,
+            the result is word_pos whatever the context is, so the phrase does not have to be analyzed.
+        (word, previous_word_pos, word_pos, next_word_pos): The corrected pos for that context.
+    The spacy tag patterns are normalized once here: they are split into their tags, whether they are stored
+    separated by spaces, by tabs or not separated at all, and a missing previous or next word is represented by ''.
+    A pattern of two tags matches, like the packed pattern built by pack_words, both when the word has no
+    previous word and when it has no next word.
+    If a context has more than one corrected pos (in one pattern or in several patterns that match it), the one
+    with the highest support (see get_correction_support) is used, and ties are resolved by the order of the file,
+    so the lookups never depend on anything but the content of the cache.
+
+    Example:
+        >>> compile_cache_index({'casa': {'DETNOUNADJ': {'NOUN': ['la casa vieja'], 'ADJ': ['de Casa Vieja', 'una casa vieja']}}})
+        {('casa', 'DET', 'NOUN', 'ADJ'): 'ADJ', 'casa': {'NOUN': frozenset({'ADJ'})}}
+    """
+    cache_index = {}
+
+    for word, word_dict in cache.items():
+        word_summary = {}
+        for context, corrected_pos in resolve_word_contexts(word_dict).items():
+            cache_index[(word,) + context] = corrected_pos
+            # An empty corrected pos falls back to word_pos, so it can not change the result
+            corrected_pos_set = word_summary.setdefault(context[1], set())
+            if corrected_pos:
+                corrected_pos_set.add(corrected_pos)
+
+        cache_index[word] = {word_pos: frozenset(corrected_pos_set) for word_pos, corrected_pos_set in word_summary.items()}
+
+    return cache_index
 
 
-def update_cache(cache, verbose):
+def resolve_word_contexts(word_dict):
     """
-    Writes the content of the cache dict passed as a parameter in the caché.txt file
+    Returns the corrected pos of every (previous_word_pos, word_pos, next_word_pos) context matched by the patterns
+    of a word: the one with the highest support (see get_correction_support) among every corrected pos of every
+    pattern that matches the context, the first one in file order if several have the same support.
+
+    Parameters:
+        word_dict (dict): The patterns of a word, cache[word].
+
+    Returns:
+        dict: (previous_word_pos, word_pos, next_word_pos) -> corrected pos.
+
+    Example:
+        >>> resolve_word_contexts({'DET NOUN ADJ': {'NOUN': ['la casa vieja']}, 'DETNOUNADJ': {'ADJ': ['de Casa Vieja', 'una casa vieja']}})
+        {('DET', 'NOUN', 'ADJ'): 'ADJ'}
+    """
+    # context -> (support, corrected pos)
+    word_contexts = {}
+
+    for spacy_tag_pattern, key_dict in word_dict.items():
+        if not key_dict:
+            continue
+        contexts = get_pattern_contexts(spacy_tag_pattern)
+        for corrected_pos, phrases in key_dict.items():
+            support = get_correction_support(phrases)
+            for context in contexts:
+                # Only a strictly higher support replaces a previous correction, so ties keep the file order
+                if context not in word_contexts or support > word_contexts[context][0]:
+                    word_contexts[context] = support, corrected_pos
+
+    return {context: corrected_pos for context, (_, corrected_pos) in word_contexts.items()}
+
+
+def get_correction_support(phrases):
+    """
+    Returns the support of a corrected pos: the number of distinct phrase contexts where it was seen
+    (the learning pipeline stores one phrase context for each distinct context of the training corpus).
+    A correction without a list of phrase contexts counts as seen once.
+
+    Example:
+        >>> get_correction_support(['de Casa Vieja', 'una casa vieja'])
+        2
+    """
+    if isinstance(phrases, (list, tuple, set, frozenset, dict)):
+        return len(set(phrases))
+
+    return 1
+
+
+def get_pattern_contexts(spacy_tag_pattern):
+    """
+    Returns every (previous_word_pos, word_pos, next_word_pos) context matched by a spacy tag pattern.
+
+    Example:
+        >>> get_pattern_contexts('DETNOUNADJ')
+        [('DET', 'NOUN', 'ADJ')]
+
+        >>> get_pattern_contexts('DET NOUN')
+        [('', 'DET', 'NOUN'), ('DET', 'NOUN', '')]
+    """
+    contexts = []
+
+    for tags in split_spacy_tag_pattern(spacy_tag_pattern):
+        if len(tags) == 3:
+            contexts.append(tags)
+        elif len(tags) == 2:
+            contexts.append(('', tags[0], tags[1]))
+            contexts.append((tags[0], tags[1], ''))
+        elif len(tags) == 1:
+            contexts.append(('', tags[0], ''))
+
+    return contexts
+
+
+def split_spacy_tag_pattern(spacy_tag_pattern):
+    """
+    Splits a spacy tag pattern into its tags.
+    Patterns separated by spaces or tabs are split by them, as the 'caché.txt' file stores them. Only the
+    patterns of legacy tables, written before the spaces were kept, are concatenated, so they are split into
+    every possible sequence of known spaCy pos tags. A pattern that can not be split is taken as a single tag.
+
+    Example:
+        >>> split_spacy_tag_pattern('DET NOUN\tADJ')
+        [('DET', 'NOUN', 'ADJ')]
+
+        >>> split_spacy_tag_pattern('DETNOUNADJ')
+        [('DET', 'NOUN', 'ADJ')]
+    """
+    tags = tuple(spacy_tag_pattern.split())
+    if len(tags) != 1:
+        return [tags]
+
+    splits = split_concatenated_tags(spacy_tag_pattern, get_spacy_pos_tags())
+
+    return splits or [tags]
+
+
+def split_concatenated_tags(text, known_tags):
+    """
+    Returns every way of splitting a text into at most three known tags.
+
+    Example:
+        >>> split_concatenated_tags('DETNOUN', ['DET', 'NOUN'])
+        [('DET', 'NOUN')]
+    """
+    if not text:
+        return [()]
+
+    splits = []
+    for tag in known_tags:
+        if text.startswith(tag):
+            for rest in split_concatenated_tags(text[len(tag):], known_tags):
+                if len(rest) < 3:
+                    splits.append((tag,) + rest)
+
+    return splits
+
+
+def get_cache_file_signature(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the signature of the cache files: the (mtime, size) pairs of the 'caché.txt' file, of its
+    compiled version and of its journal, None for a file that does not exist.
+    The snapshot returned by get_cache is reloaded whenever this signature changes.
+
+    Example:
+        >>> get_cache_file_signature()
+        ((1647345600000000000, 2048), None, None)
+    """
+    return get_file_signature(get_cache_file_path(cache_name)), get_file_signature(get_compiled_cache_file_path(cache_name)), \
+        get_file_signature(get_cache_journal_file_path(cache_name))
+
+
+def get_file_signature(path):
+    """
+    Returns the (mtime, size) pair of a file, or None if the file does not exist.
+
+    Example:
+        >>> get_file_signature('/home/user/espaCy/modules/cache/caché.txt')
+        (1647345600000000000, 2048)
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_compiled_cache_file_path(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the path of the compiled version of the 'caché.txt' file.
+
+    Example:
+        >>> get_compiled_cache_file_path()
+        '/home/user/espaCy/modules/cache/caché.json'
+    """
+    return os.path.splitext(get_cache_file_path(cache_name))[0] + COMPILED_CACHE_EXTENSION
+
+
+def get_cache_journal_file_path(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the path of the journal where add_patterns appends new patterns.
+
+    Example:
+        >>> get_cache_journal_file_path()
+        '/home/user/espaCy/modules/cache/caché.journal'
+    """
+    return os.path.splitext(get_cache_file_path(cache_name))[0] + CACHE_JOURNAL_EXTENSION
+
+
+def compile_cache_file(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Parses the 'caché.txt' file and writes its compiled version, which get_cache loads instead of
+    parsing the table while the table does not change.
+    The compiled file has two JSON lines: the entries of the flat index, which get_cache_index loads without
+    splitting or resolving any pattern, and the nested cache with its phrase contexts, which is only read
+    when get_cache or decompile_cache_file need it.
+    JSON is used instead of pickle because loading a file can not run code, even if the file is not trusted.
+
+    Example:
+        >>> compile_cache_file()
+        '/home/user/espaCy/modules/cache/caché.json'
+    """
+    check_cache_is_writable(cache_name)
+    initialize_cache_file(cache_name)
+
+    source_signature = get_file_signature(get_cache_file_path(cache_name))
+    cache = read_table(cache_name)
+    write_compiled_cache(cache, source_signature, cache_name)
+    invalidate_cache(cache_name)
+
+    return get_compiled_cache_file_path(cache_name)
+
+
+def decompile_cache_file(cache_name=DEFAULT_CACHE_NAME, force=False):
+    """
+    Writes the content of the compiled cache file back to the human-readable 'caché.txt' file,
+    and compiles it again so both files stay in sync.
+    A 'caché.txt' file that changed after the compiled file was written is not overwritten, unless force is True.
+
+    Raises:
+        ValueError: If the compiled cache file is older than the 'caché.txt' file and force is False.
+
+    Example:
+        >>> decompile_cache_file()
+        '/home/user/espaCy/modules/cache/caché.txt'
+    """
+    check_cache_is_writable(cache_name)
+
+    if not force and check_file(cache_name) and read_compiled_cache_if_current(cache_name) is None:
+        raise ValueError("The compiled espaCy cache is older than '" + get_cache_file_path(cache_name)
+                         + "', use force to overwrite it")
+
+    cache, _, _ = read_compiled_cache(cache_name)
+    with cache_write_lock(cache_name):
+        write_cache_table(cache, False, cache_name)
+    compile_cache_file(cache_name)
+
+    return get_cache_file_path(cache_name)
+
+
+def write_compiled_cache(cache, source_signature, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Writes a cache dict to the compiled cache file.
+    The file is written to a temporary file first and then renamed, so readers never see a partial file.
+
+    Parameters:
+        cache (dict): The cache dict.
+        source_signature (tuple): The signature of the 'caché.txt' file the cache was read from.
+
+    Example:
+        >>> write_compiled_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}, (1647345600000000000, 2048))
+    """
+    cache_index = compile_cache_index(cache)
+    header = {
+        'format': COMPILED_CACHE_FORMAT,
+        'version': COMPILED_CACHE_VERSION,
+        'source_signature': source_signature,
+        # (word, previous_word_pos, word_pos, next_word_pos, corrected_pos) rows
+        'contexts': [list(key) + [value] for key, value in cache_index.items() if isinstance(key, tuple)],
+        # word -> {word_pos: [corrected_pos]}
+        'summaries': {key: {word_pos: sorted(corrected_pos_set) for word_pos, corrected_pos_set in value.items()}
+                      for key, value in cache_index.items() if not isinstance(key, tuple)}
+    }
+    lines = [json.dumps(header, ensure_ascii=False), json.dumps(copy_cache(cache), ensure_ascii=False)]
+    write_file_atomically(get_compiled_cache_file_path(cache_name),
+                          lambda file: file.write('\n'.join(lines) + '\n'), 'w')
+
+
+def read_compiled_cache(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Reads the whole compiled cache file, the flat index and the nested cache.
+    Every process that reads it builds its own copy of the cache and of its index; to share a single copy
+    of the index among many worker processes, publish it with espaCy_shared_cache instead.
+
+    Returns:
+        cache (dict): The nested cache dict.
+        cache_index (dict): The flat index of the cache.
+        source_signature (tuple): The signature of the 'caché.txt' file the cache was compiled from.
+
+    Raises:
+        ValueError: If the file is not a compiled cache or was written by an unsupported version.
+
+    Example:
+        >>> read_compiled_cache()
+        ({'casa': {...}}, {'casa': {'NOUN': frozenset({'ADJ'})}, ...}, (1647345600000000000, 2048))
+    """
+    with open(get_compiled_cache_file_path(cache_name), 'r', encoding='utf-8') as file:
+        cache_index, source_signature = parse_compiled_cache_header(file.readline(), cache_name)
+        cache = parse_compiled_nested_cache(file.readline(), cache_name)
+
+    return cache, cache_index, source_signature
+
+
+def read_compiled_nested_cache(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Reads the nested cache of the compiled cache file, skipping its flat index.
+
+    Raises:
+        ValueError: If the nested cache can not be read.
+
+    Example:
+        >>> read_compiled_nested_cache()
+        {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}
+    """
+    with open(get_compiled_cache_file_path(cache_name), 'r', encoding='utf-8') as file:
+        file.readline()
+        return parse_compiled_nested_cache(file.readline(), cache_name)
+
+
+def parse_compiled_nested_cache(line, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the nested cache stored in the second line of a compiled cache file.
+
+    Raises:
+        ValueError: If the line is not a nested cache.
+
+    Example:
+        >>> parse_compiled_nested_cache('{"casa": {"DET NOUN ADJ": {"ADJ": ["de Casa Vieja"]}}}')
+        {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}
+    """
+    cache = json.loads(line or 'null')
+
+    if not isinstance(cache, dict):
+        raise ValueError('Corrupted compiled espaCy cache: ' + get_compiled_cache_file_path(cache_name))
+
+    return cache
+
+
+def read_compiled_cache_index(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Reads the flat index of the compiled cache file, without reading its nested cache.
+
+    Returns:
+        cache_index (dict): The flat index of the cache.
+        source_signature (tuple): The signature of the 'caché.txt' file the cache was compiled from.
+
+    Raises:
+        ValueError: If the file is not a compiled cache or was written by an unsupported version.
+
+    Example:
+        >>> read_compiled_cache_index()
+        ({'casa': {'NOUN': frozenset({'ADJ'})}, ...}, (1647345600000000000, 2048))
+    """
+    with open(get_compiled_cache_file_path(cache_name), 'r', encoding='utf-8') as file:
+        return parse_compiled_cache_header(file.readline(), cache_name)
+
+
+def parse_compiled_cache_header(line, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the (cache_index, source_signature) pair stored in the first line of a compiled cache file.
+
+    Raises:
+        ValueError: If the line is not the header of a compiled cache of the supported version.
+
+    Example:
+        >>> parse_compiled_cache_header('{"format": "espaCy-cache", "version": 5, "source_signature": null, "contexts": [], "summaries": {}}')
+        ({}, None)
+    """
+    header = json.loads(line)
+
+    if not isinstance(header, dict) or header.get('format') != COMPILED_CACHE_FORMAT:
+        raise ValueError('Not a compiled espaCy cache: ' + get_compiled_cache_file_path(cache_name))
+    if header.get('version') != COMPILED_CACHE_VERSION:
+        raise ValueError('Unsupported compiled espaCy cache version: ' + str(header.get('version')))
+
+    try:
+        cache_index = {(word, previous_word_pos, word_pos, next_word_pos): corrected_pos
+                       for word, previous_word_pos, word_pos, next_word_pos, corrected_pos in header['contexts']}
+        for word, word_summary in header['summaries'].items():
+            cache_index[word] = {word_pos: frozenset(corrected_pos_list)
+                                 for word_pos, corrected_pos_list in word_summary.items()}
+        source_signature = tuple(header['source_signature']) if header['source_signature'] is not None else None
+    except (KeyError, ValueError, TypeError, AttributeError):
+        raise ValueError('Corrupted compiled espaCy cache: ' + get_compiled_cache_file_path(cache_name))
+
+    return cache_index, source_signature
+
+
+def read_compiled_cache_if_current(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the flat index of the compiled cache file if it was compiled from the current
+    'caché.txt' file (or if there is no 'caché.txt' file), None otherwise.
+
+    Example:
+        >>> read_compiled_cache_if_current()
+        {'casa': {'NOUN': frozenset({'ADJ'})}, ('casa', 'DET', 'NOUN', 'ADJ'): 'ADJ'}
+    """
+    if get_file_signature(get_compiled_cache_file_path(cache_name)) is None:
+        return None
+
+    try:
+        cache_index, source_signature = read_compiled_cache_index(cache_name)
+    except (OSError, ValueError):
+        return None
+
+    table_signature = get_file_signature(get_cache_file_path(cache_name))
+    if table_signature is not None and table_signature != source_signature:
+        return None
+
+    return cache_index
+
+
+def invalidate_cache(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Drops the in-memory snapshot of the cache, so the next call to get_cache parses the file again.
+
+    Example:
+        >>> invalidate_cache()
+    """
+    with _cache_snapshot_lock:
+        _cache_snapshots.pop(cache_name, None)
+
+
+def get_cache_stats(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the counters of the in-memory cache snapshot.
+        hits: Calls to get_cache served from memory.
+        misses: Calls to get_cache that had to parse the file.
+        reloads: Misses caused by a change of the file after it had been loaded.
+
+    Example:
+        >>> get_cache_stats()
+        {'hits': 41, 'misses': 2, 'reloads': 1}
+    """
+    return dict(get_cache_counters(cache_name))
+
+
+def reset_cache_stats(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Sets every counter of the in-memory cache snapshot to 0.
+
+    Example:
+        >>> reset_cache_stats()
+    """
+    stats = get_cache_counters(cache_name)
+    for counter in stats:
+        stats[counter] = 0
+
+
+def get_cache_counters(cache_name):
+    """
+    Returns the mutable dict holding the counters of the in-memory snapshot of a cache.
+
+    Example:
+        >>> get_cache_counters('default')
+        {'hits': 41, 'misses': 2, 'reloads': 1}
+    """
+    stats = _cache_stats.get(cache_name)
+    if stats is None:
+        stats = _cache_stats.setdefault(cache_name, {'hits': 0, 'misses': 0, 'reloads': 0})
+
+    return stats
+
+
+def freeze_cache(cache):
+    """
+    Returns a read-only version of a cache dict, so the shared snapshot can not be modified by its readers.
+    Dicts are wrapped in a mappingproxy and phrase context lists are turned into tuples.
+
+    Example:
+        >>> freeze_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}})
+        mappingproxy({'casa': mappingproxy({'DET NOUN ADJ': mappingproxy({'ADJ': ('de Casa Vieja',)})})})
+    """
+    return MappingProxyType({
+        word: MappingProxyType({
+            spacy_tag_pattern: MappingProxyType({
+                rae_pos: tuple(phrase_contexts)
+                for rae_pos, phrase_contexts in key_dict.items()
+            })
+            for spacy_tag_pattern, key_dict in word_dict.items()
+        })
+        for word, word_dict in cache.items()
+    })
+
+
+def copy_cache(cache):
+    """
+    Returns a mutable copy of a cache, e.g. of the snapshot returned by get_cache, that can be
+    modified and written back with update_cache.
+
+    Example:
+        >>> copy_cache(get_cache())
+        {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}
+    """
+    return {
+        word: {
+            spacy_tag_pattern: {
+                rae_pos: list(phrase_contexts)
+                for rae_pos, phrase_contexts in key_dict.items()
+            }
+            for spacy_tag_pattern, key_dict in word_dict.items()
+        }
+        for word, word_dict in cache.items()
+    }
+
+
+def update_cache(cache, verbose, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Writes the content of the cache dict passed as a parameter in the caché.txt file, replacing the whole cache.
+    The file is replaced atomically, so readers see either the old or the new cache.
     :param cache: The cache dict
     :param verbose: The verbose boolean
 
@@ -27,11 +709,279 @@ def update_cache(cache, verbose):
         >>> update_cache({'a': 'b', 'c': 'd'}, True)
         Cache updated
     """
-    open('/'.join(os.getcwd().split('/')[:-1]) + '/cache/caché.txt', 'w').truncate(0)
-    initialize_table(cache, verbose)
+    check_cache_is_writable(cache_name)
+
+    with cache_write_lock(cache_name):
+        write_cache_table(cache, verbose, cache_name)
+        clear_journal(cache_name)
+    invalidate_cache(cache_name)
+
+
+def add_patterns(entries, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Adds new patterns to the cache without rewriting the 'caché.txt' file.
+    The entries are appended to the journal of the cache, which is merged with the table each time the cache
+    is loaded, until compact_cache writes them to the table.
+
+    Parameters:
+        entries (dict): The patterns to be added, with the same structure as the cache dict.
+
+    Example:
+        >>> add_patterns({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}})
+    """
+    lines = []
+    for word, word_dict in entries.items():
+        for spacy_tag_pattern, key_dict in word_dict.items():
+            for rae_pos, phrases in key_dict.items():
+                lines.append(json.dumps([word, spacy_tag_pattern, rae_pos, list(phrases)], ensure_ascii=False) + '\n')
+
+    if not lines:
+        return
+
+    check_cache_is_writable(cache_name)
+
+    with cache_write_lock(cache_name):
+        # A single append, so concurrent readers see whole lines
+        file_descriptor = os.open(get_cache_journal_file_path(cache_name), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(file_descriptor, ''.join(lines).encode('utf-8'))
+        finally:
+            os.close(file_descriptor)
+
+
+def compact_cache(verbose=False, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Merges the journal of the cache into the 'caché.txt' file and empties the journal.
+    The table is written to a temporary file that is renamed over the old one, so readers never see a partial
+    table, and the compiled cache file is refreshed if there is one.
+
+    Example:
+        >>> compact_cache()
+    """
+    check_cache_is_writable(cache_name)
+
+    with cache_write_lock(cache_name):
+        journal_entries = read_journal(cache_name)
+        if not journal_entries:
+            return
+
+        if file_is_empty(cache_name):
+            write_cache_table({}, False, cache_name)
+
+        write_cache_table(merge_cache(read_table(cache_name), journal_entries), verbose, cache_name)
+        if get_file_signature(get_compiled_cache_file_path(cache_name)) is not None:
+            write_compiled_cache(read_table(cache_name), get_file_signature(get_cache_file_path(cache_name)), cache_name)
+        clear_journal(cache_name)
+
+    invalidate_cache(cache_name)
+
+
+def initialize_cache_file(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Writes the header of the table to the 'caché.txt' file if it is empty or does not exist.
+
+    Example:
+        >>> initialize_cache_file()
+    """
+    if get_cache_config(cache_name)['read_only']:
+        return
+
+    if file_is_empty(cache_name):
+        with cache_write_lock(cache_name):
+            # Another writer may have filled the file while we were waiting for the lock
+            if file_is_empty(cache_name):
+                write_cache_table({}, False, cache_name)
+
+
+def write_cache_table(cache, verbose, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Replaces the 'caché.txt' file with the table of a cache dict, through a temporary file.
+
+    Example:
+        >>> write_cache_table({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}, False)
+    """
+    write_file_atomically(get_cache_file_path(cache_name), lambda file: write_table(file, get_rows(), cache, verbose))
+
+
+def merge_cache(cache, entries):
+    """
+    Merges the entries of a cache dict into another one, keeping the order of both and skipping repeated phrases.
+
+    Parameters:
+        cache (dict): The cache dict to be updated.
+        entries (dict): The cache dict to be merged into it.
+
+    Returns:
+        cache (dict): The updated cache dict.
+
+    Example:
+        >>> merge_cache({'casa': {'DET NOUN': {'PRON': ['la casa']}}}, {'casa': {'DET NOUN': {'PRON': ['la casa', 'esta casa']}}})
+        {'casa': {'DET NOUN': {'PRON': ['la casa', 'esta casa']}}}
+    """
+    known_phrases = {}
+
+    for word, word_dict in entries.items():
+        for spacy_tag_pattern, key_dict in word_dict.items():
+            for rae_pos, phrases in key_dict.items():
+                cached_phrases = cache.setdefault(word, {}).setdefault(spacy_tag_pattern, {}).setdefault(rae_pos, [])
+                known = known_phrases.setdefault((word, spacy_tag_pattern, rae_pos), set(cached_phrases))
+                for phrase in phrases:
+                    if phrase not in known:
+                        known.add(phrase)
+                        cached_phrases.append(phrase)
+
+    return cache
+
+
+def read_journal(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Reads the journal of the cache and returns its entries as a cache dict.
+    A last line that is still being written is ignored.
+
+    Example:
+        >>> read_journal()
+        {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}
+    """
+    try:
+        with open(get_cache_journal_file_path(cache_name), 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+    except OSError:
+        return {}
+
+    entries = {}
+    for line in lines:
+        if not line.endswith('\n'):
+            break
+        try:
+            word, spacy_tag_pattern, rae_pos, phrases = json.loads(line)
+        except ValueError:
+            continue
+        merge_cache(entries, {word: {spacy_tag_pattern: {rae_pos: phrases}}})
+
+    return entries
+
+
+def clear_journal(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Empties the journal of the cache.
+
+    Example:
+        >>> clear_journal()
+    """
+    if get_file_signature(get_cache_journal_file_path(cache_name)) is not None:
+        write_file_atomically(get_cache_journal_file_path(cache_name), lambda file: None)
+
+
+@contextlib.contextmanager
+def cache_write_lock(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Serializes the writers of the cache, both the threads of this process and, where fcntl is available,
+    other processes. Readers only take this lock to initialize an empty 'caché.txt' file.
+    The lock is not reentrant.
+
+    Example:
+        >>> with cache_write_lock():
+        ...     pass
+    """
+    with _cache_write_locks.setdefault(cache_name, threading.Lock()):
+        if fcntl is None:
+            yield
+            return
+
+        with open(os.path.splitext(get_cache_file_path(cache_name))[0] + CACHE_LOCK_EXTENSION, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_cache_file_path(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the path of the 'caché.txt' file of a cache.
+
+    Example:
+        >>> get_cache_file_path()
+        '/home/user/espaCy/modules/cache/caché.txt'
+    """
+    return get_cache_config(cache_name)['path']
+
+
+def configure_cache(cache_name=DEFAULT_CACHE_NAME, path=None, read_only=False):
+    """
+    Sets the location of a cache. The path is resolved once here, not on every access to the cache.
+    Several named caches can be configured (e.g. one per domain) and passed by name to every function of this module.
+    A read-only cache never creates, initializes or rewrites its files, so a compiled cache file can be
+    deployed once and read by many worker processes (each one loads its own copy, see read_compiled_cache).
+
+    Parameters:
+        cache_name (str): The name of the cache.
+        path (str): The path of the 'caché.txt' file of the cache. If None, the default path of the cache is used.
+        read_only (bool): If True, any attempt to write the cache raises a PermissionError.
+
+    Example:
+        >>> configure_cache('medicine', '/srv/espaCy/medicine/caché.txt', read_only=True)
+    """
+    if path is None:
+        path = get_default_cache_file_path(cache_name)
+
+    _cache_configs[cache_name] = {'path': os.path.abspath(path), 'read_only': read_only}
+    invalidate_cache(cache_name)
+
+
+def get_cache_config(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the configuration of a cache: the path of its 'caché.txt' file and whether it is read-only.
+    A cache that was not configured with configure_cache takes its configuration from the environment:
+        ESPACY_CACHE_PATH (or ESPACY_CACHE_PATH_<NAME> for a named cache): The path of the 'caché.txt' file.
+        ESPACY_CACHE_DIR: The directory of the cache files, if no path is set.
+        ESPACY_CACHE_READ_ONLY (or ESPACY_CACHE_READ_ONLY_<NAME>): '1', 'true' or 'yes' for a read-only cache.
+
+    Example:
+        >>> get_cache_config()
+        {'path': '/home/user/espaCy/modules/cache/caché.txt', 'read_only': False}
+    """
+    config = _cache_configs.get(cache_name)
+
+    if config is None:
+        suffix = '' if cache_name == DEFAULT_CACHE_NAME else '_' + cache_name.upper()
+        read_only = os.environ.get('ESPACY_CACHE_READ_ONLY' + suffix, '').lower() in ('1', 'true', 'yes')
+        path = os.environ.get('ESPACY_CACHE_PATH' + suffix) or get_default_cache_file_path(cache_name)
+        config = _cache_configs.setdefault(cache_name, {'path': os.path.abspath(path), 'read_only': read_only})
+
+    return config
+
+
+def get_default_cache_file_path(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Returns the default path of the 'caché.txt' file of a cache: the ESPACY_CACHE_DIR directory, or the directory
+    of this module if it is not set. Named caches are stored in 'caché_<name>.txt'.
+
+    Example:
+        >>> get_default_cache_file_path('medicine')
+        '/home/user/espaCy/modules/cache/caché_medicine.txt'
+    """
+    directory = os.environ.get('ESPACY_CACHE_DIR') or os.path.dirname(os.path.abspath(__file__))
+
+    if cache_name == DEFAULT_CACHE_NAME:
+        return os.path.join(directory, CACHE_FILE_NAME + CACHE_FILE_EXTENSION)
+
+    return os.path.join(directory, CACHE_FILE_NAME + '_' + cache_name + CACHE_FILE_EXTENSION)
+
+
+def check_cache_is_writable(cache_name=DEFAULT_CACHE_NAME):
+    """
+    Raises a PermissionError if the cache is read-only.
 
+    Example:
+        >>> check_cache_is_writable('medicine')
+        PermissionError: The espaCy cache 'medicine' is read-only
+    """
+    if get_cache_config(cache_name)['read_only']:
+        raise PermissionError("The espaCy cache '" + cache_name + "' is read-only")
 
-def read_file():
+
+def read_file(cache_name=DEFAULT_CACHE_NAME):
     """
     Open or create the 'cache.txt' file and store its content line by line in a list of strings
 
@@ -41,15 +991,15 @@ def read_file():
         >>> read_file()
         ['https://www.google.com', 'https://www.youtube.com']
     """
-    file = open_file()
+    file = open_file(cache_name)
     content = file.readlines()
     file.close()
     return [line.strip() for line in content]
 
 
-def check_file():
+def check_file(cache_name=DEFAULT_CACHE_NAME):
     """
-    This function checks if the file 'caché.txt' exists in the directory above the current one.
+    This function checks if the 'caché.txt' file of the cache exists.
 
     :return: True if the file exists, False otherwise.
 
@@ -57,10 +1007,10 @@ def check_file():
         >>> check_file()
         True
     """
-    return os.path.isfile('/'.join(os.getcwd().split('/')[:-1]) + '/cache/caché.txt')
+    return os.path.isfile(get_cache_file_path(cache_name))
 
 
-def open_file():
+def open_file(cache_name=DEFAULT_CACHE_NAME):
     """
     This function opens the cache file if it exists, if not it creates it.
     It returns the file object.
@@ -69,15 +1019,17 @@ def open_file():
         >>> open_file()
         <_io.TextIOWrapper name='/home/user/cache/caché.txt' mode='r' encoding='UTF-8'>
     """
-    if check_file():
-        return open('/'.join(os.getcwd().split('/')[:-1]) + '/cache/caché.txt', 'r')
+    if check_file(cache_name):
+        return open(get_cache_file_path(cache_name), 'r', encoding='utf-8')
+    elif get_cache_config(cache_name)['read_only']:
+        return io.StringIO()
     else:
-        file = open('/'.join(os.getcwd().split('/')[:-1]) + '/cache/caché.txt', 'w')
+        file = open(get_cache_file_path(cache_name), 'w', encoding='utf-8')
         file.close()
-        return open('/'.join(os.getcwd().split('/')[:-1]) + '/cache/caché.txt', 'r+')
+        return open(get_cache_file_path(cache_name), 'r+', encoding='utf-8')
 
 
-def write_file():
+def write_file(cache_name=DEFAULT_CACHE_NAME):
     """
     This function opens a file in the cache directory and returns it.
     It is used to store the results of the queries.
@@ -86,10 +1038,10 @@ def write_file():
         >>> write_file()
         <_io.TextIOWrapper name='/home/user/cache/caché.txt' mode='a' encoding='UTF-8'>
     """
-    return open('/'.join(os.getcwd().split('/')[:-1]) + '/cache/caché.txt', 'a')
+    return open(get_cache_file_path(cache_name), 'a', encoding='utf-8')
 
 
-def read_table():
+def read_table(cache_name=DEFAULT_CACHE_NAME):
     """
     Reads the table from the file and returns a dictionary with the following structure:
         {
@@ -124,30 +1076,18 @@ def read_table():
             Its corrected pos is 'ADJ'
             Example phrase for this context: 'de Casa Vieja'
     """
-    file = read_file()
+    file = read_file(cache_name)
     header = 0
     cache = {}
     last_line = []
     for line in file:
-        if header > 2:
-            new_line = list(filter(None, line.replace(' ', '').split('|')))
-
-            if (len(new_line) - 1) > 0:
-                # word
-                if not new_line[0]:
-                    new_line[0] = last_line[0]
-                    if (len(new_line) - 1) > 1:
-                        # spacy_tag_pattern
-                        if not new_line[1]:
-                            new_line[1] = last_line[1]
-                            if (len(new_line) - 1) > 2:
-                                # corrected_rae_pos
-                                if not new_line[2]:
-                                    new_line[2] = last_line[2]
-                                    if (len(new_line) - 1) > 3:
-                                        # phrase_context
-                                        if not new_line[3]:
-                                            new_line[3] = last_line[3]
+        if header > 2 and line.startswith('|'):
+            new_line = [column.strip() for column in line.split('|')[1:-1]]
+
+            # Empty grouping cells repeat the content of the cell above them, phrase cells are read as they are
+            for position, column in enumerate(new_line[:TABLE_GROUPING_COLUMNS]):
+                if not column and position < len(last_line):
+                    new_line[position] = last_line[position]
 
             cache = load_cache(new_line, cache)
             last_line = new_line
@@ -173,24 +1113,10 @@ def load_cache(columns, cache):
 
         {'word': {'spacy_tag_pattern': {'rae_pos': 'phrase_context' : {}}}}}
     """
-    rae_pos = ''
-    spacy_tag_pattern = ''
-    if (len(columns) - 1) > 0:
-        word = columns[0]
-        if (len(columns) - 1) > 1:
-            spacy_tag_pattern = columns[1]
-            if (len(columns) - 1) > 2:
-                rae_pos = columns[2]
-                if (len(columns) - 1) > 3:
-                    phrase_context = columns[3]
-                else:
-                    phrase_context = ''
-            else:
-                rae_pos = ''
-        else:
-            spacy_tag_pattern = ''
-    else:
-        word = ''
+    word = columns[0] if len(columns) > 0 else ''
+    spacy_tag_pattern = columns[1] if len(columns) > 1 else ''
+    rae_pos = columns[2] if len(columns) > 2 else ''
+    phrase_context = columns[3] if len(columns) > 3 else ''
 
     try:
         if not cache[word]:
@@ -225,7 +1151,7 @@ def load_cache(columns, cache):
     return cache
 
 
-def file_is_empty():
+def file_is_empty(cache_name=DEFAULT_CACHE_NAME):
     """
     This function checks if the file is empty or not.
     It takes no arguments.
@@ -235,13 +1161,13 @@ def file_is_empty():
         >>> file_is_empty()
         True
     """
-    file = open_file()
+    file = open_file(cache_name)
     content = file.readlines()
     file.close()
     return len(content) == 0
 
 
-def initialize_table(cache, verbose):
+def initialize_table(cache, verbose, cache_name=DEFAULT_CACHE_NAME):
     """
 
     Initializes the cache table.
@@ -253,18 +1179,102 @@ def initialize_table(cache, verbose):
     verbose : bool
         If True, prints the table to the console.
     """
-    file = write_file()
-    rows = get_rows()
-    table = create_table(rows, cache)
+    check_cache_is_writable(cache_name)
 
-    for line in table:
+    file = write_file(cache_name)
+    write_table(file, get_rows(), cache, verbose)
+    file.close()
 
-        line += '\n'
-        file.write(line.expandtabs(1))
+
+def write_table(file, rows_list, dict_content, verbose):
+    """
+    Writes the cache table to a file object row by row, without building the whole table in memory.
+    Duplicated rows are skipped keeping the order of the first appearance, and the writing time grows
+    linearly with the number of rows.
+
+    Parameters:
+        file: The file object the table is written to.
+        rows_list (list): The column names of the table.
+        dict_content (dict): The cache dict.
+        verbose (bool): If True, prints the table to the console.
+
+    Example:
+        >>> write_table(sys.stdout, get_rows(), {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}, False)
+        +----------------+-------------------+-------------------+-----------------+
+        | word           | spacy_tag_pattern | corrected_rae_pos | phrase_contexts |
+        +----------------+-------------------+-------------------+-----------------+
+        | casa           | DET NOUN ADJ      | ADJ               | de Casa Vieja   |
+    """
+    for line in iterate_table(rows_list, dict_content):
+        file.write(line.expandtabs(1) + '\n')
         if verbose:
-            print(str(line.replace('\n', '')))
+            print(line)
 
-    file.close()
+
+def iterate_table(rows_list, dict_content):
+    """
+    Yields the lines of the cache table: the header, surrounded by its decoration, and a line for each row of the cache.
+
+    Example:
+        >>> list(iterate_table(['word', 'spacy_tag_pattern'], {}))
+        ['+------+-------------------+', '| word | spacy_tag_pattern |', '+------+-------------------+']
+    """
+    margin = get_margin(dict_content) if dict_content else 1
+
+    rows = create_row_with_text(rows_list, margin)
+    decoration = create_row_decoration(rows)
+
+    yield decoration
+    yield rows
+    yield decoration
+
+    if dict_content:
+        yield from iterate_espacy_cache_format(dict_content, margin)
+
+
+def iterate_espacy_cache_format(dict_content, margin):
+    """
+    Yields a table line for each (word, spacy_tag_pattern, rae_pos, phrase) combination of a cache dict.
+    Duplicated combinations are skipped. The grouping cells (word, spacy_tag_pattern and rae_pos) are left empty
+    when the row belongs to the same group as the row above it, and read_table fills them back in.
+    Phrase cells are always written, so an empty phrase is read back as an empty phrase.
+
+    Example:
+        >>> list(iterate_espacy_cache_format({'casa': {'DET NOUN': {'PRON': ['la casa', 'esta casa']}}}, 10))
+        ['| casa      | DET NOUN  | PRON      | la casa   |', '|           |           |           | esta casa |']
+    """
+    seen_rows = set()
+    previous_row = ()
+
+    for row in iterate_cache_rows(dict_content):
+        if row in seen_rows:
+            continue
+        seen_rows.add(row)
+
+        # The number of leading grouping cells shared with the row above
+        shared_cells = 0
+        while shared_cells < TABLE_GROUPING_COLUMNS and previous_row and row[shared_cells] == previous_row[shared_cells]:
+            shared_cells += 1
+
+        cells = [''] * shared_cells + list(row[shared_cells:])
+        previous_row = row
+
+        yield create_row_with_text(cells, margin)
+
+
+def iterate_cache_rows(dict_content):
+    """
+    Yields a (word, spacy_tag_pattern, rae_pos, phrase) tuple for each phrase of a cache dict.
+
+    Example:
+        >>> list(iterate_cache_rows({'casa': {'DET NOUN': {'PRON': ['la casa']}}}))
+        [('casa', 'DET NOUN', 'PRON', 'la casa')]
+    """
+    for word, word_dict in dict_content.items():
+        for spacy_tag_pattern, key_dict in word_dict.items():
+            for rae_pos, phrases in key_dict.items():
+                for phrase in phrases:
+                    yield word, spacy_tag_pattern, rae_pos, phrase
 
 
 def get_rows():
@@ -460,132 +1470,7 @@ def create_table(rows_list, dict_content):
 
         [['header1', 'header2'], ['content1', 'content2'], ['--------', '--------']]
     """
-    table = []
-
-    if dict_content:
-        margin = get_margin(dict_content)
-        dict_content_list = parse_dict_to_espacy_cache_format(dict_content, margin)
-
-    else:
-        margin = 1
-        dict_content_list = []
-
-    rows = create_row_with_text(rows_list, margin)
-    decoration = create_row_decoration(rows)
-
-    table.append(decoration)
-    table.append(rows)
-    table.append(decoration)
-
-    if dict_content_list:
-        for element in dict_content_list:
-
-            if not element in table:
-                element = element
-                table.append(element)
-
-    return table
-
-
-def clean_rows(rows, margin):
-    """
-    This function cleans the rows of a table.
-
-    It takes a list of rows, and a margin, and returns a list of cleaned rows.
-
-    The margin is the number of spaces between the columns.
-
-    The function will remove any extra spaces between the columns, and add spaces to the right if needed.
-
-    The function will also remove any extra spaces at the end of the rows.
-
-    The function will also remove any extra spaces at the beginning of the rows.
-
-    Parameters:
-        rows (list): A list of rows.
-        margin (int): The number of spaces between the columns.
-
-    Returns:
-        list: A list of cleaned rows.
-
-    Example:
-        >>> clean_rows(['| a | b | c |', '| a | b | c |', '| a | b | c |'], 2)
-
-        ['| a | b | c |', '| a | b | c |', '| a | b | c |']
-    """
-
-    cleaned_rows = []
-
-    previous_row = ''
-
-    for line in rows:
-        actual_row = list(filter(None, line.replace(' ', '').split('|')))
-
-        new_row = '| '
-
-        if previous_row:
-            if actual_row:
-                if previous_row[0]:
-                    if actual_row[0]:
-                        if previous_row[0] == actual_row[0]:
-                            new_row += (' ' * margin) + '| '
-                        else:
-                            new_row += actual_row[0] + (' ' * (margin - len(actual_row[0]))) + '| '
-        else:
-            # first
-            if actual_row:
-                new_row += actual_row[0] + (' ' * (margin - len(actual_row[0]))) + '| '
-
-        if previous_row:
-            if actual_row:
-                if len(previous_row) > 1:
-                    if previous_row[1]:
-                        if actual_row[1]:
-                            if previous_row[1] == actual_row[1]:
-                                new_row += (' ' * margin) + '| '
-                            else:
-                                new_row += actual_row[1] + (' ' * (margin - len(actual_row[1]))) + '| '
-        else:
-            # First
-            if actual_row:
-                if len(actual_row) > 1:
-                    new_row += actual_row[1] + (' ' * (margin - len(actual_row[1]))) + '| '
-
-        if previous_row:
-            if actual_row:
-                if len(previous_row) > 2:
-                    if previous_row[2]:
-                        if actual_row[2]:
-                            if previous_row[2] == actual_row[2]:
-                                new_row += (' ' * margin) + '| '
-                            else:
-                                new_row += actual_row[2] + (' ' * (margin - len(actual_row[2]))) + '| '
-        else:
-            # First
-            if actual_row:
-                if len(actual_row) > 2:
-                    new_row += actual_row[2] + (' ' * (margin - len(actual_row[2]))) + '| '
-
-        if previous_row:
-            if actual_row:
-                if len(previous_row) > 3:
-                    if previous_row[3]:
-                        if actual_row[3]:
-                            if previous_row[3] == actual_row[3]:
-                                new_row += (' ' * margin) + '| '
-                            else:
-                                new_row += actual_row[3] + (' ' * (margin - len(actual_row[3]))) + '| '
-        else:
-            # First
-            if actual_row:
-                if len(actual_row) > 3:
-                    new_row += actual_row[3] + (' ' * (margin - len(actual_row[0]))) + '| '
-
-        cleaned_rows.append(new_row[:-1])
-
-        previous_row = actual_row
-
-    return cleaned_rows
+    return list(iterate_table(rows_list, dict_content))
 
 
 def parse_dict_to_espacy_cache_format(dict_content, margin):
@@ -641,16 +1526,23 @@ def parse_dict_to_espacy_cache_format(dict_content, margin):
         ]
     ]
     """
-    rows = []
-    for word in dict_content:
-        word_dict = dict_content[word]
-        for spacy_tag_pattern in word_dict:
-            key_dict = word_dict[spacy_tag_pattern]
-            for rae_pos in key_dict:
-                for phrase in key_dict[rae_pos]:
-                    if not create_row_with_text([word, spacy_tag_pattern, rae_pos, phrase], margin) in rows:
-                        rows.append(create_row_with_text([word, spacy_tag_pattern, rae_pos, phrase], margin))
+    return list(iterate_espacy_cache_format(dict_content, margin))
+
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converts the espaCy cache between its table and compiled formats.')
+    parser.add_argument('action', choices=['compile', 'decompile'],
+                        help='compile: caché.txt -> compiled file, decompile: compiled file -> caché.txt')
+    parser.add_argument('--cache-name', default=DEFAULT_CACHE_NAME, help='The name of the cache')
+    parser.add_argument('--path', default=None, help='The path of the caché.txt file of the cache')
+    parser.add_argument('--force', action='store_true',
+                        help='decompile: overwrite caché.txt even if it changed after the compiled file was written')
+    arguments = parser.parse_args()
 
-    return clean_rows(rows, margin)
+    if arguments.path:
+        configure_cache(arguments.cache_name, arguments.path)
 
+    if arguments.action == 'compile':
+        print(compile_cache_file(arguments.cache_name))
+    else:
+        print(decompile_cache_file(arguments.cache_name, arguments.force))
@@ -0,0 +1,413 @@
+import hashlib
+import struct
+import threading
+from multiprocessing import shared_memory
+
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME, get_cache_snapshot, set_shared_cache_index
+
+
+CONTROL_MAGIC = b'ESPACYSC'
+DATA_MAGIC = b'ESPACYSD'
+DATA_VERSION = 2
+
+# magic, generation
+CONTROL_HEADER = struct.Struct('<8sQ')
+# magic, version, number of slots, number of entries
+DATA_HEADER = struct.Struct('<8sIQQ')
+# key hash, entry offset, entry length
+DATA_SLOT = struct.Struct('<QQQ')
+# key length
+ENTRY_HEADER = struct.Struct('<I')
+
+WORD_KEY_PREFIX = b'\x00'
+CONTEXT_KEY_PREFIX = b'\x01'
+CONTEXT_KEY_SEPARATOR = '\x1f'
+# The decision summary of a word is stored as word_pos, corrected_pos... records
+SUMMARY_RECORD_SEPARATOR = '\x1e'
+SUMMARY_TAG_SEPARATOR = '\x1f'
+
+
+class SharedCacheIndex:
+    """
+    A read-only cache index stored in a shared memory segment.
+    It answers the same lookups as the dict returned by compile_cache_index ('word in index' and
+    index.get((word, previous_word_pos, word_pos, next_word_pos))) straight from the shared memory,
+    so the worker processes attached to it do not hold their own copy of the cache.
+    The segment is an open addressing hash table of (key hash, offset, length) slots pointing to the entries.
+    When a new version of the cache is published, the generation counter of the control segment changes
+    and refresh attaches the new data segment. The replaced segment is never closed explicitly: each lookup
+    holds its own reference to the segment it reads, and the segment is unmapped when the last one is dropped.
+
+    Example:
+        >>> index = SharedCacheIndex('espacy_cache')
+        >>> 'casa' in index
+
+        True
+
+        >>> index.get(('casa', 'DET', 'NOUN', 'ADJ'))
+
+        'ADJ'
+    """
+
+    def __init__(self, segment_name):
+        self.segment_name = segment_name
+        self.control = attach_shared_memory(segment_name)
+        self.data = None
+        self.generation = None
+        self._refresh_lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Attaches the data segment of the last published generation, if it is not attached yet.
+
+        Example:
+            >>> index.refresh()
+
+            True
+        """
+        if read_shared_cache_generation(self.control) == self.generation:
+            return False
+
+        with self._refresh_lock:
+            # Another thread may have attached the generation while we were waiting for the lock
+            generation = read_shared_cache_generation(self.control)
+            if generation == self.generation:
+                return False
+
+            return self._attach_generation(generation)
+
+    def _attach_generation(self, generation):
+        while True:
+            try:
+                data = attach_shared_memory(get_data_segment_name(self.segment_name, generation))
+                break
+            except FileNotFoundError:
+                # The generation was replaced while attaching to it
+                new_generation = read_shared_cache_generation(self.control)
+                if new_generation == generation:
+                    raise
+                generation = new_generation
+
+        magic, version, slot_count, _ = DATA_HEADER.unpack_from(data.buf, 0)
+        if magic != DATA_MAGIC or version != DATA_VERSION:
+            raise ValueError('Not a shared espaCy cache segment: ' + data.name)
+
+        # Replaced in a single assignment, so concurrent lookups see either the old or the new segment.
+        # The lookups still reading the old segment keep it mapped until they return.
+        self.data = data, slot_count
+        self.generation = generation
+
+        return True
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a key of the index, or default if the key is not in the index.
+
+        Example:
+            >>> index.get(('casa', 'DET', 'NOUN', 'ADJ'))
+
+            'ADJ'
+        """
+        data, slot_count = self.data
+        buffer = data.buf
+        key_bytes = encode_shared_cache_key(key)
+        key_hash = hash_shared_cache_key(key_bytes)
+        slot = key_hash & (slot_count - 1)
+
+        while True:
+            slot_hash, offset, length = DATA_SLOT.unpack_from(buffer, DATA_HEADER.size + slot * DATA_SLOT.size)
+            if slot_hash == 0:
+                return default
+
+            if slot_hash == key_hash:
+                key_length, = ENTRY_HEADER.unpack_from(buffer, offset)
+                key_start = offset + ENTRY_HEADER.size
+                if buffer[key_start:key_start + key_length] == key_bytes:
+                    return decode_shared_cache_value(key, bytes(buffer[key_start + key_length:offset + length]))
+
+            slot = (slot + 1) & (slot_count - 1)
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+
+        return value
+
+
+_missing = object()
+
+
+def publish_shared_cache(segment_name, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Writes the compiled index of a cache to a new shared memory segment and signals it to the attached
+    workers by increasing the generation counter of the control segment.
+    It must be called by a single process (e.g. the master of a pre-fork server), every time the cache changes.
+    The segments are kept after the publishing process exits, until unlink_shared_cache removes them.
+
+    Parameters:
+        segment_name (str): The name of the control segment the workers attach to.
+        cache_name (str): The name of the cache to be published.
+
+    Returns:
+        generation (int): The generation of the published segment.
+
+    Example:
+        >>> publish_shared_cache('espacy_cache')
+
+        1
+    """
+    try:
+        control = attach_shared_memory(segment_name)
+        previous_generation = read_shared_cache_generation(control)
+    except FileNotFoundError:
+        control = create_shared_memory(segment_name, CONTROL_HEADER.size)
+        previous_generation = 0
+
+    generation = previous_generation + 1
+    # The index is built from the cache files, even if this process is attached to the shared cache itself
+    content = build_shared_cache_segment(get_cache_snapshot(cache_name)[1])
+
+    data = create_shared_memory(get_data_segment_name(segment_name, generation), len(content))
+    data.buf[:len(content)] = content
+    data.close()
+
+    CONTROL_HEADER.pack_into(control.buf, 0, CONTROL_MAGIC, generation)
+    control.close()
+
+    # Workers already attached to the previous generation keep their mapping until they refresh
+    if previous_generation:
+        unlink_shared_memory(get_data_segment_name(segment_name, previous_generation))
+
+    return generation
+
+
+def attach_shared_cache(segment_name, cache_name=DEFAULT_CACHE_NAME):
+    """
+    Attaches the current process to a published shared cache, so get_cache_index (and therefore espacy)
+    answers the lookups of the cache from the shared memory segment.
+
+    Parameters:
+        segment_name (str): The name of the control segment given to publish_shared_cache.
+        cache_name (str): The name of the cache whose lookups are served by the segment.
+
+    Returns:
+        index (SharedCacheIndex): The attached index.
+
+    Example:
+        >>> attach_shared_cache('espacy_cache')
+
+        <modules.cache.espaCy_shared_cache.SharedCacheIndex object at 0x7f0b1c2d3e50>
+    """
+    index = SharedCacheIndex(segment_name)
+    set_shared_cache_index(cache_name, index)
+
+    return index
+
+
+def unlink_shared_cache(segment_name):
+    """
+    Removes the control segment of a shared cache and its current data segment.
+
+    Example:
+        >>> unlink_shared_cache('espacy_cache')
+    """
+    try:
+        control = attach_shared_memory(segment_name)
+    except FileNotFoundError:
+        return
+
+    generation = read_shared_cache_generation(control)
+    control.close()
+
+    unlink_shared_memory(get_data_segment_name(segment_name, generation))
+    unlink_shared_memory(segment_name)
+
+
+def build_shared_cache_segment(cache_index):
+    """
+    Returns the content of a data segment for a cache index: the header, the slots and the entries.
+
+    Example:
+        >>> build_shared_cache_segment({'casa': {'NOUN': frozenset({'ADJ'})}, ('casa', 'DET', 'NOUN', 'ADJ'): 'ADJ'})
+
+        bytearray(b'ESPACYSD\\x01\\x00\\x00\\x00...')
+    """
+    slot_count = 1
+    while slot_count < 2 * len(cache_index) or slot_count < 2:
+        slot_count *= 2
+
+    entries_offset = DATA_HEADER.size + slot_count * DATA_SLOT.size
+    content = bytearray(entries_offset)
+    DATA_HEADER.pack_into(content, 0, DATA_MAGIC, DATA_VERSION, slot_count, len(cache_index))
+
+    for key, value in cache_index.items():
+        key_bytes = encode_shared_cache_key(key)
+        key_hash = hash_shared_cache_key(key_bytes)
+
+        offset = len(content)
+        content += ENTRY_HEADER.pack(len(key_bytes)) + key_bytes + encode_shared_cache_value(value)
+
+        slot = key_hash & (slot_count - 1)
+        while DATA_SLOT.unpack_from(content, DATA_HEADER.size + slot * DATA_SLOT.size)[0] != 0:
+            slot = (slot + 1) & (slot_count - 1)
+        DATA_SLOT.pack_into(content, DATA_HEADER.size + slot * DATA_SLOT.size, key_hash, offset, len(content) - offset)
+
+    return content
+
+
+def encode_shared_cache_key(key):
+    """
+    Returns the bytes stored in the shared segment for a key of the cache index.
+
+    Example:
+        >>> encode_shared_cache_key(('casa', 'DET', 'NOUN', 'ADJ'))
+
+        b'\\x01casa\\x1fDET\\x1fNOUN\\x1fADJ'
+    """
+    if isinstance(key, tuple):
+        return CONTEXT_KEY_PREFIX + CONTEXT_KEY_SEPARATOR.join(key).encode('utf-8')
+
+    return WORD_KEY_PREFIX + key.encode('utf-8')
+
+
+def encode_shared_cache_value(value):
+    """
+    Returns the bytes stored in the shared segment for a value of the cache index: the corrected pos of a context,
+    or the decision summary of a word as word_pos, corrected_pos... records.
+    Values are stored as plain strings, so reading a segment never runs code.
+
+    Example:
+        >>> encode_shared_cache_value({'NOUN': frozenset({'ADJ'})})
+
+        b'NOUN\x1fADJ'
+    """
+    if isinstance(value, str):
+        return value.encode('utf-8')
+
+    return SUMMARY_RECORD_SEPARATOR.join(
+        SUMMARY_TAG_SEPARATOR.join([word_pos] + sorted(corrected_pos_set)) for word_pos, corrected_pos_set in value.items()
+    ).encode('utf-8')
+
+
+def decode_shared_cache_value(key, value_bytes):
+    """
+    Returns the value of the cache index encoded by encode_shared_cache_value for a key.
+
+    Example:
+        >>> decode_shared_cache_value('casa', b'NOUN\x1fADJ')
+
+        {'NOUN': frozenset({'ADJ'})}
+    """
+    text = value_bytes.decode('utf-8')
+    if isinstance(key, tuple):
+        return text
+
+    word_summary = {}
+    for record in text.split(SUMMARY_RECORD_SEPARATOR) if text else ():
+        word_pos, *corrected_pos_list = record.split(SUMMARY_TAG_SEPARATOR)
+        word_summary[word_pos] = frozenset(corrected_pos_list)
+
+    return word_summary
+
+
+def hash_shared_cache_key(key_bytes):
+    """
+    Returns the 64-bit hash of an encoded key. It is stable across processes and never 0, which marks an empty slot.
+
+    Example:
+        >>> hash_shared_cache_key(b'\\x00casa')
+
+        11400714819323198485
+    """
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little') or 1
+
+
+def read_shared_cache_generation(control):
+    """
+    Returns the generation counter stored in a control segment.
+
+    Example:
+        >>> read_shared_cache_generation(control)
+
+        3
+    """
+    magic, generation = CONTROL_HEADER.unpack_from(control.buf, 0)
+    if magic != CONTROL_MAGIC:
+        raise ValueError('Not a shared espaCy cache control segment: ' + control.name)
+
+    return generation
+
+
+def get_data_segment_name(segment_name, generation):
+    """
+    Returns the name of the data segment of a generation.
+
+    Example:
+        >>> get_data_segment_name('espacy_cache', 3)
+
+        'espacy_cache_3'
+    """
+    return segment_name + '_' + str(generation)
+
+
+def create_shared_memory(name, size):
+    """
+    Creates a shared memory segment without registering it in the resource tracker of this process,
+    so the segment is not removed when the process exits.
+
+    Example:
+        >>> create_shared_memory('espacy_cache', 16)
+
+        SharedMemory('espacy_cache', size=16)
+    """
+    try:
+        return shared_memory.SharedMemory(name, create=True, size=size, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks the segment
+        from multiprocessing import resource_tracker
+
+        segment = shared_memory.SharedMemory(name, create=True, size=size)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def attach_shared_memory(name):
+    """
+    Attaches an existing shared memory segment without registering it in the resource tracker of this process,
+    so the segment is not removed when a worker process exits.
+
+    Example:
+        >>> attach_shared_memory('espacy_cache')
+
+        SharedMemory('espacy_cache', size=16)
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks the segment
+        from multiprocessing import resource_tracker
+
+        segment = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def unlink_shared_memory(name):
+    """
+    Removes a shared memory segment, if it exists.
+
+    Example:
+        >>> unlink_shared_memory('espacy_cache_2')
+    """
+    try:
+        segment = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+
+    segment.close()
+    segment.unlink()
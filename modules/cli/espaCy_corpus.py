@@ -0,0 +1,366 @@
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import queue
+import sys
+import time
+
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME, get_cache_index
+from modules.utils.spaCy_models import NLP_PROFILES, get_nlp, set_default_model, set_default_profile, warm_up_nlp
+
+
+def main(arguments=None):
+    """
+    Command line entry point of 'python -m espaCy'.
+    It corrects a corpus of (word, pos, phrase) rows or of raw documents, read from a JSONL or TSV file,
+    sharding it in chunks across a pool of processes that load the model once each, and writes the corrected
+    tags as a stream.
+
+    Example:
+        python -m espaCy corpus.jsonl --output corrected.jsonl --processes 8 --chunk-size 1000
+
+        python -m espaCy documents.tsv --mode docs --offset 250000 >> corrected.jsonl
+    """
+    parser = argparse.ArgumentParser(prog='python -m espaCy',
+                                     description='Corrects the part of speech tags of a corpus with espaCy.')
+    parser.add_argument('input', help="The corpus file, '-' for the standard input")
+    parser.add_argument('--output', default='-', help="The output file, '-' for the standard output (default)")
+    parser.add_argument('--format', choices=['jsonl', 'tsv'], default=None,
+                        help='The format of the input and output, guessed from the input file extension by default')
+    parser.add_argument('--mode', choices=['rows', 'docs'], default='rows',
+                        help='rows: (word, pos, phrase) records (default), docs: raw documents')
+    parser.add_argument('--processes', type=int, default=1, help='The number of worker processes (default 1)')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='The number of records sent to a worker at once (default 1000)')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='The number of texts processed together by nlp.pipe (default 64)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write the chunks as soon as they are corrected instead of in input order')
+    parser.add_argument('--offset', type=int, default=0,
+                        help='The number of input records to be skipped, to resume an interrupted run')
+    parser.add_argument('--report-every', type=float, default=10.0,
+                        help='The seconds between throughput reports on the standard error, 0 to disable them')
+    parser.add_argument('--strict', action='store_true',
+                        help='Stop at the first malformed input line instead of skipping it with a warning')
+    parser.add_argument('--model', default=None, help='The spaCy model to be used')
+    parser.add_argument('--profile', choices=sorted(NLP_PROFILES), default=None,
+                        help="The spaCy pipeline profile, 'tagger' loads only the components that assign the pos tags")
+    parser.add_argument('--cache-name', default=DEFAULT_CACHE_NAME, help='The name of the cache to be used')
+    arguments = parser.parse_args(arguments)
+
+    corpus_format = arguments.format or get_corpus_format(arguments.input)
+
+    input_file = sys.stdin if arguments.input == '-' else open(arguments.input, 'r', encoding='utf-8')
+    output_file = sys.stdout if arguments.output == '-' else open(arguments.output, 'a', encoding='utf-8')
+
+    try:
+        run_corpus(input_file, output_file, corpus_format, arguments.mode, arguments.processes, arguments.chunk_size,
+                   arguments.batch_size, not arguments.unordered, arguments.offset, arguments.report_every,
+                   arguments.model, arguments.cache_name, arguments.profile, arguments.strict)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+def run_corpus(input_file, output_file, corpus_format, mode, processes, chunk_size, batch_size, ordered, offset,
+               report_every, model_name, cache_name, profile=None, strict=False):
+    """
+    Corrects a corpus read from a file object and writes the results to another one.
+    Every output record carries the offset of its input record, so an interrupted run can be resumed with
+    offset set to the last written offset + 1 (with ordered output, the last line of the output file).
+    Offsets count the valid records only, so skipped malformed lines do not shift them.
+
+    Parameters:
+        input_file: The file object the corpus is read from.
+        output_file: The file object the results are written to.
+        corpus_format (str): 'jsonl' or 'tsv'.
+        mode (str): 'rows' for (word, pos, phrase) records, 'docs' for raw documents.
+        processes (int): The number of worker processes. With 1, the corpus is corrected in this process.
+        chunk_size (int): The number of records sent to a worker at once.
+        batch_size (int): The number of texts processed together by nlp.pipe.
+        ordered (bool): If True, the results are written in input order.
+        offset (int): The number of input records to be skipped.
+        report_every (float): The seconds between throughput reports, 0 to disable them.
+        model_name (str): The spaCy model to be used, None for the default one.
+        cache_name (str): The name of the cache to be used.
+        profile (str): The spaCy pipeline profile, None for the default one.
+        strict (bool): If True, a malformed input line raises a ValueError instead of being skipped with a warning.
+
+    Returns:
+        corrected_records (int): The number of records corrected.
+
+    Example:
+        >>> run_corpus(open('corpus.jsonl'), sys.stdout, 'jsonl', 'rows', 4, 1000, 64, True, 0, 10.0, None, 'default')
+        {"offset": 0, "word": "casa", "pos": "NOUN", "corrected_pos": "ADJ"}
+        ...
+    """
+    records = itertools.islice(read_corpus(input_file, corpus_format, mode, strict), offset, None)
+    chunks = ((chunk_offset, mode, batch_size, cache_name, chunk)
+              for chunk_offset, chunk in iterate_chunks(records, offset, chunk_size))
+
+    corrected_records = 0
+    start_time = last_report_time = time.monotonic()
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initialize_corpus_worker, (model_name, cache_name, profile))
+        results = iterate_pool_results(pool, correct_corpus_chunk, chunks, ordered, processes * 2)
+    else:
+        pool = None
+        initialize_corpus_worker(model_name, cache_name, profile)
+        results = map(correct_corpus_chunk, chunks)
+
+    try:
+        for chunk_offset, corrected_chunk in results:
+            for record_offset, result in enumerate(corrected_chunk, chunk_offset):
+                output_file.write(format_corpus_result(record_offset, result, corpus_format) + '\n')
+            output_file.flush()
+
+            corrected_records += len(corrected_chunk)
+
+            now = time.monotonic()
+            if report_every and now - last_report_time >= report_every:
+                report_throughput(corrected_records, now - start_time)
+                last_report_time = now
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    if report_every:
+        report_throughput(corrected_records, time.monotonic() - start_time)
+
+    return corrected_records
+
+
+def iterate_pool_results(pool, function, tasks, ordered, max_pending):
+    """
+    Applies a function to a stream of tasks in a process pool and yields the results, keeping at most max_pending
+    tasks submitted and not yet yielded, so the tasks are only read as fast as the workers consume them
+    (Pool.imap reads the whole stream ahead of the workers).
+
+    Parameters:
+        pool (Pool): The process pool.
+        function (function): The function applied to each task.
+        tasks (iterable): The tasks.
+        ordered (bool): If True, the results are yielded in the order of the tasks, otherwise as soon as they are ready.
+        max_pending (int): The maximum number of tasks submitted and not yet yielded.
+
+    Example:
+        >>> list(iterate_pool_results(pool, abs, iter([-1, -2, -3]), True, 2))
+
+        [1, 2, 3]
+    """
+    pending = collections.deque()
+    # The results (or exceptions) of the tasks in the order they are ready, only used for unordered results
+    completed = queue.Queue()
+
+    def next_result():
+        if ordered:
+            return pending.popleft().get()
+
+        pending.pop()
+        result = completed.get()
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    for task in tasks:
+        if ordered:
+            pending.append(pool.apply_async(function, (task,)))
+        else:
+            pending.append(pool.apply_async(function, (task,), callback=completed.put, error_callback=completed.put))
+
+        if len(pending) >= max_pending:
+            yield next_result()
+
+    while pending:
+        yield next_result()
+
+
+def initialize_corpus_worker(model_name, cache_name, profile=None):
+    """
+    Loads the model and the cache of a worker process, once, before it receives its first chunk.
+
+    Example:
+        >>> initialize_corpus_worker('es_core_news_md', 'default', 'tagger')
+    """
+    if model_name:
+        set_default_model(model_name)
+
+    if profile:
+        set_default_profile(profile)
+
+    warm_up_nlp()
+    get_cache_index(cache_name)
+
+
+def correct_corpus_chunk(task):
+    """
+    Corrects a chunk of records.
+
+    Parameters:
+        task (tuple): The (chunk_offset, mode, batch_size, cache_name, records) of the chunk.
+
+    Returns:
+        chunk_offset (int): The offset of the first record of the chunk.
+        results (list): The result of each record of the chunk. The corrected pos of each row in 'rows' mode,
+            a (tokens, pos_tags, corrected_pos_tags) triple for each document in 'docs' mode.
+
+    Example:
+        >>> correct_corpus_chunk((0, 'rows', 64, 'default', [('casa', 'NOUN', 'la casa vieja')]))
+
+        (0, [('casa', 'NOUN', 'ADJ')])
+    """
+    # Imported here so the worker processes import the main module only once it is fully initialized
+    from espaCy import correct_doc, espacy_batch
+
+    chunk_offset, mode, batch_size, cache_name, records = task
+
+    if mode == 'rows':
+        corrected_pos_list = espacy_batch(records, batch_size=batch_size, cache_name=cache_name)
+        return chunk_offset, [(word, word_pos, corrected_pos)
+                              for (word, word_pos, _), corrected_pos in zip(records, corrected_pos_list)]
+
+    results = []
+    for doc in get_nlp().pipe(records, batch_size=batch_size):
+        results.append(([token.text for token in doc], [token.pos_ for token in doc], correct_doc(doc, cache_name)))
+
+    return chunk_offset, results
+
+
+def read_corpus(input_file, corpus_format, mode, strict=False):
+    """
+    Yields the records of a corpus file: a (word, pos, phrase) triple for each row in 'rows' mode,
+    the text of each document in 'docs' mode.
+    JSONL rows are objects with 'word', 'pos' and 'phrase' keys and JSONL documents objects with a 'text' key.
+    TSV rows have the word, the pos and the phrase separated by tabs and TSV documents take a whole line.
+    A malformed line is skipped with a warning on the standard error that gives its line number,
+    or raises a ValueError if strict is True.
+
+    Example:
+        >>> list(read_corpus(io.StringIO('casa\tNOUN\tla casa vieja\ncasa NOUN\n'), 'tsv', 'rows'))
+        espaCy: skipping line 2: expected 3 tab separated fields (word, pos, phrase), found 1
+
+        [('casa', 'NOUN', 'la casa vieja')]
+    """
+    for line_number, line in enumerate(input_file, 1):
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+
+        try:
+            record = parse_corpus_line(line, corpus_format, mode)
+        except ValueError as error:
+            if strict:
+                raise ValueError('Line ' + str(line_number) + ': ' + str(error)) from None
+            print('espaCy: skipping line ' + str(line_number) + ': ' + str(error), file=sys.stderr)
+            continue
+
+        yield record
+
+
+def parse_corpus_line(line, corpus_format, mode):
+    """
+    Returns the record of a line of a corpus file, see read_corpus.
+
+    Raises:
+        ValueError: If the line is not a valid record.
+
+    Example:
+        >>> parse_corpus_line('{"word": "casa", "pos": "NOUN", "phrase": "la casa vieja"}', 'jsonl', 'rows')
+
+        ('casa', 'NOUN', 'la casa vieja')
+    """
+    if corpus_format == 'jsonl':
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError('invalid JSON') from None
+
+        keys = ('word', 'pos', 'phrase') if mode == 'rows' else ('text',)
+        if not isinstance(record, dict) or not all(isinstance(record.get(key), str) for key in keys):
+            raise ValueError('expected an object with ' + ', '.join("'" + key + "'" for key in keys) + ' strings')
+
+        return tuple(record[key] for key in keys) if mode == 'rows' else record['text']
+
+    if mode == 'docs':
+        return line
+
+    fields = line.split('\t', 2)
+    if len(fields) != 3:
+        raise ValueError('expected 3 tab separated fields (word, pos, phrase), found ' + str(len(fields)))
+
+    return tuple(fields)
+
+
+def format_corpus_result(record_offset, result, corpus_format):
+    """
+    Returns the output line of a corrected record.
+
+    Example:
+        >>> format_corpus_result(0, ('casa', 'NOUN', 'ADJ'), 'jsonl')
+
+        '{"offset": 0, "word": "casa", "pos": "NOUN", "corrected_pos": "ADJ"}'
+
+        >>> format_corpus_result(0, ('casa', 'NOUN', 'ADJ'), 'tsv')
+
+        '0\tcasa\tNOUN\tADJ'
+    """
+    if len(result) == 3 and isinstance(result[0], str):
+        word, word_pos, corrected_pos = result
+        if corpus_format == 'jsonl':
+            return json.dumps({'offset': record_offset, 'word': word, 'pos': word_pos, 'corrected_pos': corrected_pos},
+                              ensure_ascii=False)
+        return '\t'.join([str(record_offset), word, word_pos, corrected_pos])
+
+    tokens, pos_tags, corrected_pos_tags = result
+    if corpus_format == 'jsonl':
+        return json.dumps({'offset': record_offset, 'tokens': tokens, 'pos': pos_tags,
+                           'corrected_pos': corrected_pos_tags}, ensure_ascii=False)
+    return '\t'.join([str(record_offset), ' '.join(tokens), ' '.join(pos_tags), ' '.join(corrected_pos_tags)])
+
+
+def iterate_chunks(records, offset, chunk_size):
+    """
+    Groups records in lists of chunk_size records, yielding each one with the offset of its first record.
+
+    Example:
+        >>> list(iterate_chunks(iter('abcde'), 10, 2))
+
+        [(10, ['a', 'b']), (12, ['c', 'd']), (14, ['e'])]
+    """
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def get_corpus_format(path):
+    """
+    Guesses the format of a corpus file from its extension: 'tsv' for .tsv and .tab files, 'jsonl' otherwise.
+
+    Example:
+        >>> get_corpus_format('corpus.tsv')
+
+        'tsv'
+    """
+    return 'tsv' if path.lower().endswith(('.tsv', '.tab')) else 'jsonl'
+
+
+def report_throughput(corrected_records, elapsed_seconds):
+    """
+    Prints the number of corrected records and the throughput on the standard error.
+
+    Example:
+        >>> report_throughput(120000, 60.0)
+        espaCy: 120000 records in 60.0 s (2000.0 records/s)
+    """
+    throughput = corrected_records / elapsed_seconds if elapsed_seconds else 0.0
+    print('espaCy: ' + str(corrected_records) + ' records in ' + str(round(elapsed_seconds, 1)) + ' s ('
+          + str(round(throughput, 1)) + ' records/s)', file=sys.stderr)
@@ -0,0 +1,252 @@
+import argparse
+import json
+import sys
+
+import spacy.tokens
+
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME, add_patterns, compact_cache, configure_cache
+from modules.utils.spaCy_models import NLP_PROFILES, get_nlp, set_default_model, set_default_profile
+
+DEFAULT_MIN_SUPPORT = 2
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+
+def learn_patterns(sentences, batch_size=64, n_process=1, min_support=DEFAULT_MIN_SUPPORT,
+                   min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Learns cache patterns from an annotated corpus.
+    Each sentence is tagged by the model with its gold tokenization (the pipeline runs on Doc(nlp.vocab, words)),
+    streamed through nlp.pipe, and every token whose spaCy pos differs from its gold tag is aggregated as a
+    correction of its word (lowercased, as in correct_doc) in its spacy tag pattern (the pos of the previous word,
+    the word and the next word, as in the cache).
+    A correction is kept if its support, the number of distinct phrase contexts (previous word, word, next word)
+    where it was seen, is at least min_support, and if its confidence, the share of the occurrences of the word
+    in that pattern that have that gold tag, is at least min_confidence. The tokens without a gold tag are ignored.
+    Only the phrase contexts of the kept corrections reach the cache (see add_patterns), so only their support
+    is retained: the counts and confidences are computed on this corpus alone and are reported, not persisted,
+    and learning from another corpus later applies the thresholds to that corpus alone.
+
+    Parameters:
+        sentences (iterable): (words, gold_tags) pairs, see read_annotated_corpus.
+        batch_size (int): The number of sentences processed together by nlp.pipe.
+        n_process (int): The number of processes used by nlp.pipe.
+        min_support (int): The minimum number of distinct phrase contexts of a correction.
+        min_confidence (float): The minimum share of the occurrences of the pattern with the corrected tag.
+
+    Returns:
+        entries (dict): The learned patterns, with the same structure as the cache dict (see add_patterns).
+        report (list): A (word, spacy_tag_pattern, corrected_pos, count, support, confidence) tuple for each
+            learned pattern, sorted by support. Only the report has the counts and confidences.
+
+    Example:
+        >>> entries, report = learn_patterns(read_annotated_corpus(open('corpus.conllu'), 'conllu'))
+        >>> entries
+
+        {'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja', 'una casa blanca']}}}
+    """
+    nlp = get_nlp()
+
+    # (word, spacy_tag_pattern) -> occurrences
+    pattern_counts = {}
+    # (word, spacy_tag_pattern, gold_tag) -> [occurrences, {phrase context: None}]
+    corrections = {}
+
+    docs = nlp.pipe(((spacy.tokens.Doc(nlp.vocab, words=list(words)), gold_tags) for words, gold_tags in sentences),
+                    batch_size=batch_size, n_process=n_process, as_tuples=True)
+
+    for doc, gold_tags in docs:
+        pos_tags = [token.pos_ for token in doc]
+        words = [token.text for token in doc]
+
+        for index, gold_tag in enumerate(gold_tags):
+            word = words[index].lower()
+            spacy_tag_pattern = ' '.join(pos_tags[max(0, index - 1):index + 2])
+
+            # The tokens without a gold tag tell nothing about the pattern, so they do not count for its confidence
+            if not gold_tag:
+                continue
+
+            pattern_key = word, spacy_tag_pattern
+            pattern_counts[pattern_key] = pattern_counts.get(pattern_key, 0) + 1
+
+            if gold_tag == pos_tags[index]:
+                continue
+
+            correction = corrections.setdefault(pattern_key + (gold_tag,), [0, {}])
+            correction[0] += 1
+            correction[1][' '.join(words[max(0, index - 1):index + 2])] = None
+
+    return select_learned_patterns(pattern_counts, corrections, min_support, min_confidence)
+
+
+def select_learned_patterns(pattern_counts, corrections, min_support, min_confidence):
+    """
+    Keeps the corrections that reach the support and confidence thresholds (see learn_patterns)
+    and returns them as cache entries and as a report.
+    The cache entries only carry the phrase contexts of each correction (its support); the count and the
+    confidence are only part of the report.
+
+    Example:
+        >>> select_learned_patterns({('casa', 'DET NOUN ADJ'): 3}, {('casa', 'DET NOUN ADJ', 'ADJ'): [2, {'la casa vieja': None, 'una casa roja': None}]}, 2, 0.5)
+
+        ({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja', 'una casa roja']}}}, [('casa', 'DET NOUN ADJ', 'ADJ', 2, 2, 0.6667)])
+    """
+    report = []
+
+    for (word, spacy_tag_pattern, gold_tag), (count, phrases) in corrections.items():
+        support = len(phrases)
+        confidence = count / pattern_counts[(word, spacy_tag_pattern)]
+
+        if support >= min_support and confidence >= min_confidence:
+            report.append((word, spacy_tag_pattern, gold_tag, count, support, round(confidence, 4)))
+
+    report.sort(key=lambda row: (-row[4], -row[3], row[0], row[1], row[2]))
+
+    entries = {}
+    for word, spacy_tag_pattern, gold_tag, _, _, _ in report:
+        phrases = corrections[(word, spacy_tag_pattern, gold_tag)][1]
+        entries.setdefault(word, {}).setdefault(spacy_tag_pattern, {})[gold_tag] = list(phrases)
+
+    return entries, report
+
+
+def read_annotated_corpus(file, corpus_format):
+    """
+    Yields the (words, gold_tags) pair of each sentence of an annotated corpus.
+    CoNLL-U files take the FORM and UPOS columns of each word line (multiword token ranges and empty nodes
+    are skipped). JSONL files have an object for each sentence, with 'words' and 'tags' (or 'pos') lists.
+    An unknown tag ('_' in CoNLL-U, null in JSONL) is read as ''.
+    A malformed JSONL line is skipped with a warning on the standard error that gives its line number.
+
+    Example:
+        >>> list(read_annotated_corpus(io.StringIO('1\tla\tel\tDET\t_\t_\t2\tdet\t_\t_\n2\tcasa\tcasa\tNOUN\t_\t_\t0\troot\t_\t_\n'), 'conllu'))
+
+        [(['la', 'casa'], ['DET', 'NOUN'])]
+    """
+    if corpus_format == 'jsonl':
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+
+            try:
+                sentence = parse_annotated_sentence(line)
+            except ValueError as error:
+                print('espaCy: skipping line ' + str(line_number) + ': ' + str(error), file=sys.stderr)
+                continue
+
+            yield sentence
+        return
+
+    words, gold_tags = [], []
+    for line in file:
+        line = line.rstrip('\n')
+
+        if not line.strip():
+            if words:
+                yield words, gold_tags
+                words, gold_tags = [], []
+            continue
+
+        if line.startswith('#'):
+            continue
+
+        columns = line.split('\t')
+        if '-' in columns[0] or '.' in columns[0]:
+            continue
+
+        words.append(columns[1])
+        gold_tags.append(columns[3] if columns[3] != '_' else '')
+
+    if words:
+        yield words, gold_tags
+
+
+def parse_annotated_sentence(line):
+    """
+    Parses a JSONL line of an annotated corpus into its (words, gold_tags) pair.
+
+    Raises:
+        ValueError: If the line is not a JSON object with a list of words and a list of as many tags.
+
+    Example:
+        >>> parse_annotated_sentence('{"words": ["la", "casa"], "tags": ["DET", null]}')
+
+        (['la', 'casa'], ['DET', ''])
+    """
+    try:
+        sentence = json.loads(line)
+    except ValueError as error:
+        raise ValueError('invalid JSON: ' + str(error)) from None
+
+    if not isinstance(sentence, dict):
+        raise ValueError('expected a JSON object')
+
+    words = sentence.get('words')
+    gold_tags = sentence.get('tags', sentence.get('pos'))
+
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        raise ValueError("expected a 'words' list of strings")
+    if not isinstance(gold_tags, list) or not all(tag is None or isinstance(tag, str) for tag in gold_tags):
+        raise ValueError("expected a 'tags' (or 'pos') list of strings")
+    if len(words) != len(gold_tags):
+        raise ValueError('found ' + str(len(words)) + ' words and ' + str(len(gold_tags)) + ' tags')
+
+    return words, [tag if tag is not None and tag != '_' else '' for tag in gold_tags]
+
+
+def write_learning_report(report, file):
+    """
+    Writes the report of learn_patterns as a tab separated table.
+
+    Example:
+        >>> write_learning_report(report, sys.stdout)
+        word	spacy_tag_pattern	corrected_pos	count	support	confidence
+        casa	DET NOUN ADJ	ADJ	2	2	0.6667
+    """
+    file.write('word\tspacy_tag_pattern\tcorrected_pos\tcount\tsupport\tconfidence\n')
+    for row in report:
+        file.write('\t'.join(str(value) for value in row) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Learns espaCy cache patterns from an annotated corpus.')
+    parser.add_argument('input', help="The CoNLL-U or JSONL corpus file, '-' for the standard input")
+    parser.add_argument('--format', choices=['conllu', 'jsonl'], default=None,
+                        help='The format of the corpus, guessed from the file extension by default')
+    parser.add_argument('--min-support', type=int, default=DEFAULT_MIN_SUPPORT,
+                        help='The minimum number of distinct phrase contexts of a learned pattern')
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help='The minimum share of the occurrences of a pattern with the corrected tag')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--processes', type=int, default=1, help='The number of processes used by nlp.pipe')
+    parser.add_argument('--dry-run', action='store_true', help='Only write the report, without changing the cache')
+    parser.add_argument('--compact', action='store_true', help='Write the learned patterns to the caché.txt table')
+    parser.add_argument('--model', default=None, help='The spaCy model to be used')
+    parser.add_argument('--profile', choices=sorted(NLP_PROFILES), default=None, help='The spaCy pipeline profile')
+    parser.add_argument('--cache-name', default=DEFAULT_CACHE_NAME, help='The name of the cache')
+    parser.add_argument('--path', default=None, help='The path of the caché.txt file of the cache')
+    arguments = parser.parse_args()
+
+    if arguments.model:
+        set_default_model(arguments.model)
+
+    if arguments.profile:
+        set_default_profile(arguments.profile)
+
+    if arguments.path:
+        configure_cache(arguments.cache_name, arguments.path)
+
+    corpus_format = arguments.format or ('jsonl' if arguments.input.lower().endswith('.jsonl') else 'conllu')
+    input_file = sys.stdin if arguments.input == '-' else open(arguments.input, 'r', encoding='utf-8')
+
+    with input_file:
+        learned_entries, learning_report = learn_patterns(read_annotated_corpus(input_file, corpus_format),
+                                                          arguments.batch_size, arguments.processes,
+                                                          arguments.min_support, arguments.min_confidence)
+
+    write_learning_report(learning_report, sys.stdout)
+
+    if not arguments.dry_run:
+        add_patterns(learned_entries, arguments.cache_name)
+        if arguments.compact:
+            compact_cache(False, arguments.cache_name)
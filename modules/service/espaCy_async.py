@@ -0,0 +1,132 @@
+import asyncio
+import concurrent.futures
+
+from espaCy import espacy_batch
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME
+
+
+class AsyncCorrector:
+    """
+    An asyncio front end of espacy_batch.
+    Concurrent 'await corrector.correct(word, word_pos, phrase)' calls are coalesced into micro-batches,
+    which are corrected on an executor (so the spaCy parse does not block the event loop) and whose results
+    resolve the future of each call individually.
+    A batch is sent as soon as it has max_batch_size items or max_wait seconds after its first item arrived,
+    whatever happens first.
+    By default the batches run on a single worker thread, because a spaCy pipeline must not be used by two
+    threads at once. Any concurrent.futures executor can be given instead (e.g. a ProcessPoolExecutor).
+
+    Example:
+        >>> corrector = AsyncCorrector(max_batch_size=64, max_wait=0.005)
+        >>> await corrector.correct('casa', 'NOUN', 'la casa vieja')
+
+        'ADJ'
+
+        >>> await asyncio.gather(*(corrector.correct(word, pos, phrase) for word, pos, phrase in items))
+
+        ['ADJ', 'DET', 'NOUN']
+
+        >>> await corrector.close()
+    """
+
+    def __init__(self, max_batch_size=64, max_wait=0.005, executor=None, batch_size=64, cache_name=DEFAULT_CACHE_NAME):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_size = batch_size
+        self.cache_name = cache_name
+
+        self._own_executor = executor is None
+        self._executor = executor or concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                           thread_name_prefix='espacy')
+        self._pending_items = []
+        self._pending_futures = []
+        self._flush_handle = None
+        self._running_batches = set()
+
+    async def correct(self, word, word_pos, phrase):
+        """
+        Returns the corrected part of speech of a word, the same one espacy returns for it.
+
+        Example:
+            >>> await corrector.correct('casa', 'NOUN', 'la casa vieja')
+
+            'ADJ'
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self._pending_items.append((word, word_pos, phrase))
+        self._pending_futures.append(future)
+
+        if len(self._pending_items) >= self.max_batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self.flush)
+
+        return await future
+
+    async def correct_batch(self, items):
+        """
+        Returns the corrected part of speech of each (word, word_pos, phrase) item, in the same order as the input.
+        The items share the micro-batches of the concurrent correct calls.
+
+        Example:
+            >>> await corrector.correct_batch([('el', 'DET', 'el perro'), ('perro', 'NOUN', 'el perro')])
+
+            ['DET', 'NOUN']
+        """
+        return list(await asyncio.gather(*(self.correct(word, word_pos, phrase) for word, word_pos, phrase in items)))
+
+    def flush(self):
+        """
+        Sends the pending items to the executor as a batch, without waiting for max_wait.
+
+        Example:
+            >>> corrector.flush()
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending_items:
+            return
+
+        items, futures = self._pending_items, self._pending_futures
+        self._pending_items, self._pending_futures = [], []
+
+        batch = asyncio.ensure_future(self._run_batch(items, futures))
+        self._running_batches.add(batch)
+        batch.add_done_callback(self._running_batches.discard)
+
+    async def close(self):
+        """
+        Corrects the pending items, waits for the running batches and shuts down the executor,
+        if it was created by the corrector.
+
+        Example:
+            >>> await corrector.close()
+        """
+        self.flush()
+
+        if self._running_batches:
+            await asyncio.gather(*self._running_batches, return_exceptions=True)
+
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
+
+    async def _run_batch(self, items, futures):
+        loop = asyncio.get_running_loop()
+
+        try:
+            corrected_pos_list = await loop.run_in_executor(self._executor, espacy_batch, items, self.batch_size, 1,
+                                                            self.cache_name)
+        except Exception as exception:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+
+        for future, corrected_pos in zip(futures, corrected_pos_list):
+            # The caller may have been cancelled while the batch was running
+            if not future.done():
+                future.set_result(corrected_pos)
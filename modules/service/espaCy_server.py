@@ -0,0 +1,239 @@
+import argparse
+import json
+import sys
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from espaCy import espacy, espacy_batch
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME, get_cache_index
+from modules.utils.spaCy_models import NLP_PROFILES, set_default_model, set_default_profile, warm_up_nlp
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+
+
+class EspacyServer(ThreadingHTTPServer):
+    """
+    A local HTTP server around espacy, which loads the model and the cache once and keeps them warm.
+
+    Endpoints:
+        GET /health: 200 while the server is running.
+        GET /ready: 200 once the model and the cache are loaded, 503 before.
+        POST /correct: {"word": ..., "pos": ..., "phrase": ...} -> {"corrected_pos": ...}
+        POST /correct_batch: {"items": [{"word": ..., "pos": ..., "phrase": ...}, ...]}
+            -> {"corrected_pos": [...]}, corrected with espacy_batch, so repeated phrases are analyzed once.
+
+    The requests are handled in threads, but the corrections run one at a time,
+    because a spaCy pipeline must not be used by two threads at once.
+
+    Example:
+        >>> server = EspacyServer(('127.0.0.1', 8080))
+        >>> server.warm_up_in_background()
+        >>> server.serve_forever()
+
+        $ curl -d '{"word": "casa", "pos": "NOUN", "phrase": "la casa vieja"}' http://127.0.0.1:8080/correct
+
+        {"corrected_pos": "ADJ"}
+    """
+    daemon_threads = True
+
+    def __init__(self, server_address, model_name=None, cache_name=DEFAULT_CACHE_NAME, batch_size=64, profile=None):
+        super().__init__(server_address, EspacyRequestHandler)
+        self.model_name = model_name
+        self.profile = profile
+        self.cache_name = cache_name
+        self.batch_size = batch_size
+        self.ready = threading.Event()
+        self.correction_lock = threading.Lock()
+        self.warm_up_error = None
+
+    def warm_up(self):
+        """
+        Loads the model and the cache, and flips the readiness of the server.
+
+        Example:
+            >>> server.warm_up()
+        """
+        try:
+            if self.model_name:
+                set_default_model(self.model_name)
+
+            if self.profile:
+                set_default_profile(self.profile)
+
+            warm_up_nlp()
+            get_cache_index(self.cache_name)
+        except Exception as exception:
+            self.warm_up_error = exception
+            raise
+
+        self.ready.set()
+
+    def warm_up_in_background(self):
+        """
+        Loads the model and the cache in a background thread, so the server answers /health and /ready meanwhile.
+
+        Example:
+            >>> server.warm_up_in_background()
+        """
+        thread = threading.Thread(target=self.warm_up, name='espacy-warm-up', daemon=True)
+        thread.start()
+
+        return thread
+
+    def correct(self, word, word_pos, phrase):
+        """
+        Returns the corrected part of speech of a word, the same one espacy returns for it.
+
+        Example:
+            >>> server.correct('casa', 'NOUN', 'la casa vieja')
+
+            'ADJ'
+        """
+        with self.correction_lock:
+            return espacy(word, word_pos, phrase, self.cache_name)
+
+    def correct_batch(self, items):
+        """
+        Returns the corrected part of speech of each (word, word_pos, phrase) item, the same ones espacy_batch returns.
+
+        Example:
+            >>> server.correct_batch([('el', 'DET', 'el perro'), ('perro', 'NOUN', 'el perro')])
+
+            ['DET', 'NOUN']
+        """
+        with self.correction_lock:
+            return espacy_batch(items, batch_size=self.batch_size, cache_name=self.cache_name)
+
+
+class EspacyRequestHandler(BaseHTTPRequestHandler):
+    """
+    The request handler of EspacyServer.
+    """
+    server_version = 'espaCy'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        elif self.path == '/ready':
+            if self.server.ready.is_set():
+                self.send_json(200, {'status': 'ready'})
+            elif self.server.warm_up_error is not None:
+                self.send_json(503, {'status': 'failed', 'error': str(self.server.warm_up_error)})
+            else:
+                self.send_json(503, {'status': 'warming up'})
+        else:
+            self.send_json(404, {'error': 'Not found: ' + self.path})
+
+    def do_POST(self):
+        if self.path not in ('/correct', '/correct_batch'):
+            self.send_json(404, {'error': 'Not found: ' + self.path})
+            return
+
+        if not self.server.ready.is_set():
+            self.send_json(503, {'error': 'The server is warming up'})
+            return
+
+        try:
+            request = self.read_json()
+
+            if self.path == '/correct':
+                items = [parse_correction_item(request)]
+            else:
+                items = [parse_correction_item(item) for item in request['items']]
+        except (ValueError, KeyError, TypeError) as exception:
+            self.send_json(400, {'error': 'Invalid request: ' + str(exception)})
+            return
+
+        try:
+            if self.path == '/correct':
+                response = {'corrected_pos': self.server.correct(*items[0])}
+            else:
+                response = {'corrected_pos': self.server.correct_batch(items)}
+        except Exception as exception:
+            # A valid request that can not be corrected is a failure of the server: it is logged and answered with a 500
+            print('espaCy: error handling POST ' + self.path, file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            self.send_json(500, {'error': 'Internal server error: ' + type(exception).__name__})
+            return
+
+        self.send_json(200, response)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length > MAX_REQUEST_SIZE:
+            raise ValueError('the request is larger than ' + str(MAX_REQUEST_SIZE) + ' bytes')
+
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def send_json(self, status, content):
+        body = json.dumps(content, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # The access log is too noisy for a correction service, errors are answered in the responses
+        # and internal errors are logged by do_POST
+        pass
+
+
+def parse_correction_item(item):
+    """
+    Returns the (word, word_pos, phrase) triple of a correction request,
+    given as an object with 'word', 'pos' and 'phrase' keys or as a [word, pos, phrase] list.
+
+    Example:
+        >>> parse_correction_item({'word': 'casa', 'pos': 'NOUN', 'phrase': 'la casa vieja'})
+
+        ('casa', 'NOUN', 'la casa vieja')
+    """
+    if isinstance(item, dict):
+        word, word_pos, phrase = item['word'], item['pos'], item['phrase']
+    else:
+        word, word_pos, phrase = item
+
+    if not all(isinstance(value, str) for value in (word, word_pos, phrase)):
+        raise TypeError('word, pos and phrase must be strings')
+
+    return word, word_pos, phrase
+
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, model_name=None, cache_name=DEFAULT_CACHE_NAME, batch_size=64,
+               profile=None):
+    """
+    Starts an EspacyServer, warms it up in the background and serves requests until it is interrupted.
+
+    Example:
+        >>> run_server('127.0.0.1', 8080)
+    """
+    server = EspacyServer((host, port), model_name, cache_name, batch_size, profile)
+    server.warm_up_in_background()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serves espaCy corrections over HTTP.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--model', default=None, help='The spaCy model to be used')
+    parser.add_argument('--profile', choices=sorted(NLP_PROFILES), default=None,
+                        help="The spaCy pipeline profile, 'tagger' loads only the components that assign the pos tags")
+    parser.add_argument('--cache-name', default=DEFAULT_CACHE_NAME, help='The name of the cache to be used')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='The number of phrases processed together by nlp.pipe in /correct_batch')
+    arguments = parser.parse_args()
+
+    run_server(arguments.host, arguments.port, arguments.model, arguments.cache_name, arguments.batch_size,
+               arguments.profile)
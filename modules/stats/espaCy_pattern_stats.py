@@ -0,0 +1,215 @@
+import argparse
+import sys
+
+import numpy
+
+from modules.cache.espaCy_cache import DEFAULT_CACHE_NAME, configure_cache, get_cache_snapshot
+from modules.cli.espaCy_corpus import get_corpus_format, read_corpus
+from modules.utils.spaCy_models import get_nlp, set_default_model
+
+# Bits of each pos tag in an encoded (word, previous_word_pos, word_pos, next_word_pos) context.
+# spaCy pos symbol ids are lower than 256, and 0 (no pos) marks a missing previous or next word.
+POS_BITS = 8
+POS_MASK = (1 << POS_BITS) - 1
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def compute_pattern_statistics(texts, cache_name=DEFAULT_CACHE_NAME, batch_size=64, n_process=1,
+                               chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Runs the model over a corpus and counts the (previous_word_pos, word_pos, next_word_pos) contexts
+    of every occurrence of the words of a cache.
+    The tokens of each chunk of documents are encoded as integer arrays (the word, taken lowercased as in
+    correct_doc, as its position in the sorted cached words, the tags as spaCy pos ids), each context is packed in
+    a single integer and the contexts are counted with numpy.unique and numpy.bincount, so the counting cost does
+    not grow with the number of cached words.
+
+    Parameters:
+        texts (iterable): The documents of the corpus.
+        cache_name (str): The name of the cache whose words are counted.
+        batch_size (int): The number of documents processed together by nlp.pipe.
+        n_process (int): The number of processes used by nlp.pipe.
+        chunk_size (int): The number of documents encoded and counted at once.
+
+    Returns:
+        dict: The statistics, see build_pattern_report for their structure.
+
+    Example:
+        >>> statistics = compute_pattern_statistics(open('corpus.txt'))
+        >>> statistics['patterns'][0]
+
+        ('casa', 'DET', 'NOUN', 'ADJ', 1520, True)
+    """
+    nlp = get_nlp()
+    cache_index = get_cache_snapshot(cache_name)[1]
+
+    words = sorted(key for key in cache_index if isinstance(key, str))
+    word_hashes = numpy.array([nlp.vocab.strings.add(word) for word in words], dtype=numpy.uint64)
+    word_order = numpy.argsort(word_hashes)
+    sorted_word_hashes = word_hashes[word_order]
+
+    codes = numpy.zeros(0, dtype=numpy.int64)
+    counts = numpy.zeros(0, dtype=numpy.int64)
+
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    while True:
+        chunk = [doc.to_array(['LOWER', 'POS']) for _, doc in zip(range(chunk_size), docs)]
+        if not chunk:
+            break
+
+        chunk_codes = encode_chunk_contexts(chunk, sorted_word_hashes, word_order)
+        codes, counts = merge_context_counts(codes, counts, *numpy.unique(chunk_codes, return_counts=True))
+
+    return build_pattern_report(codes, counts, words, cache_index, nlp.vocab.strings)
+
+
+def encode_chunk_contexts(doc_arrays, sorted_word_hashes, word_order):
+    """
+    Returns the encoded context of every token of a chunk of documents whose word is cached.
+    Each document is given as the (LOWER, POS) array returned by Doc.to_array. The code of a context is
+    word_index << 3 * POS_BITS | previous_word_pos << 2 * POS_BITS | word_pos << POS_BITS | next_word_pos.
+
+    Example:
+        >>> encode_chunk_contexts([doc.to_array(['LOWER', 'POS'])], sorted_word_hashes, word_order)
+
+        array([1664], dtype=int64)
+    """
+    doc_arrays = [doc_array for doc_array in doc_arrays if len(doc_array)]
+    if not doc_arrays or not len(sorted_word_hashes):
+        return numpy.zeros(0, dtype=numpy.int64)
+
+    tokens = numpy.concatenate(doc_arrays)
+    lower_hashes = tokens[:, 0].astype(numpy.uint64)
+    pos = tokens[:, 1].astype(numpy.int64) & POS_MASK
+
+    # The previous word of the first token and the next word of the last token of each document are missing
+    doc_ends = numpy.cumsum([len(doc_array) for doc_array in doc_arrays])
+    doc_starts = doc_ends - numpy.array([len(doc_array) for doc_array in doc_arrays])
+    previous_pos = numpy.roll(pos, 1)
+    previous_pos[doc_starts] = 0
+    next_pos = numpy.roll(pos, -1)
+    next_pos[doc_ends - 1] = 0
+
+    positions = numpy.searchsorted(sorted_word_hashes, lower_hashes)
+    positions[positions == len(sorted_word_hashes)] = 0
+    cached = sorted_word_hashes[positions] == lower_hashes
+    word_indexes = word_order[positions[cached]].astype(numpy.int64)
+
+    return (word_indexes << 3 * POS_BITS) | (previous_pos[cached] << 2 * POS_BITS) | (pos[cached] << POS_BITS) \
+        | next_pos[cached]
+
+
+def merge_context_counts(codes, counts, new_codes, new_counts):
+    """
+    Adds the counts of a chunk to the accumulated ones. Both are given as sorted unique codes and their counts.
+
+    Example:
+        >>> merge_context_counts(numpy.array([1, 5]), numpy.array([2, 1]), numpy.array([5, 7]), numpy.array([3, 1]))
+
+        (array([1, 5, 7]), array([2, 4, 1]))
+    """
+    merged_codes, inverse = numpy.unique(numpy.concatenate([codes, new_codes]), return_inverse=True)
+    merged_counts = numpy.bincount(inverse.ravel(), weights=numpy.concatenate([counts, new_counts]),
+                                   minlength=len(merged_codes))
+
+    return merged_codes, merged_counts.astype(numpy.int64)
+
+
+def build_pattern_report(codes, counts, words, cache_index, strings):
+    """
+    Decodes the counted contexts into a ranked report.
+
+    Returns:
+        dict: The report, with the keys:
+            'patterns': (word, previous_word_pos, word_pos, next_word_pos, count, cached) tuples, sorted by count,
+                cached being True if the context is in the cache. The frequent contexts that are not cached are
+                the candidates to be added.
+            'unused_patterns': (word, previous_word_pos, word_pos, next_word_pos) contexts of the cache that never
+                appear in the corpus, the candidates to be pruned.
+            'words': word -> (occurrences, occurrences whose context is cached), for every cached word of the corpus.
+
+    Example:
+        >>> build_pattern_report(codes, counts, words, cache_index, nlp.vocab.strings)['words']
+
+        {'casa': (1800, 1520)}
+    """
+    order = numpy.lexsort((codes, -counts))
+
+    patterns = []
+    word_counts = {}
+    seen_contexts = set()
+
+    for code, count in zip(codes[order].tolist(), counts[order].tolist()):
+        word = words[code >> 3 * POS_BITS]
+        context = (word,) + tuple(strings[tag] if tag else ''
+                                  for tag in ((code >> 2 * POS_BITS) & POS_MASK, (code >> POS_BITS) & POS_MASK,
+                                              code & POS_MASK))
+        cached = context in cache_index
+        seen_contexts.add(context)
+
+        patterns.append(context + (count, cached))
+
+        occurrences, cached_occurrences = word_counts.get(word, (0, 0))
+        word_counts[word] = occurrences + count, cached_occurrences + (count if cached else 0)
+
+    unused_patterns = sorted(key for key in cache_index if isinstance(key, tuple) and key not in seen_contexts)
+
+    return {'patterns': patterns, 'unused_patterns': unused_patterns, 'words': word_counts}
+
+
+def write_pattern_report(report, file, top=None, min_count=1):
+    """
+    Writes a pattern report as tab separated tables: the ranked contexts, the cache coverage of each word
+    and the unused patterns of the cache.
+
+    Example:
+        >>> write_pattern_report(report, sys.stdout, top=2)
+        # patterns
+        word	previous_pos	pos	next_pos	count	cached
+        casa	DET	NOUN	ADJ	1520	yes
+        casa	DET	NOUN	ADP	210	no
+        ...
+    """
+    file.write('# patterns\nword\tprevious_pos\tpos\tnext_pos\tcount\tcached\n')
+    patterns = [pattern for pattern in report['patterns'] if pattern[4] >= min_count]
+    for word, previous_pos, pos, next_pos, count, cached in patterns[:top]:
+        file.write('\t'.join([word, previous_pos, pos, next_pos, str(count), 'yes' if cached else 'no']) + '\n')
+
+    file.write('\n# words\nword\toccurrences\tcached_occurrences\thit_rate\n')
+    for word, (occurrences, cached_occurrences) in sorted(report['words'].items(), key=lambda item: -item[1][0]):
+        file.write('\t'.join([word, str(occurrences), str(cached_occurrences),
+                              str(round(cached_occurrences / occurrences, 4))]) + '\n')
+
+    file.write('\n# unused patterns\nword\tprevious_pos\tpos\tnext_pos\n')
+    for context in report['unused_patterns']:
+        file.write('\t'.join(context) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Counts the contexts of the cached words in a corpus.')
+    parser.add_argument('input', help="The corpus file (JSONL with a 'text' key or one document per line), '-' for the standard input")
+    parser.add_argument('--format', choices=['jsonl', 'tsv'], default=None,
+                        help='The format of the input, guessed from the file extension by default')
+    parser.add_argument('--top', type=int, default=None, help='The number of patterns written, all by default')
+    parser.add_argument('--min-count', type=int, default=1, help='The minimum count of the patterns written')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--processes', type=int, default=1, help='The number of processes used by nlp.pipe')
+    parser.add_argument('--model', default=None, help='The spaCy model to be used')
+    parser.add_argument('--cache-name', default=DEFAULT_CACHE_NAME, help='The name of the cache')
+    parser.add_argument('--path', default=None, help='The path of the caché.txt file of the cache')
+    arguments = parser.parse_args()
+
+    if arguments.model:
+        set_default_model(arguments.model)
+
+    if arguments.path:
+        configure_cache(arguments.cache_name, arguments.path, read_only=True)
+
+    corpus_format = arguments.format or get_corpus_format(arguments.input)
+    input_file = sys.stdin if arguments.input == '-' else open(arguments.input, 'r', encoding='utf-8')
+
+    with input_file:
+        statistics = compute_pattern_statistics(read_corpus(input_file, corpus_format, 'docs'), arguments.cache_name,
+                                                arguments.batch_size, arguments.processes)
+
+    write_pattern_report(statistics, sys.stdout, arguments.top, arguments.min_count)
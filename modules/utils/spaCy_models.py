@@ -0,0 +1,203 @@
+# pip3 install spacy
+import os
+import threading
+
+import spacy
+
+
+DEFAULT_SPACY_MODEL = 'es_core_news_md'
+SPACY_MODELS = ['es_core_news_sm', 'es_core_news_md', 'es_core_news_lg']
+
+# Pipeline profile -> components excluded when loading the model
+# The correction only reads token.pos_, which is assigned by the tok2vec, morphologizer (or tagger) and attribute_ruler
+NLP_PROFILES = {
+    'full': (),
+    'tagger': ('parser', 'ner', 'lemmatizer', 'senter'),
+}
+DEFAULT_NLP_PROFILE = 'full'
+
+_nlp_models = {}
+_nlp_models_lock = threading.Lock()
+_default_model_name = os.environ.get('ESPACY_SPACY_MODEL', DEFAULT_SPACY_MODEL)
+_default_profile = os.environ.get('ESPACY_SPACY_PROFILE', DEFAULT_NLP_PROFILE)
+
+
+def get_nlp(model_name=None, disable=None, profile=None):
+    """
+    Returns the spaCy Language object registered for the given model name, disabled pipes and profile.
+    The model is loaded lazily the first time it is requested and shared by every caller of the
+    process afterwards, so spacy.load is executed only once per (model_name, disable, profile) key.
+    The profile selects the components that are not loaded at all (see NLP_PROFILES): 'full' loads the whole
+    pipeline, 'tagger' only the components needed to assign the pos tags, so each phrase costs the tokenizer,
+    tok2vec and tagger only.
+
+    Parameters:
+        model_name (str): The spaCy model to be used. If None, the default model is used.
+        disable (list): The pipes to be disabled when loading the model.
+        profile (str): The pipeline profile, 'full' or 'tagger'. If None, the default profile is used.
+
+    Returns:
+        nlp: A spaCy Language object.
+
+    Example:
+        >>> get_nlp() is get_nlp()
+
+        True
+
+        >>> get_nlp('es_core_news_sm', profile='tagger').pipe_names
+
+        ['tok2vec', 'morphologizer', 'attribute_ruler']
+    """
+    key = get_nlp_key(model_name, disable, profile)
+    nlp = _nlp_models.get(key)
+
+    if nlp is None:
+        with _nlp_models_lock:
+            # Another thread may have loaded the model while we were waiting for the lock
+            nlp = _nlp_models.get(key)
+            if nlp is None:
+                nlp = spacy.load(key[0], disable=list(key[1]), exclude=list(NLP_PROFILES[key[2]]))
+                _nlp_models[key] = nlp
+
+    return nlp
+
+
+def get_nlp_key(model_name, disable, profile=None):
+    """
+    Returns the key used to store a model inside the registry.
+
+    Example:
+        >>> get_nlp_key(None, ['ner', 'parser'])
+
+        ('es_core_news_md', ('ner', 'parser'), 'full')
+    """
+    if model_name is None:
+        model_name = _default_model_name
+
+    if profile is None:
+        profile = _default_profile
+
+    if profile not in NLP_PROFILES:
+        raise ValueError('Unknown spaCy pipeline profile: ' + str(profile))
+
+    return model_name, tuple(sorted(disable or ())), profile
+
+
+def warm_up_nlp(model_name=None, disable=None, text='Esto es una prueba.', profile=None):
+    """
+    Loads the model (if it was not loaded yet) and processes a short text with it, so the first
+    real call does not pay the loading and initialization costs.
+
+    Parameters:
+        model_name (str): The spaCy model to be warmed up. If None, the default model is used.
+        disable (list): The pipes to be disabled when loading the model.
+        text (str): The text processed to warm up the pipeline.
+        profile (str): The pipeline profile. If None, the default profile is used.
+
+    Returns:
+        nlp: The warmed up spaCy Language object.
+
+    Example:
+        >>> warm_up_nlp()
+
+        <spacy.lang.es.Spanish object at 0x7f0b1c2d3e50>
+    """
+    nlp = get_nlp(model_name, disable, profile)
+    nlp(text)
+    return nlp
+
+
+def verify_nlp_profile(texts, model_name=None, profile='tagger'):
+    """
+    Compares the pos tags assigned by a pipeline profile with the ones assigned by the full pipeline
+    and returns the texts where they differ, so a profile can be checked on a sample of the corpus before using it.
+
+    Parameters:
+        texts (iterable): The texts to be compared.
+        model_name (str): The spaCy model to be used. If None, the default model is used.
+        profile (str): The pipeline profile to be compared with the 'full' one.
+
+    Returns:
+        list: A (text, full_pos_tags, profile_pos_tags) triple for each text whose tags differ.
+
+    Example:
+        >>> verify_nlp_profile(['Esta es la casa vieja', 'El perro come'], 'es_core_news_sm')
+
+        []
+    """
+    texts = list(texts)
+    full_docs = get_nlp(model_name, profile='full').pipe(texts)
+    profile_docs = get_nlp(model_name, profile=profile).pipe(texts)
+
+    mismatches = []
+    for text, full_doc, profile_doc in zip(texts, full_docs, profile_docs):
+        full_pos_tags = [token.pos_ for token in full_doc]
+        profile_pos_tags = [token.pos_ for token in profile_doc]
+        if full_pos_tags != profile_pos_tags:
+            mismatches.append((text, full_pos_tags, profile_pos_tags))
+
+    return mismatches
+
+
+def set_default_model(model_name):
+    """
+    Sets the model used when no model name is passed to get_nlp, any spaCy Spanish model (see SPACY_MODELS).
+    The default model can also be configured with the ESPACY_SPACY_MODEL environment variable.
+
+    Example:
+        >>> set_default_model('es_core_news_lg')
+    """
+    global _default_model_name
+    _default_model_name = model_name
+
+
+def set_default_profile(profile):
+    """
+    Sets the pipeline profile used when no profile is passed to get_nlp (see NLP_PROFILES).
+    The default profile can also be configured with the ESPACY_SPACY_PROFILE environment variable.
+    verify_nlp_profile checks that a profile assigns the same pos tags as the full pipeline.
+
+    Example:
+        >>> set_default_profile('tagger')
+    """
+    global _default_profile
+
+    if profile not in NLP_PROFILES:
+        raise ValueError('Unknown spaCy pipeline profile: ' + str(profile))
+
+    _default_profile = profile
+
+
+def get_default_profile():
+    """
+    Returns the pipeline profile used when no profile is passed to get_nlp.
+
+    Example:
+        >>> get_default_profile()
+
+        'full'
+    """
+    return _default_profile
+
+
+def get_default_model():
+    """
+    Returns the model used when no model name is passed to get_nlp.
+
+    Example:
+        >>> get_default_model()
+
+        'es_core_news_md'
+    """
+    return _default_model_name
+
+
+def clear_nlp_registry():
+    """
+    Removes every loaded model from the registry, so they are loaded again on the next request.
+
+    Example:
+        >>> clear_nlp_registry()
+    """
+    with _nlp_models_lock:
+        _nlp_models.clear()
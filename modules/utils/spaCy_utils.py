@@ -1,8 +1,20 @@
 # pip3 install spacy
+import atexit
+import json
+import os
+
 import spacy
 import spacy.tokens
 
-from modules.utils.vanilla_utils import clean_text
+from modules.utils.spaCy_models import get_default_model, get_default_profile, get_nlp
+from modules.utils.vanilla_utils import LRUCache, clean_text, write_file_atomically
+
+DEFAULT_PHRASE_ANALYSIS_CACHE_SIZE = 10000
+PHRASE_ANALYSIS_CACHE_VERSION = 3
+
+# Normalized phrase (the text fed to spaCy) -> (tokens, pos_tags)
+_phrase_analysis_cache = LRUCache(int(os.environ.get('ESPACY_PHRASE_CACHE_SIZE', DEFAULT_PHRASE_ANALYSIS_CACHE_SIZE)))
+_phrase_analysis_cache_path = None
 
 
 def string_tokenizer(text, word_delimiters, debug_mode):
@@ -25,25 +37,7 @@ def string_tokenizer(text, word_delimiters, debug_mode):
         tokenized_sentence = string_tokenizer(text, word_delimiters, debug_mode)
         print(tokenized_sentence)
     """
-
-    # Returning list initialization
-    tokenized_sentence = []
-
-    doc = string_sintactical_analysis__initialize_spacy_doc(debug_mode, text, word_delimiters)
-
-    # Text printing in debug mode
-    if debug_mode:
-        print("\nANALYSIS\n")
-
-    # Going through the list
-    for token in doc:
-        # Text printing in debug mode
-        if debug_mode:
-            print("\t", token.text, token.pos_, token.dep_, token.head.text)
-
-        if token.text != '' or token.text != ' ':
-            # Push each token inside a list
-            tokenized_sentence.append(str(token.text))
+    tokenized_sentence, _ = string_analysis(text, word_delimiters, debug_mode)
 
     return tokenized_sentence
 
@@ -72,26 +66,347 @@ def string_sintactical_analysis(text, word_delimiters, debug_mode):
 
             ['POS_A', 'POS_B', 'POS_C', 'POS_D', 'POS_E']
     """
-    # Returning list initialization
-    sintactically_analized_phrase = []
+    _, sintactically_analized_phrase = string_analysis(text, word_delimiters, debug_mode)
+
+    return sintactically_analized_phrase
+
+
+def string_analysis(text, word_delimiters, debug_mode, with_dependencies=False):
+    """
+    This function analyzes a string with a single pass of the spaCy pipeline and returns the tokens of the string
+    aligned with their pos tags (and their dependencies and heads, if requested).
+    The tokens and pos tags of each phrase are kept in the phrase analysis cache,
+    so a phrase that is analyzed again (e.g. for another of its words) is not parsed again.
+
+    Parameters:
+        text (string): The string to be analyzed.
+        word_delimiters (string): A string containing all the characters that will be considered as word delimiters.
+        debug_mode (boolean): A boolean indicating if the function should print the analysis in the console.
+        with_dependencies (boolean): A boolean indicating if the dependencies and heads should be returned too.
+
+    Returns:
+        tokens (list): The text of each token.
+        pos_tags (list): The pos tag of each token.
+        dependencies (list): The dependency of each token. Only returned if with_dependencies is True.
+        heads (list): The text of the head of each token. Only returned if with_dependencies is True.
+
+    Example:
+        string_analysis("El perro come.", "", False)
+
+            (['El', 'perro', 'come', '.'], ['DET', 'NOUN', 'VERB', 'PUNCT'])
+
+        string_analysis("El perro come.", "", False, True)
+
+            (['El', 'perro', 'come', '.'], ['DET', 'NOUN', 'VERB', 'PUNCT'], ['det', 'nsubj', 'ROOT', 'punct'], ['perro', 'come', 'come', 'come'])
+    """
+    # The dependencies and the debug printing need the whole doc, so only the tokens and pos tags are cached
+    if not with_dependencies and not debug_mode:
+        nlp = get_nlp()
+        doc_feed = string_sintactical_analysis__initialize_spacy_doc__get_text_feed(nlp, text, word_delimiters, False)
+        tokens, pos_tags = get_phrase_analysis(nlp, doc_feed)
+
+        return list(tokens), list(pos_tags)
 
     doc = string_sintactical_analysis__initialize_spacy_doc(text, word_delimiters, debug_mode)
 
     # Text printing in debug mode
     if debug_mode:
         print("\nANALYSIS\n")
+        for token in doc:
+            print("\t", token.text, token.pos_, token.dep_, token.head.text)
+
+    tokens = [token.text for token in doc]
+    pos_tags = [token.pos_ for token in doc]
+
+    if with_dependencies:
+        return tokens, pos_tags, [token.dep_ for token in doc], [token.head.text for token in doc]
+
+    return tokens, pos_tags
+
+
+def string_analysis_pipe(texts, word_delimiters, batch_size=64, n_process=1):
+    """
+    This function analyzes many strings by streaming them through nlp.pipe and yields, for each string, the same
+    (tokens, pos_tags) pair that string_analysis returns for it.
+
+    Parameters:
+        texts (iterable): The strings to be analyzed.
+        word_delimiters (string): A string containing all the characters that will be considered as word delimiters.
+        batch_size (int): The number of strings processed together by the pipeline.
+        n_process (int): The number of processes used by the pipeline.
+
+    Returns:
+        generator: A (tokens, pos_tags) pair for each string, in the same order as the input.
+
+    Example:
+        list(string_analysis_pipe(["El perro come.", "La casa"], ""))
+
+            [(['El', 'perro', 'come', '.'], ['DET', 'NOUN', 'VERB', 'PUNCT']), (['La', 'casa'], ['DET', 'NOUN'])]
+    """
+    nlp = get_nlp()
+
+    doc_feeds = [string_sintactical_analysis__initialize_spacy_doc__get_text_feed(nlp, text, word_delimiters, False)
+                 for text in texts]
+
+    return get_phrase_analysis_pipe(nlp, doc_feeds, batch_size, n_process)
+
+
+def words_analysis(words, debug_mode=False, with_dependencies=False):
+    """
+    This function analyzes an already tokenized phrase: the pipeline runs directly on a Doc built from the words,
+    so the phrase is not joined into a string and tokenized again, and each word is exactly one token.
+    It returns the same values as string_analysis, and the analyses are kept in the phrase analysis cache too.
+
+    Parameters:
+        words (list): The words of the phrase.
+        debug_mode (boolean): A boolean indicating if the function should print the analysis in the console.
+        with_dependencies (boolean): A boolean indicating if the dependencies and heads should be returned too.
+
+    Returns:
+        tokens (list): The text of each token.
+        pos_tags (list): The pos tag of each token.
+        dependencies (list): The dependency of each token. Only returned if with_dependencies is True.
+        heads (list): The text of the head of each token. Only returned if with_dependencies is True.
+
+    Example:
+        words_analysis(['El', 'perro', 'come', '.'])
 
-    # Going through the list
-    for token in doc:
-        # Text printing in debug mode
-        if debug_mode:
+            (['El', 'perro', 'come', '.'], ['DET', 'NOUN', 'VERB', 'PUNCT'])
+    """
+    if not with_dependencies and not debug_mode:
+        tokens, pos_tags = get_phrase_analysis(get_nlp(), tuple(words))
+
+        return list(tokens), list(pos_tags)
+
+    # The dependencies and heads are only assigned by the full pipeline
+    nlp = get_nlp(profile='full')
+    doc = nlp(spacy.tokens.Doc(nlp.vocab, words=list(words)))
+
+    if debug_mode:
+        print("\nANALYSIS\n")
+        for token in doc:
             print("\t", token.text, token.pos_, token.dep_, token.head.text)
 
-        if token.text != '' or token.text != ' ':
-            # Push each token inside a list
-            sintactically_analized_phrase.append(str(token.pos_))
+    tokens = [token.text for token in doc]
+    pos_tags = [token.pos_ for token in doc]
+
+    if with_dependencies:
+        return tokens, pos_tags, [token.dep_ for token in doc], [token.head.text for token in doc]
+
+    return tokens, pos_tags
+
+
+def words_analysis_pipe(phrases_words, batch_size=64, n_process=1):
+    """
+    This function analyzes many already tokenized phrases by streaming the Docs built from their words through
+    nlp.pipe and yields, for each phrase, the same (tokens, pos_tags) pair that words_analysis returns for it.
+
+    Parameters:
+        phrases_words (iterable): The words of each phrase.
+        batch_size (int): The number of phrases processed together by the pipeline.
+        n_process (int): The number of processes used by the pipeline.
+
+    Returns:
+        generator: A (tokens, pos_tags) pair for each phrase, in the same order as the input.
+
+    Example:
+        list(words_analysis_pipe([['El', 'perro', 'come'], ['La', 'casa']]))
+
+            [(['El', 'perro', 'come'], ['DET', 'NOUN', 'VERB']), (['La', 'casa'], ['DET', 'NOUN'])]
+    """
+    return get_phrase_analysis_pipe(get_nlp(), [tuple(words) for words in phrases_words], batch_size, n_process)
+
+
+def get_phrase_analysis_pipe(nlp, doc_feeds, batch_size=64, n_process=1):
+    """
+    Yields the (tokens, pos_tags) lists of each normalized phrase (or tuple of words), taking them from the
+    phrase analysis cache or streaming the missing phrases through nlp.pipe and storing their results in the cache.
+
+    Example:
+        >>> list(get_phrase_analysis_pipe(nlp, ['El perro come', ('La', 'casa')]))
+
+        [(['El', 'perro', 'come'], ['DET', 'NOUN', 'VERB']), (['La', 'casa'], ['DET', 'NOUN'])]
+    """
+    analyses = [_phrase_analysis_cache.get(get_phrase_analysis_key(doc_feed)) for doc_feed in doc_feeds]
+
+    # Only the phrases missing from the phrase analysis cache are parsed
+    missing_doc_feeds = (get_pipeline_input(nlp, doc_feed)
+                         for doc_feed, analysis in zip(doc_feeds, analyses) if analysis is None)
+    docs = nlp.pipe(missing_doc_feeds, batch_size=batch_size, n_process=n_process)
+
+    for doc_feed, analysis in zip(doc_feeds, analyses):
+        if analysis is None:
+            doc = next(docs)
+            analysis = tuple(token.text for token in doc), tuple(token.pos_ for token in doc)
+            _phrase_analysis_cache.put(get_phrase_analysis_key(doc_feed), analysis)
+
+        yield list(analysis[0]), list(analysis[1])
+
+
+def get_phrase_analysis(nlp, doc_feed):
+    """
+    Returns the (tokens, pos_tags) tuples of a normalized phrase, from the phrase analysis cache
+    or parsing it with nlp and storing the result in the cache.
+
+    Parameters:
+        nlp: A spaCy Language object.
+        doc_feed (str or tuple): The normalized phrase, as returned by string_sintactical_analysis__initialize_spacy_doc__get_text_feed,
+            or the tuple of words of an already tokenized phrase.
+
+    Returns:
+        tokens (tuple): The text of each token.
+        pos_tags (tuple): The pos tag of each token.
+
+    Example:
+        >>> get_phrase_analysis(nlp, 'El perro come')
+
+        (('El', 'perro', 'come'), ('DET', 'NOUN', 'VERB'))
+    """
+    key = get_phrase_analysis_key(doc_feed)
+    analysis = _phrase_analysis_cache.get(key)
+
+    if analysis is None:
+        doc = nlp(get_pipeline_input(nlp, doc_feed))
+        analysis = tuple(token.text for token in doc), tuple(token.pos_ for token in doc)
+        _phrase_analysis_cache.put(key, analysis)
+
+    return analysis
+
+
+def get_pipeline_input(nlp, doc_feed):
+    """
+    Returns what nlp processes for a normalized phrase: the string itself, or a Doc built from the words of an
+    already tokenized phrase, which the pipeline processes without tokenizing it again.
+
+    Example:
+        >>> get_pipeline_input(nlp, ('El', 'perro'))
+
+        El perro
+    """
+    if isinstance(doc_feed, str):
+        return doc_feed
+
+    return spacy.tokens.Doc(nlp.vocab, words=list(doc_feed))
+
+
+def get_phrase_analysis_key(doc_feed):
+    """
+    Returns the key of a normalized phrase (or tuple of words) in the phrase analysis cache.
+    It includes the default model and profile, so the analyses of different pipelines are never mixed.
+
+    Example:
+        >>> get_phrase_analysis_key('El perro come')
+
+        ('es_core_news_md', 'full', 'El perro come')
+    """
+    return get_default_model(), get_default_profile(), doc_feed
 
-    return sintactically_analized_phrase
+
+def configure_phrase_analysis_cache(max_size=DEFAULT_PHRASE_ANALYSIS_CACHE_SIZE, max_memory=None, path=None):
+    """
+    Replaces the phrase analysis cache by an empty one with new bounds.
+    If a path is given, the cache is loaded from it (if the file exists) and saved to it when the program exits,
+    so the analyses are kept between runs.
+
+    Parameters:
+        max_size (int): The maximum number of phrases, None for no limit.
+        max_memory (int): The maximum estimated size of the cached analyses in bytes, None for no limit.
+        path (str): The file the cache is persisted to, None to keep it in memory only.
+
+    Example:
+        >>> configure_phrase_analysis_cache(max_size=None, max_memory=256 * 1024 * 1024, path='phrases.json')
+    """
+    global _phrase_analysis_cache, _phrase_analysis_cache_path
+
+    _phrase_analysis_cache = LRUCache(max_size, max_memory)
+
+    if path is not None and _phrase_analysis_cache_path is None:
+        atexit.register(save_phrase_analysis_cache)
+
+    _phrase_analysis_cache_path = path
+
+    if path is not None and os.path.exists(path):
+        load_phrase_analysis_cache(path)
+
+
+def get_phrase_analysis_cache_stats():
+    """
+    Returns the hits, misses, hit rate, evictions, number of phrases and estimated memory of the phrase analysis cache.
+
+    Example:
+        >>> get_phrase_analysis_cache_stats()
+
+        {'hits': 120, 'misses': 40, 'hit_rate': 0.75, 'evictions': 0, 'size': 40, 'memory': 0}
+    """
+    return _phrase_analysis_cache.stats()
+
+
+def clear_phrase_analysis_cache():
+    """
+    Removes every phrase from the phrase analysis cache.
+
+    Example:
+        >>> clear_phrase_analysis_cache()
+    """
+    _phrase_analysis_cache.clear()
+
+
+def save_phrase_analysis_cache(path=None):
+    """
+    Writes the phrase analysis cache to a JSON file, from the least to the most recently used phrase.
+    Without a path, it writes to the path given to configure_phrase_analysis_cache, if any.
+    The file is plain JSON, so loading one that was shared or downloaded is safe.
+
+    Example:
+        >>> save_phrase_analysis_cache('phrases.json')
+    """
+    path = path or _phrase_analysis_cache_path
+    if path is None:
+        return
+
+    # Each entry is a [model, profile, doc_feed, tokens, pos_tags] list
+    content = {'version': PHRASE_ANALYSIS_CACHE_VERSION,
+               'entries': [list(key) + list(analysis) for key, analysis in _phrase_analysis_cache.items()]}
+    write_file_atomically(path, lambda file: json.dump(content, file, ensure_ascii=False))
+
+
+def load_phrase_analysis_cache(path=None):
+    """
+    Adds the phrases of a file written by save_phrase_analysis_cache to the phrase analysis cache.
+    A file written by another version, or that is not a valid phrase analysis cache, is ignored.
+
+    Returns:
+        loaded_phrases (int): The number of phrases read from the file.
+
+    Example:
+        >>> load_phrase_analysis_cache('phrases.json')
+
+        40
+    """
+    path = path or _phrase_analysis_cache_path
+
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            content = json.load(file)
+    except ValueError:
+        return 0
+
+    if not isinstance(content, dict) or content.get('version') != PHRASE_ANALYSIS_CACHE_VERSION:
+        return 0
+
+    loaded_phrases = 0
+    for entry in content.get('entries', []):
+        try:
+            model_name, profile, doc_feed, tokens, pos_tags = entry
+        except (TypeError, ValueError):
+            continue
+
+        # The lists of the JSON file are turned back into the tuples used as keys and analyses
+        key = model_name, profile, doc_feed if isinstance(doc_feed, str) else tuple(doc_feed)
+        _phrase_analysis_cache.put(key, (tuple(tokens), tuple(pos_tags)))
+        loaded_phrases += 1
+
+    return loaded_phrases
 
 
 def string_sintactical_analysis__initialize_spacy_doc(text, word_delimiters, debug_mode):
@@ -106,20 +421,35 @@ def string_sintactical_analysis__initialize_spacy_doc(text, word_delimiters, deb
     :param debug_mode: Boolean that turns on the code comments
     :return: A spacy doc object.
     """
-    # Load the model and create an nlp object
-    nlp = spacy.load("es_core_news_md")
+    # Get the shared nlp object from the model registry
+    # The dependencies and heads are only assigned by the full pipeline
+    nlp = get_nlp(profile='full')
+
+    doc_feed = string_sintactical_analysis__initialize_spacy_doc__get_text_feed(nlp, text, word_delimiters, debug_mode)
+
+    # Process the text passed to this method as a parameter
+    doc = nlp(doc_feed)
+
+    return doc
 
-    if isinstance(text, list):
-        new_text = ''
-        last = 0
-        for phrase in text:
-            if last == (len(phrase) - 1):
-                new_text += phrase
-            else:
-                new_text += phrase + ' '
-            last += 1
 
-        text = new_text
+def string_sintactical_analysis__initialize_spacy_doc__get_text_feed(nlp, text, word_delimiters, debug_mode):
+    """
+    Splits a text (or a list of texts) by the word delimiters and returns the string that is fed to the spaCy pipeline.
+
+    Example:
+        get_text_feed(nlp, 'Hola, ¿cómo estás?', ',', False)
+
+            'Hola ¿cómo estás?'
+
+    :param nlp: A spaCy Language object.
+    :param text: The text to be processed.
+    :param word_delimiters: The word delimiters to be used.
+    :param debug_mode: Boolean that turns on the code comments
+    :return: The string to be processed by the pipeline.
+    """
+    if isinstance(text, list):
+        text = ' '.join(text)
 
     tokens = text.split(word_delimiters)
     words_t = list(filter(None, [t.strip() for t in tokens]))
@@ -128,12 +458,7 @@ def string_sintactical_analysis__initialize_spacy_doc(text, word_delimiters, deb
     if debug_mode:
         print(str(words_t))
 
-    doc_feed = string_sintactical_analysis__initialize_spacy_doc__get_doc_feed(nlp, words_t)
-
-    # Process the text passed to this method as a parameter
-    doc = nlp(doc_feed)
-
-    return doc
+    return string_sintactical_analysis__initialize_spacy_doc__get_doc_feed(nlp, words_t)
 
 
 def string_sintactical_analysis__initialize_spacy_doc__get_doc_feed(nlp, words_t):
@@ -153,20 +478,8 @@ def string_sintactical_analysis__initialize_spacy_doc__get_doc_feed(nlp, words_t
 
                 'hello world'
     """
-    doc_feed = ''
-    doc_raw_feed = spacy.tokens.Doc(nlp.vocab, words=words_t)
-    doc_feed_count = 0
-    doc_feed_length = len(doc_raw_feed)
-
-    for element in doc_raw_feed:
-        if doc_feed_count != doc_feed_length - 1:
-            doc_feed += str(element) + ' '
-        else:
-            doc_feed += str(element)
-
-        doc_feed_count += 1
-
-    return doc_feed
+    # The text of each token of Doc(nlp.vocab, words=words_t) is its word, so the words are joined directly
+    return ' '.join(words_t)
 
 
 def find_word_pos_and_surroundings(text, word):
@@ -187,7 +500,7 @@ def find_word_pos_and_surroundings(text, word):
 
             [['una', 'DET'], ['prueba', 'NOUN'], ['', '']]
     """
-    nlp = spacy.load("es_core_news_md")
+    nlp = get_nlp()
 
     if isinstance(text, str):
         text = clean_text(text)
@@ -221,6 +534,97 @@ def find_word_pos_and_surroundings(text, word):
             [next_token_text, next_token_pos]]
 
 
+def find_word_pos_and_surroundings_at(doc, token_index):
+    """
+
+        This function takes a spaCy doc and the index of a token and returns the previous, actual and next words
+        of that token, with their pos tags. Unlike find_word_pos_and_surroundings, it does not scan the doc,
+        and it finds the right context when the word appears more than once.
+
+        Parameters:
+        doc (Doc): The analysed text.
+        token_index (int): The index of the token in the doc, see get_token_index_at_offset to get it from a character offset.
+
+        Returns:
+        list: A list with the previous, actual and next words of the text.
+
+        Example:
+
+            find_word_pos_and_surroundings_at(nlp('la casa y la casa vieja'), 4)
+
+            [['la', 'DET'], ['casa', 'NOUN'], ['vieja', 'ADJ']]
+    """
+    if not 0 <= token_index < len(doc):
+        raise IndexError('The doc has no token ' + str(token_index))
+
+    token = doc[token_index]
+    previous_token = doc[token_index - 1] if token_index > 0 else None
+    next_token = doc[token_index + 1] if token_index < len(doc) - 1 else None
+
+    return [[previous_token.text, previous_token.pos_] if previous_token is not None else ['', ''],
+            [token.text, token.pos_],
+            [next_token.text, next_token.pos_] if next_token is not None else ['', '']]
+
+
+def get_token_index_at_offset(doc, char_offset):
+    """
+
+        This function returns the index of the token of a spaCy doc that covers a character offset of its text.
+        The character offset to token index map is built once per doc (see get_char_to_token_map),
+        so every following lookup on the same doc is O(1).
+
+        Parameters:
+        doc (Doc): The analysed text.
+        char_offset (int): The character offset in doc.text.
+
+        Returns:
+        int: The index of the token.
+
+        Example:
+
+            get_token_index_at_offset(nlp('la casa y la casa vieja'), 13)
+
+            4
+    """
+    char_to_token_map = get_char_to_token_map(doc)
+
+    if not 0 <= char_offset < len(char_to_token_map) or char_to_token_map[char_offset] < 0:
+        raise ValueError('There is no token at character offset ' + str(char_offset))
+
+    return char_to_token_map[char_offset]
+
+
+def get_char_to_token_map(doc):
+    """
+
+        This function returns a list with the index of the token that covers each character of the text of a doc,
+        -1 for the characters that are not part of a token (the whitespace).
+        It is built once and stored in doc.user_data, so it is shared by every lookup on the same doc.
+
+        Parameters:
+        doc (Doc): The analysed text.
+
+        Returns:
+        list: The token index of each character.
+
+        Example:
+
+            get_char_to_token_map(nlp('la casa'))
+
+            [0, 0, -1, 1, 1, 1, 1]
+    """
+    char_to_token_map = doc.user_data.get('espacy_char_to_token_map')
+
+    if char_to_token_map is None or len(char_to_token_map) != len(doc.text):
+        char_to_token_map = [-1] * len(doc.text)
+        for token in doc:
+            char_to_token_map[token.idx:token.idx + len(token.text)] = [token.i] * len(token.text)
+
+        doc.user_data['espacy_char_to_token_map'] = char_to_token_map
+
+    return char_to_token_map
+
+
 def unpack_word_pos_and_surroundings(word_pos_and_surroundings):
     """
         This function takes a word_pos_and_surroundings tuple and returns the
@@ -1,4 +1,14 @@
+import collections
+import os
 import re
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+# Serializes the reads of the umask, which can only be read by setting it
+_umask_lock = threading.Lock()
 
 
 def find_sentence_of_word(text, word):
@@ -77,6 +87,71 @@ def clean_text(text):
     return text
 
 
+def get_phrase_window(phrase, word, window, window_unit='tokens'):
+    """
+    Returns the part of a phrase around the first occurrence of a word, so only that part has to be analyzed
+    to know the words before and after it.
+    The window never cuts a word: in 'tokens' mode it takes window whitespace separated words at each side of
+    the word, in 'chars' mode at most window characters at each side, shrunk to the closest whitespace.
+    If the word is not found as a whole word, the whole phrase is returned.
+
+    Parameters:
+        phrase (str): The phrase where the word is.
+        word (str): The word whose surroundings are needed.
+        window (int): The number of tokens or characters kept at each side of the word.
+        window_unit (str): 'tokens' or 'chars'.
+
+    Returns:
+        str: The window of the phrase around the word.
+
+    Example:
+        >>> get_phrase_window('Ayer por la tarde vimos la casa vieja de mis abuelos', 'casa', 2)
+
+            'vimos la casa vieja de'
+
+        >>> get_phrase_window('Ayer por la tarde vimos la casa vieja de mis abuelos', 'casa', 10, 'chars')
+
+            'vimos la casa vieja de'
+    """
+    match = re.search(r'(?<!\w)' + re.escape(word) + r'(?!\w)', phrase)
+    if match is None:
+        return phrase
+
+    # The punctuation attached to the word (e.g. '¿casa,') is kept with it
+    word_start, word_end = match.span()
+    word_start -= len(phrase[:word_start]) - len(re.sub(r'\S+$', '', phrase[:word_start]))
+    word_end += len(re.match(r'\S*', phrase[word_end:]).group())
+
+    if window_unit == 'tokens':
+        previous_words = [previous_word.start() for previous_word in re.finditer(r'\S+', phrase[:word_start])]
+        if window <= 0:
+            window_start = word_start
+        elif window <= len(previous_words):
+            window_start = previous_words[-window]
+        else:
+            window_start = 0
+
+        window_end = word_end
+        for index, next_word in enumerate(re.finditer(r'\S+', phrase[word_end:])):
+            if index >= window:
+                break
+            window_end = word_end + next_word.end()
+    elif window_unit == 'chars':
+        window_start = max(0, word_start - window)
+        if window_start > 0 and not phrase[window_start - 1].isspace():
+            next_space = re.search(r'\s', phrase[window_start:word_start])
+            window_start = window_start + next_space.end() if next_space else word_start
+
+        window_end = min(len(phrase), word_end + window)
+        if window_end < len(phrase) and not phrase[window_end].isspace():
+            previous_spaces = list(re.finditer(r'\s', phrase[word_end:window_end]))
+            window_end = word_end + previous_spaces[-1].start() if previous_spaces else word_end
+    else:
+        raise ValueError('Unknown window unit: ' + str(window_unit))
+
+    return phrase[window_start:window_end].strip()
+
+
 def get_nlp_punctuation_marks():
     """
     Returns a list of the punctuation marks used in the Spanish language.
@@ -93,3 +168,311 @@ def get_nlp_punctuation_marks():
         ['!', '¡', '?', '¿', '%', ',', '...', '.', '…', ':', ';', '<', '>', '"', '·', '$', '%', '&', '/', '(', ')', '=', '\'', '|', '@', '#', '~', '½', '¬', '{', '[' ']', '}', '_', '€', '`', '*', '^', '+', '€', '’', '“', '”', '«', '»', '—']
     """
     return ['!', '¡', '?', '¿', '%', ',', '...', '.', '…', ':', ';', '<', '>', '"', '·', '$', '%', '&', '/', '(', ')', '=', '\'', '|', '@', '#', '~', '½', '¬', '{', '[' ']', '}', '_', '€', '`', '*', '^', '+', '€', '’', '“', '”', '«', '»', '—']
+
+
+def get_spacy_pos_tags():
+    """
+    Returns a list of the pos tags assigned by spaCy (Universal Dependencies tag set).
+
+    Parameters:
+        None
+
+    Returns:
+        list: A list of the pos tags assigned by spaCy.
+
+    Example:
+        >>> get_spacy_pos_tags()
+
+        ['ADJ', 'ADP', 'ADV', 'AUX', 'CONJ', 'CCONJ', 'DET', 'INTJ', 'NOUN', 'NUM', 'PART', 'PRON', 'PROPN', 'PUNCT', 'SCONJ', 'SYM', 'VERB', 'X', 'EOL', 'SPACE']
+    """
+    return ['ADJ', 'ADP', 'ADV', 'AUX', 'CONJ', 'CCONJ', 'DET', 'INTJ', 'NOUN', 'NUM', 'PART', 'PRON', 'PROPN', 'PUNCT', 'SCONJ', 'SYM', 'VERB', 'X', 'EOL', 'SPACE']
+
+
+class LRUCache:
+    """
+    A thread-safe least recently used cache, bounded by a number of entries and/or by an estimated memory size.
+    When a bound is exceeded, the least recently used entries are evicted.
+    It counts its hits and misses, so the hit rate of the cache can be monitored.
+
+    Parameters:
+        max_size (int): The maximum number of entries, None for no limit.
+        max_memory (int): The maximum estimated size of the entries in bytes, None for no limit.
+        size_of (function): Returns the estimated size in bytes of a (key, value) entry. Defaults to get_deep_size_of.
+
+    Example:
+        >>> cache = LRUCache(max_size=2)
+        >>> cache.put('a', 1)
+        >>> cache.put('b', 2)
+        >>> cache.get('a')
+
+        1
+
+        >>> cache.put('c', 3)
+        >>> cache.get('b')
+
+        None
+
+        >>> cache.stats()
+
+        {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'evictions': 1, 'size': 2, 'memory': 0}
+    """
+
+    def __init__(self, max_size=None, max_memory=None, size_of=None):
+        self.max_size = max_size
+        self.max_memory = max_memory
+        self.size_of = size_of or (lambda key, value: get_deep_size_of((key, value)))
+
+        self._entries = collections.OrderedDict()
+        self._entry_sizes = {}
+        self._memory = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a key and marks it as the most recently used, or default if the key is not cached.
+
+        Example:
+            >>> cache.get('a')
+
+            1
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def put(self, key, value):
+        """
+        Stores the value of a key as the most recently used entry and evicts the entries that exceed the bounds.
+
+        Example:
+            >>> cache.put('a', 1)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            entry_size = self.size_of(key, value) if self.max_memory is not None else 0
+
+            self._entries[key] = value
+            self._entry_sizes[key] = entry_size
+            self._memory += entry_size
+
+            while self._entries and ((self.max_size is not None and len(self._entries) > self.max_size)
+                                     or (self.max_memory is not None and self._memory > self.max_memory)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """
+        Removes a key from the cache and returns its value, or default if the key is not cached.
+
+        Example:
+            >>> cache.pop('a')
+
+            1
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+
+            return self._remove(key)
+
+    def clear(self):
+        """
+        Removes every entry of the cache. The hit and miss counters are kept.
+
+        Example:
+            >>> cache.clear()
+        """
+        with self._lock:
+            self._entries.clear()
+            self._entry_sizes.clear()
+            self._memory = 0
+
+    def items(self):
+        """
+        Returns a list of the (key, value) entries, from the least to the most recently used.
+
+        Example:
+            >>> cache.items()
+
+            [('a', 1), ('c', 3)]
+        """
+        with self._lock:
+            return list(self._entries.items())
+
+    def stats(self):
+        """
+        Returns the hits, misses, hit rate, evictions, number of entries and estimated memory of the cache.
+
+        Example:
+            >>> cache.stats()
+
+            {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'evictions': 1, 'size': 2, 'memory': 0}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'size': len(self._entries), 'memory': self._memory}
+
+    def reset_stats(self):
+        """
+        Sets the hit, miss and eviction counters to 0.
+
+        Example:
+            >>> cache.reset_stats()
+        """
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        value = self._entries.pop(key)
+        self._memory -= self._entry_sizes.pop(key)
+
+        return value
+
+
+class TTLCache(LRUCache):
+    """
+    A LRUCache whose entries also expire ttl seconds after they were stored.
+    Expired entries count as misses and are removed when they are looked up or when they are the least recently used.
+
+    Parameters:
+        ttl (float): The seconds an entry is kept.
+        max_size (int): The maximum number of entries, None for no limit.
+        max_memory (int): The maximum estimated size of the entries in bytes, None for no limit.
+        size_of (function): Returns the estimated size in bytes of a (key, value) entry.
+
+    Example:
+        >>> cache = TTLCache(ttl=60, max_size=1000)
+        >>> cache.put('a', 1)
+        >>> cache.get('a')
+
+        1
+    """
+
+    def __init__(self, ttl, max_size=None, max_memory=None, size_of=None):
+        super().__init__(max_size, max_memory, size_of)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        if entry is None:
+            return default
+
+        expiry_time, value = entry
+        if time.monotonic() >= expiry_time:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                self.hits -= 1
+                self.misses += 1
+            return default
+
+        return value
+
+    def put(self, key, value):
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+    def pop(self, key, default=None):
+        entry = super().pop(key)
+        return default if entry is None else entry[1]
+
+    def items(self):
+        now = time.monotonic()
+        return [(key, value) for key, (expiry_time, value) in super().items() if expiry_time > now]
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() < entry[0]
+
+
+def get_deep_size_of(value):
+    """
+    Returns an estimation of the memory size in bytes of a value, including the strings, tuples, lists
+    and dicts it contains.
+
+    Example:
+        >>> get_deep_size_of(('casa', ['DET', 'NOUN']))
+
+        302
+    """
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        size += sum(get_deep_size_of(key) + get_deep_size_of(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(get_deep_size_of(item) for item in value)
+
+    return size
+
+
+def write_file_atomically(path, write, mode='w'):
+    """
+    Writes a file through a temporary file in the same directory that is renamed over the target,
+    so readers see either the old or the new content, never a partial one.
+    The new file keeps the permissions of the file it replaces (or gets the default ones of a new file,
+    0o666 without the umask), so files read by other users stay readable. Text is written as UTF-8.
+
+    Parameters:
+        path (str): The path of the file.
+        write (function): A function that writes the content to the file object it receives.
+        mode (str): The mode used to open the temporary file.
+
+    Example:
+        >>> write_file_atomically('/home/user/espaCy/modules/cache/caché.txt', lambda file: file.write(''))
+    """
+    directory, name = os.path.split(path)
+    file_mode = get_file_mode(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or '.')
+
+    try:
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temporary_path, file_mode)
+        with os.fdopen(file_descriptor, mode, encoding=None if 'b' in mode else 'utf-8') as file:
+            write(file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def get_file_mode(path):
+    """
+    Returns the permission bits of a file, or the ones a new file gets (0o666 without the umask) if it does not exist.
+
+    Example:
+        >>> oct(get_file_mode('/home/user/espaCy/modules/cache/caché.txt'))
+
+        '0o644'
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        pass
+
+    with _umask_lock:
+        umask = os.umask(0o022)
+        os.umask(umask)
+
+    return 0o666 & ~umask
@@ -0,0 +1,51 @@
+import os
+import sys
+import uuid
+
+import pytest
+import spacy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.cache.espaCy_cache import configure_cache, set_shared_cache_index
+from modules.utils.spaCy_models import get_default_model, set_default_model
+
+# The pos tags assigned by the test model, any other word is tagged as X
+TEST_MODEL_TAGS = {'el': 'DET', 'la': 'DET', 'una': 'DET', 'perro': 'NOUN', 'casa': 'NOUN', 'mesa': 'NOUN',
+                   'vieja': 'ADJ', 'roja': 'ADJ', 'de': 'ADP', 'y': 'CCONJ', 'come': 'VERB', '.': 'PUNCT', ',': 'PUNCT'}
+
+
+@pytest.fixture(scope='session')
+def test_model(tmp_path_factory):
+    """
+    A blank Spanish pipeline whose attribute_ruler assigns fixed pos tags, so the tests do not need a trained model.
+    """
+    nlp = spacy.blank('es')
+    ruler = nlp.add_pipe('attribute_ruler')
+    for word, pos in TEST_MODEL_TAGS.items():
+        ruler.add([[{'LOWER': word}]], {'POS': pos})
+    ruler.add([[{'IS_ALPHA': True, 'LOWER': {'NOT_IN': list(TEST_MODEL_TAGS)}}]], {'POS': 'X'})
+
+    path = str(tmp_path_factory.mktemp('model') / 'test_es')
+    nlp.to_disk(path)
+
+    return path
+
+
+@pytest.fixture
+def nlp_model(test_model):
+    previous_model = get_default_model()
+    set_default_model(test_model)
+    yield test_model
+    set_default_model(previous_model)
+
+
+@pytest.fixture
+def cache_name(tmp_path):
+    """
+    The name of an empty cache stored in a temporary directory.
+    """
+    name = 'test_' + uuid.uuid4().hex[:8]
+    configure_cache(name, str(tmp_path / 'caché.txt'))
+    yield name
+    set_shared_cache_index(name, None)
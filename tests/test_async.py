@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from modules.cache.espaCy_cache import update_cache
+from modules.service import espaCy_async
+from modules.service.espaCy_async import AsyncCorrector
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """
+    The batches sent to espacy_batch, which answers each item with its word in upper case.
+    """
+    batches = []
+
+    def correct_batch(items, batch_size, n_process, cache_name):
+        batches.append(list(items))
+        return [word.upper() for word, _, _ in items]
+    monkeypatch.setattr(espaCy_async, 'espacy_batch', correct_batch)
+
+    return batches
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+
+def test_batch_is_sent_when_it_is_full(batches):
+    async def main():
+        corrector = AsyncCorrector(max_batch_size=2, max_wait=60)
+        results = await corrector.correct_batch([('el', 'DET', 'el perro'), ('perro', 'NOUN', 'el perro'),
+                                                 ('la', 'DET', 'la casa'), ('casa', 'NOUN', 'la casa')])
+        await corrector.close()
+        return results
+
+    assert run(main()) == ['EL', 'PERRO', 'LA', 'CASA']
+    assert batches == [[('el', 'DET', 'el perro'), ('perro', 'NOUN', 'el perro')],
+                       [('la', 'DET', 'la casa'), ('casa', 'NOUN', 'la casa')]]
+
+
+def test_batch_is_sent_after_max_wait(batches):
+    async def main():
+        corrector = AsyncCorrector(max_batch_size=64, max_wait=0.05)
+        first = asyncio.ensure_future(corrector.correct('el', 'DET', 'el perro'))
+        await asyncio.sleep(0)
+        result = await corrector.correct('perro', 'NOUN', 'el perro')
+        await corrector.close()
+        return await first, result
+
+    assert run(main()) == ('EL', 'PERRO')
+    assert batches == [[('el', 'DET', 'el perro'), ('perro', 'NOUN', 'el perro')]]
+
+
+def test_batch_errors_reach_every_caller(monkeypatch):
+    error = ValueError('broken pipeline')
+
+    def correct_batch(items, batch_size, n_process, cache_name):
+        raise error
+    monkeypatch.setattr(espaCy_async, 'espacy_batch', correct_batch)
+
+    async def main():
+        corrector = AsyncCorrector(max_batch_size=3, max_wait=60)
+        results = await asyncio.gather(*(corrector.correct(word, 'NOUN', 'la casa') for word in ('la', 'casa', 'de')),
+                                       return_exceptions=True)
+        await corrector.close()
+        return results
+
+    assert run(main()) == [error, error, error]
+
+
+def test_cancelled_caller_does_not_break_the_batch(batches):
+    async def main():
+        corrector = AsyncCorrector(max_batch_size=64, max_wait=60)
+        cancelled = asyncio.ensure_future(corrector.correct('el', 'DET', 'el perro'))
+        kept = asyncio.ensure_future(corrector.correct('perro', 'NOUN', 'el perro'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        corrector.flush()
+        result = await kept
+        await corrector.close()
+        return cancelled.cancelled(), result
+
+    assert run(main()) == (True, 'PERRO')
+
+
+def test_close_corrects_the_pending_items(batches):
+    async def main():
+        corrector = AsyncCorrector(max_batch_size=64, max_wait=60)
+        tasks = [asyncio.ensure_future(corrector.correct(word, 'NOUN', 'la casa')) for word in ('la', 'casa')]
+        await asyncio.sleep(0)
+        assert not batches
+        await corrector.close()
+        return [task.result() for task in tasks]
+
+    assert run(main()) == ['LA', 'CASA']
+    assert batches == [[('la', 'NOUN', 'la casa'), ('casa', 'NOUN', 'la casa')]]
+
+
+def test_results_are_the_ones_of_espacy(nlp_model, cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}}}, False, cache_name)
+
+    async def main():
+        corrector = AsyncCorrector(cache_name=cache_name)
+        results = await corrector.correct_batch([('casa', 'NOUN', 'la casa vieja'), ('el', 'DET', 'el perro')])
+        await corrector.close()
+        return results
+
+    assert run(main()) == ['ADJ', 'DET']
@@ -0,0 +1,46 @@
+import pytest
+
+from espaCy import espacy, espacy_batch
+from modules.cache.espaCy_cache import update_cache
+
+ITEMS = [
+    ('casa', 'NOUN', 'la casa vieja'),
+    ('casa', 'NOUN', 'la casa vieja'),
+    ('la', 'DET', 'la casa vieja'),
+    ('casa', 'NOUN', 'una casa de la casa roja'),
+    ('casa', 'NOUN', 'la casa roja y la casa de'),
+    ('mesa', 'NOUN', 'la mesa roja'),
+    ('perro', 'NOUN', 'el perro come'),
+    ('casa', 'NOUN', ['la', 'casa', 'vieja']),
+    ('casa', 'NOUN', ['la', 'casa', 'vieja']),
+    ('casa', 'NOUN', ['una', 'casa', 'de']),
+    ('mesa', 'NOUN', 'la casa roja'),
+]
+
+
+@pytest.fixture
+def batch_cache_name(nlp_model, cache_name):
+    update_cache({
+        'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}, 'DET NOUN ADP': {'PROPN': ['una casa de']}},
+        'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}},
+    }, False, cache_name)
+    return cache_name
+
+
+def correct_one_by_one(items, cache_name):
+    # A phrase given as a list of words is the tokenized phrase of a single espacy call
+    return [espacy(word, word_pos, phrase, cache_name) if isinstance(phrase, str)
+            else espacy(word, word_pos, ' '.join(phrase), cache_name, tokenized_phrase=phrase)
+            for word, word_pos, phrase in items]
+
+
+def test_batch_gives_the_results_of_espacy(batch_cache_name):
+    expected = correct_one_by_one(ITEMS, batch_cache_name)
+
+    assert espacy_batch(ITEMS, cache_name=batch_cache_name) == expected
+    assert espacy_batch(ITEMS, batch_size=2, cache_name=batch_cache_name) == expected
+    assert expected == ['ADJ', 'ADJ', 'DET', 'PROPN', 'ADJ', 'ADJ', 'NOUN', 'ADJ', 'ADJ', 'PROPN', 'NOUN']
+
+
+def test_batch_of_generator(batch_cache_name):
+    assert espacy_batch(iter(ITEMS), cache_name=batch_cache_name) == correct_one_by_one(ITEMS, batch_cache_name)
@@ -0,0 +1,44 @@
+import io
+
+from modules.cache.espaCy_cache import get_rows, iterate_espacy_cache_format, read_table, update_cache, write_table
+
+
+def test_table_round_trip(cache_name):
+    cache = {
+        'casa': {
+            'DET NOUN ADJ': {'ADJ': ['de Casa Vieja', 'una casa vieja'], 'PROPN': ['de Casa Vieja']},
+            'NOUN ADJ': {'ADJ': ['Casa Roja']},
+        },
+        'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}},
+    }
+    update_cache(cache, False, cache_name)
+
+    assert read_table(cache_name) == cache
+
+
+def test_empty_phrase_under_a_phrase_round_trips(cache_name):
+    cache = {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja', '']}, 'NOUN ADJ': {'ADJ': ['']}}}
+    update_cache(cache, False, cache_name)
+
+    assert read_table(cache_name) == cache
+
+
+def test_only_grouping_cells_are_left_empty():
+    lines = list(iterate_espacy_cache_format({
+        'casa': {'DET NOUN': {'PRON': ['la casa', 'esta casa'], 'NOUN': ['la casa']}},
+        'mesa': {'DET NOUN': {'PRON': ['la mesa']}},
+    }, 10))
+
+    assert [[cell.strip() for cell in line.split('|')[1:-1]] for line in lines] == [
+        ['casa', 'DET NOUN', 'PRON', 'la casa'],
+        ['', '', '', 'esta casa'],
+        ['', '', 'NOUN', 'la casa'],
+        ['mesa', 'DET NOUN', 'PRON', 'la mesa'],
+    ]
+
+
+def test_duplicated_rows_are_written_once():
+    file = io.StringIO()
+    write_table(file, get_rows(), {'casa': {'DET NOUN': {'PRON': ['la casa', 'la casa']}}}, False)
+
+    assert file.getvalue().count('la casa') == 1
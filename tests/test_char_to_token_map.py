@@ -0,0 +1,50 @@
+import pytest
+
+from espaCy import espacy_at
+from modules.cache.espaCy_cache import update_cache
+from modules.utils.spaCy_models import get_nlp
+from modules.utils.spaCy_utils import find_word_pos_and_surroundings_at, get_char_to_token_map, get_token_index_at_offset
+
+PHRASE = 'la casa y la casa vieja'
+
+
+@pytest.fixture
+def doc(nlp_model):
+    return get_nlp()(PHRASE)
+
+
+def test_char_to_token_map(doc):
+    char_to_token_map = get_char_to_token_map(doc)
+
+    assert char_to_token_map[:10] == [0, 0, -1, 1, 1, 1, 1, -1, 2, -1]
+    assert len(char_to_token_map) == len(PHRASE)
+    assert doc.user_data['espacy_char_to_token_map'] is char_to_token_map
+    assert get_char_to_token_map(doc) is char_to_token_map
+
+
+def test_token_index_at_offset(doc):
+    assert [get_token_index_at_offset(doc, offset) for offset in (0, 3, 6, 13, 22)] == [0, 1, 1, 4, 5]
+
+    for offset in (2, -1, len(PHRASE)):
+        with pytest.raises(ValueError):
+            get_token_index_at_offset(doc, offset)
+
+
+def test_surroundings_of_a_repeated_word(doc):
+    assert find_word_pos_and_surroundings_at(doc, 1) == [['la', 'DET'], ['casa', 'NOUN'], ['y', 'CCONJ']]
+    assert find_word_pos_and_surroundings_at(doc, 4) == [['la', 'DET'], ['casa', 'NOUN'], ['vieja', 'ADJ']]
+    assert find_word_pos_and_surroundings_at(doc, 0)[0] == ['', '']
+
+    with pytest.raises(IndexError):
+        find_word_pos_and_surroundings_at(doc, 6)
+
+
+def test_espacy_at_corrects_each_occurrence_in_its_context(doc, cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}}}, False, cache_name)
+
+    assert espacy_at(PHRASE, [3, 13], cache_name=cache_name) == ['NOUN', 'ADJ']
+    assert espacy_at(doc, [1, 4], target_unit='token', cache_name=cache_name) == ['NOUN', 'ADJ']
+    assert espacy_at(doc, [4], word_pos_list=['VERB'], target_unit='token', cache_name=cache_name) == ['VERB']
+
+    with pytest.raises(ValueError):
+        espacy_at(doc, [1], target_unit='word', cache_name=cache_name)
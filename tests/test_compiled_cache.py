@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from modules.cache.espaCy_cache import (add_patterns, compile_cache_file, copy_cache, decompile_cache_file, get_cache,
+                                        get_cache_file_path, get_cache_index, get_cache_snapshot,
+                                        read_compiled_cache_if_current, read_table, update_cache)
+
+CACHE = {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja', 'una casa vieja']}, 'NOUN ADJ': {'PROPN': ['Casa Roja']}}}
+
+
+def test_decompile_writes_the_compiled_cache_back_to_the_table(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+    os.remove(get_cache_file_path(cache_name))
+
+    decompile_cache_file(cache_name)
+
+    assert read_table(cache_name) == CACHE
+    assert read_compiled_cache_if_current(cache_name) is not None
+
+
+def test_compiled_cache_of_an_older_table_is_not_used(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+
+    update_cache({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, False, cache_name)
+
+    assert read_compiled_cache_if_current(cache_name) is None
+    assert ('mesa', 'DET', 'NOUN', 'ADJ') in get_cache_index(cache_name)
+    assert 'casa' not in get_cache_index(cache_name)
+
+
+def test_index_is_loaded_without_the_nested_cache(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+
+    cache, cache_index = get_cache_snapshot(cache_name)
+    assert cache is None
+    assert cache_index[('casa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+
+    assert copy_cache(get_cache(cache_name)) == CACHE
+    assert get_cache_snapshot(cache_name)[1] is cache_index
+
+
+def test_journal_is_merged_into_a_compiled_cache(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+    add_patterns({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, cache_name)
+
+    assert get_cache_index(cache_name)[('mesa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+    assert set(get_cache(cache_name)) == {'casa', 'mesa'}
+
+
+def test_decompile_does_not_overwrite_a_newer_table(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+    newer_cache = {'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}
+    update_cache(newer_cache, False, cache_name)
+
+    with pytest.raises(ValueError):
+        decompile_cache_file(cache_name)
+    assert read_table(cache_name) == newer_cache
+
+    decompile_cache_file(cache_name, force=True)
+    assert read_table(cache_name) == CACHE
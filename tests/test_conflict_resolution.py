@@ -0,0 +1,42 @@
+from espaCy import get_corrected_pos_from_cache
+from modules.cache.espaCy_cache import compile_cache_index, get_cache, get_correction_support, update_cache
+
+CONFLICTING_CACHE = {
+    'casa': {
+        'DET NOUN ADJ': {'NOUN': ['la casa vieja'], 'PRON': ['esta casa vieja']},
+        'DETNOUNADJ': {'ADJ': ['de Casa Vieja', 'una casa vieja']},
+        'NOUN ADJ': {'PROPN': ['Casa Roja']},
+    },
+}
+
+
+def test_support_counts_distinct_phrase_contexts():
+    assert get_correction_support(['a', 'b', 'a']) == 2
+    assert get_correction_support([]) == 0
+    assert get_correction_support(True) == 1
+
+
+def test_highest_support_wins_across_patterns():
+    cache_index = compile_cache_index(CONFLICTING_CACHE)
+
+    assert cache_index[('casa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+    assert cache_index[('casa', '', 'NOUN', 'ADJ')] == 'PROPN'
+
+
+def test_ties_keep_the_file_order():
+    cache_index = compile_cache_index({'casa': {'DET NOUN ADJ': {'NOUN': ['a'], 'PRON': ['b']}}})
+
+    assert cache_index[('casa', 'DET', 'NOUN', 'ADJ')] == 'NOUN'
+
+
+def test_both_paths_resolve_the_same_way(cache_name):
+    update_cache(CONFLICTING_CACHE, False, cache_name)
+    # Read back from the table, whose patterns keep their spaces
+    cache = get_cache(cache_name)
+    cache_index = compile_cache_index(cache)
+
+    for spacy_tag_pattern, context in (('DET NOUN ADJ', ('DET', 'NOUN', 'ADJ')), ('DETNOUNADJ', ('DET', 'NOUN', 'ADJ')),
+                                       ('NOUN ADJ', ('', 'NOUN', 'ADJ'))):
+        assert get_corrected_pos_from_cache(cache, spacy_tag_pattern, 'casa') == cache_index[('casa',) + context]
+
+    assert get_corrected_pos_from_cache(cache, 'DET NOUN VERB', 'casa') is None
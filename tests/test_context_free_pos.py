@@ -0,0 +1,58 @@
+import pytest
+
+import espaCy
+from espaCy import espacy, get_context_free_pos
+from modules.cache.espaCy_cache import compile_cache_index, update_cache
+
+CACHE = {
+    'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}, 'NOUN ADJ': {'NOUN': ['casa roja']}},
+    'mesa': {'DET NOUN ADJ': {'NOUN': ['la mesa roja']}, 'DET NOUN': {'NOUN': ['la mesa']}},
+}
+
+
+def test_word_summaries():
+    cache_index = compile_cache_index(CACHE)
+
+    # A pattern of two tags also matches the word as its second tag
+    assert cache_index['casa'] == {'NOUN': frozenset({'ADJ', 'NOUN'}), 'ADJ': frozenset({'NOUN'})}
+    assert cache_index['mesa'] == {'NOUN': frozenset({'NOUN'}), 'DET': frozenset({'NOUN'})}
+
+
+def test_word_not_cached():
+    assert get_context_free_pos('perro', 'NOUN', compile_cache_index(CACHE)) == 'NOUN'
+
+
+def test_word_pos_in_no_pattern():
+    assert get_context_free_pos('casa', 'VERB', compile_cache_index(CACHE)) == 'VERB'
+
+
+def test_every_pattern_corrects_to_word_pos():
+    assert get_context_free_pos('mesa', 'NOUN', compile_cache_index(CACHE)) == 'NOUN'
+
+
+def test_a_single_different_correction_depends_on_the_context():
+    cache_index = compile_cache_index({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}}})
+
+    assert cache_index['casa'] == {'NOUN': frozenset({'ADJ'})}
+    assert get_context_free_pos('casa', 'NOUN', cache_index) is None
+
+
+@pytest.fixture
+def summary_cache_name(nlp_model, cache_name):
+    update_cache(CACHE, False, cache_name)
+    return cache_name
+
+
+def test_context_free_words_are_not_analyzed(summary_cache_name, monkeypatch):
+    def analyze(*args):
+        raise AssertionError('The phrase should not be analyzed')
+    monkeypatch.setattr(espaCy, 'get_corrected_pos', analyze)
+
+    assert espacy('perro', 'NOUN', 'el perro', summary_cache_name) == 'NOUN'
+    assert espacy('casa', 'VERB', 'la casa vieja', summary_cache_name) == 'VERB'
+    assert espacy('mesa', 'NOUN', 'la mesa roja', summary_cache_name) == 'NOUN'
+
+
+def test_context_dependent_words_are_analyzed(summary_cache_name):
+    assert espacy('casa', 'NOUN', 'la casa vieja', summary_cache_name) == 'ADJ'
+    assert espacy('casa', 'NOUN', 'la casa de', summary_cache_name) == 'NOUN'
@@ -0,0 +1,61 @@
+import io
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+from modules.cli.espaCy_corpus import iterate_pool_results, read_corpus
+
+TSV_CORPUS = 'casa\tNOUN\tla casa vieja\ncasa NOUN\n\nmesa\tNOUN\tla mesa\troja\n'
+
+
+def test_malformed_tsv_lines_are_skipped_with_a_warning(capsys):
+    records = list(read_corpus(io.StringIO(TSV_CORPUS), 'tsv', 'rows'))
+
+    assert records == [('casa', 'NOUN', 'la casa vieja'), ('mesa', 'NOUN', 'la mesa\troja')]
+    assert 'line 2' in capsys.readouterr().err
+
+
+def test_malformed_jsonl_lines_are_skipped_with_a_warning(capsys):
+    corpus = '{"word": "casa", "pos": "NOUN", "phrase": "la casa"}\n{"word": "casa"}\n[1]\nnot json\n'
+    records = list(read_corpus(io.StringIO(corpus), 'jsonl', 'rows'))
+
+    assert records == [('casa', 'NOUN', 'la casa')]
+    warnings = capsys.readouterr().err
+    assert 'line 2' in warnings and 'line 3' in warnings and 'line 4' in warnings
+
+
+def test_strict_mode_stops_at_the_first_malformed_line():
+    with pytest.raises(ValueError, match='Line 2'):
+        list(read_corpus(io.StringIO(TSV_CORPUS), 'tsv', 'rows', strict=True))
+
+
+def test_documents():
+    assert list(read_corpus(io.StringIO('La casa.\n\n{"text": "x"}\n'), 'tsv', 'docs')) == ['La casa.', '{"text": "x"}']
+    assert list(read_corpus(io.StringIO('{"text": "La casa."}\n{"words": []}\n'), 'jsonl', 'docs')) == ['La casa.']
+
+
+def iterate_counted(tasks, counter):
+    for task in tasks:
+        counter.append(task)
+        yield task
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_pool_results_read_the_tasks_as_they_are_consumed(ordered):
+    read_tasks = []
+    with ThreadPool(2) as pool:
+        results = iterate_pool_results(pool, abs, iterate_counted(range(-1, -21, -1), read_tasks), ordered, 4)
+
+        yielded = []
+        for result in results:
+            yielded.append(result)
+            assert len(read_tasks) <= len(yielded) + 4
+
+    assert (yielded if ordered else sorted(yielded)) == list(range(1, 21))
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_pool_errors_are_raised(ordered):
+    with ThreadPool(2) as pool:
+        with pytest.raises(TypeError):
+            list(iterate_pool_results(pool, abs, iter([-1, 'x', -3]), ordered, 2))
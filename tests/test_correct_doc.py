@@ -0,0 +1,30 @@
+import pytest
+
+from espaCy import correct_doc
+from modules.cache.espaCy_cache import update_cache
+from modules.utils.spaCy_models import get_nlp
+
+
+@pytest.fixture
+def doc_cache_name(nlp_model, cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}, 'NOUN ADJ': {'PROPN': ['casa roja']}}},
+                 False, cache_name)
+    return cache_name
+
+
+def test_correct_doc_of_a_text(doc_cache_name):
+    assert correct_doc('el perro come la casa vieja', doc_cache_name) == ['DET', 'NOUN', 'VERB', 'DET', 'ADJ', 'ADJ']
+
+
+def test_correct_doc_of_a_parsed_doc(doc_cache_name):
+    doc = get_nlp()('La Casa vieja y la casa de')
+
+    assert correct_doc(doc, doc_cache_name) == ['DET', 'ADJ', 'ADJ', 'CCONJ', 'DET', 'NOUN', 'ADP']
+    assert [token.pos_ for token in doc] == ['DET', 'NOUN', 'ADJ', 'CCONJ', 'DET', 'NOUN', 'ADP']
+
+
+def test_correct_doc_at_the_boundaries(doc_cache_name):
+    # The first and last tokens have no previous or next word, as the two tag patterns
+    assert correct_doc('casa roja', doc_cache_name) == ['PROPN', 'ADJ']
+    assert correct_doc('casa', doc_cache_name) == ['NOUN']
+    assert correct_doc('', doc_cache_name) == []
@@ -0,0 +1,56 @@
+import os
+import stat
+
+from modules.cache.espaCy_cache import (compact_cache, add_patterns, compile_cache_file, get_cache_file_path,
+                                        get_compiled_cache_file_path, read_table, update_cache)
+from modules.utils.vanilla_utils import write_file_atomically
+
+CACHE = {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}
+
+
+def get_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_get_the_default_mode(tmp_path):
+    umask = os.umask(0o022)
+    try:
+        write_file_atomically(str(tmp_path / 'new.txt'), lambda file: file.write('x'))
+    finally:
+        os.umask(umask)
+
+    assert get_mode(str(tmp_path / 'new.txt')) == 0o644
+
+
+def test_replaced_files_keep_their_mode(tmp_path):
+    path = str(tmp_path / 'shared.txt')
+    with open(path, 'w') as file:
+        file.write('x')
+    os.chmod(path, 0o664)
+
+    write_file_atomically(path, lambda file: file.write('y'))
+
+    assert get_mode(path) == 0o664
+
+
+def test_cache_files_stay_readable_by_other_users(cache_name):
+    update_cache(CACHE, False, cache_name)
+    os.chmod(get_cache_file_path(cache_name), 0o644)
+
+    add_patterns({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, cache_name)
+    compact_cache(False, cache_name)
+    compile_cache_file(cache_name)
+
+    assert get_mode(get_cache_file_path(cache_name)) == 0o644
+    assert get_mode(get_compiled_cache_file_path(cache_name)) & 0o044 == 0o044
+
+
+def test_text_is_written_as_utf8(tmp_path, cache_name):
+    path = str(tmp_path / 'text.txt')
+    write_file_atomically(path, lambda file: file.write('caché ñ'))
+
+    with open(path, 'rb') as file:
+        assert file.read() == 'caché ñ'.encode('utf-8')
+
+    update_cache({'año': {'DET NOUN ADJ': {'NOUN': ['el año pasado']}}}, False, cache_name)
+    assert read_table(cache_name) == {'año': {'DET NOUN ADJ': {'NOUN': ['el año pasado']}}}
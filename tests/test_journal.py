@@ -0,0 +1,76 @@
+import os
+
+from modules.cache.espaCy_cache import (add_patterns, compact_cache, compile_cache_file, get_cache, get_cache_file_path,
+                                        get_cache_index, get_cache_journal_file_path, read_compiled_cache,
+                                        read_journal, read_table, update_cache)
+
+CACHE = {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}
+
+
+def test_added_patterns_are_served_before_compaction(cache_name):
+    update_cache(CACHE, False, cache_name)
+    table = read_table(cache_name)
+
+    add_patterns({'casa': {'DET NOUN ADJ': {'ADJ': ['una casa vieja']}}, 'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}},
+                 cache_name)
+
+    assert read_table(cache_name) == table
+    assert get_cache_index(cache_name)[('mesa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+    assert list(get_cache(cache_name)['casa']['DET NOUN ADJ']['ADJ']) == ['de Casa Vieja', 'una casa vieja']
+
+
+def test_repeated_phrases_are_merged_once(cache_name):
+    add_patterns(CACHE, cache_name)
+    add_patterns(CACHE, cache_name)
+
+    assert read_journal(cache_name) == CACHE
+
+
+def test_partial_last_journal_line_is_ignored(cache_name):
+    add_patterns(CACHE, cache_name)
+    with open(get_cache_journal_file_path(cache_name), 'a', encoding='utf-8') as file:
+        file.write('["mesa", "DET NOUN ADJ", "ADJ", ["la me')
+
+    assert read_journal(cache_name) == CACHE
+
+
+def test_compaction_writes_the_journal_to_the_table(cache_name):
+    update_cache(CACHE, False, cache_name)
+    add_patterns({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, cache_name)
+
+    compact_cache(False, cache_name)
+
+    assert read_journal(cache_name) == {}
+    assert os.path.getsize(get_cache_journal_file_path(cache_name)) == 0
+    assert read_table(cache_name) == dict(CACHE, mesa={'DET NOUN ADJ': {'ADJ': ['la mesa roja']}})
+    assert get_cache_index(cache_name)[('mesa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+
+
+def test_compaction_refreshes_the_compiled_cache(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+    add_patterns({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, cache_name)
+
+    compact_cache(False, cache_name)
+
+    cache, cache_index, _ = read_compiled_cache(cache_name)
+    assert 'mesa' in cache
+    assert cache_index[('mesa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+
+
+def test_compaction_of_an_empty_cache(cache_name):
+    add_patterns(CACHE, cache_name)
+
+    compact_cache(False, cache_name)
+
+    assert os.path.exists(get_cache_file_path(cache_name))
+    assert read_table(cache_name) == CACHE
+
+
+def test_update_clears_the_journal(cache_name):
+    add_patterns({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, cache_name)
+
+    update_cache(CACHE, False, cache_name)
+
+    assert read_journal(cache_name) == {}
+    assert 'mesa' not in get_cache(cache_name)
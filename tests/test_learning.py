@@ -0,0 +1,82 @@
+import io
+
+from modules.cache.espaCy_cache import add_patterns, get_cache
+from modules.learning.espaCy_learn import learn_patterns, read_annotated_corpus, select_learned_patterns
+
+CORPUS = [
+    (['la', 'casa', 'vieja'], ['DET', 'ADJ', 'ADJ']),
+    (['una', 'casa', 'vieja'], ['DET', 'ADJ', 'ADJ']),
+    (['la', 'casa', 'vieja'], ['DET', 'NOUN', 'ADJ']),
+    (['el', 'perro', 'come'], ['DET', 'NOUN', 'NOUN']),
+]
+
+
+def test_learns_the_corrections_that_reach_both_thresholds(nlp_model):
+    entries, report = learn_patterns(CORPUS, min_support=2, min_confidence=0.5)
+
+    assert entries == {'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja', 'una casa vieja']}}}
+    assert report == [('casa', 'DET NOUN ADJ', 'ADJ', 2, 2, 0.6667)]
+
+
+def test_support_threshold(nlp_model):
+    entries, _ = learn_patterns(CORPUS, min_support=1, min_confidence=0.5)
+    assert entries['come'] == {'NOUN VERB': {'NOUN': ['perro come']}}
+
+    entries, _ = learn_patterns(CORPUS, min_support=3, min_confidence=0.0)
+    assert entries == {}
+
+
+def test_confidence_threshold(nlp_model):
+    entries, report = learn_patterns(CORPUS, min_support=2, min_confidence=0.7)
+
+    assert entries == {}
+    assert report == []
+
+
+def test_repeated_phrase_contexts_count_once_for_support():
+    pattern_counts = {('casa', 'DET NOUN ADJ'): 2}
+    corrections = {('casa', 'DET NOUN ADJ', 'ADJ'): [2, {'la casa vieja': None}]}
+
+    assert select_learned_patterns(pattern_counts, corrections, 2, 0.5) == ({}, [])
+    assert select_learned_patterns(pattern_counts, corrections, 1, 0.5)[1] == [('casa', 'DET NOUN ADJ', 'ADJ', 2, 1, 1.0)]
+
+
+def test_only_the_support_reaches_the_cache(nlp_model, cache_name):
+    entries, _ = learn_patterns(CORPUS)
+    add_patterns(entries, cache_name)
+
+    assert dict(get_cache(cache_name)['casa']['DET NOUN ADJ']) == {'ADJ': ('la casa vieja', 'una casa vieja')}
+
+
+def test_read_annotated_corpus_skips_multiword_tokens_and_empty_nodes():
+    conllu = ('# text = del perro\n'
+              '1-2\tdel\t_\t_\t_\t_\t_\t_\t_\t_\n'
+              '1\tde\tde\tADP\t_\t_\t3\tcase\t_\t_\n'
+              '2\tel\tel\tDET\t_\t_\t3\tdet\t_\t_\n'
+              '2.1\tx\tx\t_\t_\t_\t_\t_\t_\t_\n'
+              '3\tperro\tperro\t_\t_\t_\t0\troot\t_\t_\n'
+              '\n')
+
+    assert list(read_annotated_corpus(io.StringIO(conllu), 'conllu')) == [(['de', 'el', 'perro'], ['ADP', 'DET', ''])]
+    assert list(read_annotated_corpus(io.StringIO('{"words": ["la"], "pos": ["DET"]}\n\n'), 'jsonl')) == [(['la'], ['DET'])]
+
+
+def test_read_annotated_corpus_skips_malformed_jsonl_lines(capsys):
+    jsonl = ('{"words": ["la", "casa"], "tags": ["DET", "NOUN"]}\n'
+             '{"words": ["la", "casa"\n'
+             '\n'
+             '{"words": ["la", "casa"], "tags": null}\n'
+             '{"words": ["la", "casa"], "pos": ["DET"]}\n'
+             '[1, 2]\n'
+             '{"words": ["una", "casa"], "pos": ["DET", null]}\n')
+
+    assert list(read_annotated_corpus(io.StringIO(jsonl), 'jsonl')) == [(['la', 'casa'], ['DET', 'NOUN']),
+                                                                        (['una', 'casa'], ['DET', ''])]
+    assert [line.split(':')[1] for line in capsys.readouterr().err.splitlines()] == [
+        ' skipping line 2', ' skipping line 4', ' skipping line 5', ' skipping line 6']
+
+
+def test_tokens_without_a_gold_tag_do_not_count(nlp_model):
+    corpus = CORPUS[:2] + [(['la', 'casa', 'vieja'], ['DET', '', 'ADJ'])] * 5
+
+    assert learn_patterns(corpus, min_support=2, min_confidence=0.5)[1] == [('casa', 'DET NOUN ADJ', 'ADJ', 2, 2, 1.0)]
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from modules.utils import spaCy_utils
+from modules.utils.spaCy_utils import (clear_phrase_analysis_cache, configure_phrase_analysis_cache,
+                                       get_phrase_analysis_cache_stats, load_phrase_analysis_cache,
+                                       save_phrase_analysis_cache, string_analysis, words_analysis)
+from modules.utils.vanilla_utils import LRUCache, TTLCache
+
+
+def test_lru_eviction_and_stats():
+    cache = LRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.items() == [('a', 1), ('c', 3)]
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'evictions': 1, 'size': 2, 'memory': 0}
+
+
+def test_lru_memory_bound():
+    cache = LRUCache(max_memory=10, size_of=lambda key, value: len(value))
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.put('c', 'xxxx')
+
+    assert 'a' not in cache
+    assert cache.stats()['memory'] == 8
+
+    cache.put('b', 'x')
+    assert cache.stats()['memory'] == 5
+    assert cache.pop('c') == 'xxxx'
+    assert cache.stats()['memory'] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('modules.utils.vanilla_utils.time.monotonic', lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.put('a', 1)
+
+    assert cache.get('a') == 1
+    now[0] = 110.0
+    assert 'a' not in cache
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def phrase_cache(nlp_model):
+    previous_cache, previous_path = spaCy_utils._phrase_analysis_cache, spaCy_utils._phrase_analysis_cache_path
+    configure_phrase_analysis_cache(max_size=2)
+    yield
+    spaCy_utils._phrase_analysis_cache, spaCy_utils._phrase_analysis_cache_path = previous_cache, previous_path
+
+
+def test_repeated_phrases_are_analyzed_once(phrase_cache):
+    first = string_analysis('la casa vieja', ',', False)
+    second = string_analysis('la casa vieja', ',', False)
+
+    assert first == second == (['la', 'casa', 'vieja'], ['DET', 'NOUN', 'ADJ'])
+    assert get_phrase_analysis_cache_stats()['hits'] == 1
+    assert get_phrase_analysis_cache_stats()['misses'] == 1
+
+
+def test_phrase_cache_is_bounded(phrase_cache):
+    for phrase in ('la casa', 'la mesa', 'el perro'):
+        string_analysis(phrase, ',', False)
+
+    assert get_phrase_analysis_cache_stats()['size'] == 2
+    assert get_phrase_analysis_cache_stats()['evictions'] == 1
+
+
+def test_phrase_cache_save_and_load(phrase_cache, tmp_path):
+    path = str(tmp_path / 'phrases.json')
+    string_analysis('la casa vieja', ',', False)
+    words_analysis(['el', 'perro'])
+    save_phrase_analysis_cache(path)
+    clear_phrase_analysis_cache()
+
+    assert load_phrase_analysis_cache(path) == 2
+
+    string_analysis('la casa vieja', ',', False)
+    words_analysis(['el', 'perro'])
+    assert get_phrase_analysis_cache_stats()['misses'] == 2
+    assert get_phrase_analysis_cache_stats()['hits'] == 2
+
+
+def test_invalid_phrase_cache_files_are_ignored(phrase_cache, tmp_path):
+    path = tmp_path / 'phrases.json'
+    path.write_text('not json', encoding='utf-8')
+    assert load_phrase_analysis_cache(str(path)) == 0
+
+    path.write_text(json.dumps({'version': 1, 'entries': []}), encoding='utf-8')
+    assert load_phrase_analysis_cache(str(path)) == 0
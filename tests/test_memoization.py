@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from espaCy import disable_espacy_memoization, enable_espacy_memoization, espacy, espacy_batch, \
+    get_espacy_memoization_stats
+from modules.cache.espaCy_cache import get_cache_file_path, update_cache
+
+
+@pytest.fixture
+def memoized_cache_name(nlp_model, cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}}}, False, cache_name)
+    enable_espacy_memoization(max_size=100)
+    yield cache_name
+    disable_espacy_memoization()
+
+
+def test_repeated_triples_are_memoized(memoized_cache_name):
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name) == 'ADJ'
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name) == 'ADJ'
+    assert espacy_batch([('casa', 'NOUN', 'la casa vieja')], cache_name=memoized_cache_name) == ['ADJ']
+
+    stats = get_espacy_memoization_stats(memoized_cache_name)
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+
+
+def test_context_free_results_are_not_memoized(memoized_cache_name):
+    assert espacy('perro', 'NOUN', 'el perro', memoized_cache_name) == 'NOUN'
+    assert espacy('casa', 'VERB', 'la casa vieja', memoized_cache_name) == 'VERB'
+    assert espacy_batch([('perro', 'NOUN', 'el perro')], cache_name=memoized_cache_name) == ['NOUN']
+
+    stats = get_espacy_memoization_stats(memoized_cache_name)
+    assert (stats['hits'], stats['misses'], stats['size']) == (0, 0, 0)
+
+
+def test_precomputed_analyses_are_not_memoized(memoized_cache_name):
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name, tokenized_phrase=['la', 'casa', 'vieja'],
+                  analyzed_phrase=['DET', 'NOUN', 'ADJ']) == 'ADJ'
+
+    assert get_espacy_memoization_stats(memoized_cache_name) is None
+
+
+def test_memo_is_dropped_when_the_cache_file_changes(memoized_cache_name):
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name) == 'ADJ'
+
+    # Another process rewrites the correction of the pattern in caché.txt
+    path = get_cache_file_path(memoized_cache_name)
+    with open(path, encoding='utf-8') as file:
+        table = file.read()
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(table.replace('| ADJ           |', '| PROPN |'))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name) == 'PROPN'
+    assert espacy_batch([('casa', 'NOUN', 'la casa vieja')], cache_name=memoized_cache_name) == ['PROPN']
+
+    stats = get_espacy_memoization_stats(memoized_cache_name)
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_memo_is_dropped_when_the_cache_is_updated(memoized_cache_name):
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name) == 'ADJ'
+
+    update_cache({'casa': {'DET NOUN ADJ': {'PROPN': ['la casa vieja', 'una casa vieja']}}}, False,
+                 memoized_cache_name)
+
+    assert espacy('casa', 'NOUN', 'la casa vieja', memoized_cache_name) == 'PROPN'
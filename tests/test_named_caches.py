@@ -0,0 +1,102 @@
+import io
+import json
+import os
+import uuid
+
+import pytest
+
+from modules.cache.espaCy_cache import (add_patterns, compact_cache, compile_cache_file, configure_cache, get_cache,
+                                        get_cache_config, get_cache_file_path, get_cache_index,
+                                        get_compiled_cache_file_path, get_default_cache_file_path, open_file,
+                                        read_compiled_cache, read_compiled_cache_if_current, update_cache)
+
+CACHE = {'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja', 'una casa vieja']}}}
+
+
+@pytest.fixture
+def read_only_cache_name(tmp_path):
+    name = 'test_' + uuid.uuid4().hex[:8]
+    configure_cache(name, str(tmp_path / 'read_only' / 'caché.txt'), read_only=True)
+    return name
+
+
+def test_named_caches_are_independent(tmp_path, cache_name):
+    other_cache_name = 'test_' + uuid.uuid4().hex[:8]
+    configure_cache(other_cache_name, str(tmp_path / 'other' / 'caché.txt'))
+    os.mkdir(str(tmp_path / 'other'))
+
+    update_cache(CACHE, False, cache_name)
+    update_cache({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, False, other_cache_name)
+
+    assert ('casa', 'DET', 'NOUN', 'ADJ') in get_cache_index(cache_name)
+    assert ('casa', 'DET', 'NOUN', 'ADJ') not in get_cache_index(other_cache_name)
+    assert ('mesa', 'DET', 'NOUN', 'ADJ') in get_cache_index(other_cache_name)
+
+
+def test_cache_configuration_from_the_environment(monkeypatch, tmp_path):
+    name = 'test_' + uuid.uuid4().hex[:8]
+    monkeypatch.setenv('ESPACY_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('ESPACY_CACHE_READ_ONLY_' + name.upper(), 'yes')
+
+    assert get_default_cache_file_path(name) == os.path.join(str(tmp_path), 'caché_' + name + '.txt')
+    assert get_cache_config(name) == {'path': os.path.join(str(tmp_path), 'caché_' + name + '.txt'), 'read_only': True}
+
+
+def test_read_only_cache_never_writes(read_only_cache_name):
+    assert isinstance(open_file(read_only_cache_name), io.StringIO)
+    assert dict(get_cache(read_only_cache_name)) == {}
+    assert not os.path.exists(os.path.dirname(get_cache_file_path(read_only_cache_name)))
+
+    with pytest.raises(PermissionError):
+        update_cache(CACHE, False, read_only_cache_name)
+    with pytest.raises(PermissionError):
+        add_patterns(CACHE, read_only_cache_name)
+    with pytest.raises(PermissionError):
+        compact_cache(False, read_only_cache_name)
+    with pytest.raises(PermissionError):
+        compile_cache_file(read_only_cache_name)
+
+
+def test_compiled_cache_round_trip(cache_name):
+    update_cache(CACHE, False, cache_name)
+    table_index = get_cache_index(cache_name)
+
+    compile_cache_file(cache_name)
+    cache, cache_index, _ = read_compiled_cache(cache_name)
+
+    assert cache == CACHE
+    assert cache_index == table_index
+    assert read_compiled_cache_if_current(cache_name) == cache_index
+
+
+def test_compiled_cache_is_plain_json(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+
+    with open(get_compiled_cache_file_path(cache_name), 'r', encoding='utf-8') as file:
+        header, cache = [json.loads(line) for line in file]
+
+    assert header['contexts'] == [['casa', 'DET', 'NOUN', 'ADJ', 'ADJ']]
+    assert header['summaries'] == {'casa': {'NOUN': ['ADJ']}}
+    assert cache == CACHE
+
+
+def test_compiled_cache_is_used_without_the_table(cache_name):
+    update_cache(CACHE, False, cache_name)
+    compile_cache_file(cache_name)
+    os.remove(get_cache_file_path(cache_name))
+
+    read_only_cache_name = 'test_' + uuid.uuid4().hex[:8]
+    configure_cache(read_only_cache_name, get_cache_file_path(cache_name), read_only=True)
+
+    assert get_cache_index(read_only_cache_name)[('casa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
+    assert not os.path.exists(get_cache_file_path(cache_name))
+
+
+def test_invalid_compiled_cache_falls_back_to_the_table(cache_name):
+    update_cache(CACHE, False, cache_name)
+    with open(get_compiled_cache_file_path(cache_name), 'w', encoding='utf-8') as file:
+        file.write('{"format": "espaCy-cache", "version": 1}')
+
+    assert read_compiled_cache_if_current(cache_name) is None
+    assert get_cache_index(cache_name)[('casa', 'DET', 'NOUN', 'ADJ')] == 'ADJ'
@@ -0,0 +1,85 @@
+import numpy
+import pytest
+from spacy.strings import StringStore
+from spacy.symbols import ADJ, DET, NOUN
+
+from modules.cache.espaCy_cache import compile_cache_index, update_cache
+from modules.stats.espaCy_pattern_stats import POS_BITS, build_pattern_report, compute_pattern_statistics, \
+    encode_chunk_contexts, merge_context_counts
+
+WORDS = ['casa', 'mesa']
+
+
+@pytest.fixture
+def strings():
+    strings = StringStore()
+    for pos in ('DET', 'NOUN', 'ADJ'):
+        strings.add(pos)
+    return strings
+
+
+def encode_docs(docs, strings):
+    """
+    Encodes documents given as (word, pos id) pairs, as compute_pattern_statistics does with their docs.
+    """
+    word_hashes = numpy.array([strings.add(word) for word in WORDS], dtype=numpy.uint64)
+    word_order = numpy.argsort(word_hashes)
+    doc_arrays = [numpy.array([[strings.add(word), pos] for word, pos in doc], dtype=numpy.uint64).reshape(-1, 2)
+                  for doc in docs]
+
+    return encode_chunk_contexts(doc_arrays, word_hashes[word_order], word_order)
+
+
+def code(word, previous_pos, pos, next_pos):
+    return WORDS.index(word) << 3 * POS_BITS | previous_pos << 2 * POS_BITS | pos << POS_BITS | next_pos
+
+
+def test_contexts_do_not_cross_document_boundaries(strings):
+    codes = encode_docs([[('la', DET), ('casa', NOUN)], [], [('casa', NOUN), ('vieja', ADJ)], [('mesa', NOUN)]],
+                        strings)
+
+    assert codes.tolist() == [code('casa', DET, NOUN, 0), code('casa', 0, NOUN, ADJ), code('mesa', 0, NOUN, 0)]
+
+
+def test_chunks_without_cached_words(strings):
+    assert encode_docs([[('el', DET), ('perro', NOUN)]], strings).tolist() == []
+    assert encode_docs([], strings).tolist() == []
+
+
+def test_counts_are_merged_across_chunks():
+    codes, counts = merge_context_counts(numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64),
+                                         numpy.array([1, 5]), numpy.array([2, 1]))
+    codes, counts = merge_context_counts(codes, counts, numpy.array([5, 7]), numpy.array([3, 1]))
+
+    assert codes.tolist() == [1, 5, 7]
+    assert counts.tolist() == [2, 4, 1]
+    assert counts.dtype == numpy.int64
+
+
+def test_report(strings):
+    cache_index = compile_cache_index({
+        'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}, 'DET NOUN ADP': {'PROPN': ['la casa de']}},
+        'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}},
+    })
+    codes = numpy.array([code('casa', DET, NOUN, ADJ), code('casa', DET, NOUN, 0), code('mesa', 0, NOUN, 0)])
+    counts = numpy.array([3, 5, 3])
+
+    report = build_pattern_report(codes, counts, WORDS, cache_index, strings)
+
+    assert report['patterns'] == [('casa', 'DET', 'NOUN', '', 5, False), ('casa', 'DET', 'NOUN', 'ADJ', 3, True),
+                                  ('mesa', '', 'NOUN', '', 3, False)]
+    assert report['words'] == {'casa': (8, 3), 'mesa': (3, 0)}
+    assert report['unused_patterns'] == [('casa', 'DET', 'NOUN', 'ADP'), ('mesa', 'DET', 'NOUN', 'ADJ')]
+
+
+def test_statistics_do_not_depend_on_the_chunk_size(nlp_model, cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}, 'DET NOUN ADP': {'PROPN': ['la casa de']}}},
+                 False, cache_name)
+    texts = ['la casa vieja', 'casa', 'la casa vieja y la casa', 'el perro come', 'una casa vieja']
+
+    statistics = compute_pattern_statistics(texts, cache_name, chunk_size=1000)
+
+    assert compute_pattern_statistics(texts, cache_name, chunk_size=2) == statistics
+    assert statistics['patterns'] == [('casa', 'DET', 'NOUN', 'ADJ', 3, True), ('casa', '', 'NOUN', '', 1, False),
+                                      ('casa', 'DET', 'NOUN', '', 1, False)]
+    assert statistics['unused_patterns'] == [('casa', 'DET', 'NOUN', 'ADP')]
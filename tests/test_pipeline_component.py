@@ -0,0 +1,43 @@
+import pytest
+import spacy
+
+import espaCy  # noqa: F401 registers the espacy_corrector factory and the Token._.espacy_pos extension
+from modules.cache.espaCy_cache import configure_cache, update_cache
+
+
+@pytest.fixture
+def corrector_cache_name(cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}}}, False, cache_name)
+    return cache_name
+
+
+def test_component_sets_the_corrected_pos(test_model, corrector_cache_name):
+    nlp = spacy.load(test_model)
+    nlp.add_pipe('espacy_corrector', config={'cache_name': corrector_cache_name})
+
+    doc = nlp('el perro come la casa vieja')
+
+    assert [token._.espacy_pos for token in doc] == ['DET', 'NOUN', 'VERB', 'DET', 'ADJ', 'ADJ']
+    assert [token.pos_ for token in doc] == ['DET', 'NOUN', 'VERB', 'DET', 'NOUN', 'ADJ']
+
+
+def test_component_corrects_streamed_texts(test_model, corrector_cache_name):
+    nlp = spacy.load(test_model)
+    nlp.add_pipe('espacy_corrector', config={'cache_name': corrector_cache_name})
+
+    docs = nlp.pipe(['la casa vieja', 'la casa de', 'casa'], batch_size=2)
+
+    assert [[token._.espacy_pos for token in doc] for doc in docs] == [['DET', 'ADJ', 'ADJ'], ['DET', 'NOUN', 'ADP'],
+                                                                         ['NOUN']]
+
+
+def test_component_uses_its_cache(test_model, corrector_cache_name, tmp_path):
+    configure_cache(corrector_cache_name + '_empty', str(tmp_path / 'empty_caché.txt'))
+
+    nlp = spacy.load(test_model)
+    nlp.add_pipe('espacy_corrector', config={'cache_name': corrector_cache_name})
+    empty_nlp = spacy.load(test_model)
+    empty_nlp.add_pipe('espacy_corrector', config={'cache_name': corrector_cache_name + '_empty'})
+
+    assert [token._.espacy_pos for token in nlp('la casa vieja')] == ['DET', 'ADJ', 'ADJ']
+    assert [token._.espacy_pos for token in empty_nlp('la casa vieja')] == ['DET', 'NOUN', 'ADJ']
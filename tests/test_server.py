@@ -0,0 +1,106 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from modules.service.espaCy_server import EspacyServer
+
+
+@pytest.fixture
+def start_server(cache_name):
+    servers = []
+
+    def start(model_name=None):
+        server = EspacyServer(('127.0.0.1', 0), model_name=model_name, cache_name=cache_name)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def server(start_server):
+    server = start_server()
+    server.ready.set()
+    return server
+
+
+def get(server, path):
+    try:
+        with urllib.request.urlopen('http://127.0.0.1:' + str(server.server_address[1]) + path) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def post(server, path, content):
+    request = urllib.request.Request('http://127.0.0.1:' + str(server.server_address[1]) + path,
+                                     data=json.dumps(content).encode('utf-8'), method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_invalid_request_is_a_400(server):
+    status, content = post(server, '/correct', {'word': 'casa'})
+
+    assert status == 400
+    assert content['error'].startswith('Invalid request')
+
+
+def test_unexpected_error_is_a_json_500(server, capsys):
+    def fail(word, word_pos, phrase):
+        raise RuntimeError('model crashed')
+    server.correct = fail
+
+    status, content = post(server, '/correct', {'word': 'casa', 'pos': 'NOUN', 'phrase': 'la casa vieja'})
+
+    assert status == 500
+    assert content == {'error': 'Internal server error: RuntimeError'}
+    assert 'model crashed' in capsys.readouterr().err
+
+
+def test_correction_errors_are_not_invalid_requests(server, capsys):
+    def fail(items):
+        raise KeyError('corrupted cache')
+    server.correct_batch = fail
+
+    status, content = post(server, '/correct_batch', {'items': [['casa', 'NOUN', 'la casa vieja']]})
+
+    assert status == 500
+    assert content == {'error': 'Internal server error: KeyError'}
+    assert 'corrupted cache' in capsys.readouterr().err
+
+
+def test_readiness_flips_after_the_warm_up(start_server, nlp_model):
+    server = start_server(nlp_model)
+
+    assert get(server, '/health') == (200, {'status': 'ok'})
+    assert get(server, '/ready') == (503, {'status': 'warming up'})
+    assert post(server, '/correct', {'word': 'casa', 'pos': 'NOUN', 'phrase': 'la casa'})[0] == 503
+
+    server.warm_up_in_background().join()
+
+    assert get(server, '/ready') == (200, {'status': 'ready'})
+    assert post(server, '/correct', {'word': 'casa', 'pos': 'NOUN', 'phrase': 'la casa'}) == (200, {'corrected_pos': 'NOUN'})
+    assert post(server, '/correct_batch', {'items': [['casa', 'NOUN', 'la casa']]}) == (200, {'corrected_pos': ['NOUN']})
+
+
+def test_failed_warm_up_is_reported(start_server, nlp_model, tmp_path):
+    server = start_server(str(tmp_path / 'missing_model'))
+
+    with pytest.raises(OSError):
+        server.warm_up()
+
+    status, content = get(server, '/ready')
+    assert status == 503
+    assert content['status'] == 'failed'
@@ -0,0 +1,90 @@
+import threading
+import uuid
+
+import pytest
+
+from modules.cache.espaCy_cache import add_patterns, get_cache_index, update_cache
+from modules.cache.espaCy_shared_cache import (SharedCacheIndex, attach_shared_cache, build_shared_cache_segment,
+                                               decode_shared_cache_value, encode_shared_cache_value,
+                                               publish_shared_cache, unlink_shared_cache)
+
+
+@pytest.fixture
+def segment_name():
+    name = 'espacy_test_' + uuid.uuid4().hex[:8]
+    yield name
+    unlink_shared_cache(name)
+
+
+def test_shared_index_answers_like_the_dict_index(cache_name, segment_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}, False, cache_name)
+    publish_shared_cache(segment_name, cache_name)
+
+    index = SharedCacheIndex(segment_name)
+
+    for key, value in get_cache_index(cache_name).items():
+        assert index[key] == value
+    assert 'mesa' not in index
+    assert index.get(('casa', 'DET', 'NOUN', 'VERB')) is None
+
+
+def test_build_segment_handles_empty_index():
+    assert build_shared_cache_segment({})[:8] == b'ESPACYSD'
+
+
+def test_attached_process_republishes_the_current_files(cache_name, segment_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}, False, cache_name)
+    assert publish_shared_cache(segment_name, cache_name) == 1
+
+    index = attach_shared_cache(segment_name, cache_name)
+    assert get_cache_index(cache_name) is index
+    assert 'mesa' not in index
+
+    add_patterns({'mesa': {'DET NOUN ADJ': {'ADJ': ['la mesa roja']}}}, cache_name)
+    assert publish_shared_cache(segment_name, cache_name) == 2
+
+    # get_cache_index refreshes the attached index to the new generation
+    assert get_cache_index(cache_name).generation == 2
+    assert index.get(('mesa', 'DET', 'NOUN', 'ADJ')) == 'ADJ'
+
+
+def test_values_are_stored_as_plain_strings():
+    word_summary = {'NOUN': frozenset({'ADJ', 'PROPN'}), 'ADJ': frozenset()}
+
+    assert encode_shared_cache_value('ADJ') == b'ADJ'
+    assert decode_shared_cache_value(('casa', 'DET', 'NOUN', 'ADJ'), b'ADJ') == 'ADJ'
+    assert decode_shared_cache_value('casa', encode_shared_cache_value(word_summary)) == word_summary
+    assert decode_shared_cache_value('casa', encode_shared_cache_value({})) == {}
+
+
+def test_lookups_during_refreshes(cache_name, segment_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['de Casa Vieja']}}}, False, cache_name)
+    publish_shared_cache(segment_name, cache_name)
+    index = SharedCacheIndex(segment_name)
+
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            try:
+                index.refresh()
+                assert index.get(('casa', 'DET', 'NOUN', 'ADJ')) == 'ADJ'
+                assert index['casa'] == {'NOUN': frozenset({'ADJ'})}
+            except Exception as exception:
+                errors.append(exception)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+
+    for _ in range(100):
+        publish_shared_cache(segment_name, cache_name)
+        index.refresh()
+
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert index.generation == 101
@@ -0,0 +1,45 @@
+import pytest
+
+from espaCy import espacy, espacy_batch
+from modules.cache.espaCy_cache import update_cache
+from modules.utils.vanilla_utils import get_phrase_window
+
+LONG_PHRASE = 'el perro come y ' * 20 + 'la casa vieja' + ' y el perro come' * 20
+
+
+@pytest.fixture
+def casa_cache_name(nlp_model, cache_name):
+    update_cache({'casa': {'DET NOUN ADJ': {'ADJ': ['la casa vieja']}}}, False, cache_name)
+    return cache_name
+
+
+def test_phrase_window():
+    assert get_phrase_window('el perro come y la casa vieja y el perro', 'casa', 1) == 'la casa vieja'
+    assert get_phrase_window('el perro come y la casa vieja y el perro', 'casa', 8, 'chars') == 'y la casa vieja y'
+
+
+def test_window_gives_the_result_of_the_whole_phrase(casa_cache_name):
+    assert espacy('casa', 'NOUN', LONG_PHRASE, casa_cache_name) == 'ADJ'
+    assert espacy('casa', 'NOUN', LONG_PHRASE, casa_cache_name, window=2) == 'ADJ'
+    assert espacy_batch([('casa', 'NOUN', LONG_PHRASE)], cache_name=casa_cache_name, window=12,
+                        window_unit='chars') == ['ADJ']
+
+
+def test_precomputed_analysis(casa_cache_name):
+    assert espacy('casa', 'NOUN', 'la casa vieja', casa_cache_name, tokenized_phrase=['la', 'casa', 'vieja'],
+                  analyzed_phrase=['DET', 'NOUN', 'ADJ']) == 'ADJ'
+    assert espacy('casa', 'NOUN', 'la casa vieja', casa_cache_name, tokenized_phrase=['la', 'casa', 'vieja']) == 'ADJ'
+
+
+def test_window_can_not_be_combined_with_a_precomputed_analysis(casa_cache_name):
+    with pytest.raises(ValueError):
+        espacy('casa', 'NOUN', 'la casa vieja', casa_cache_name, window=1, tokenized_phrase=['la', 'casa', 'vieja'])
+    with pytest.raises(ValueError):
+        espacy('casa', 'NOUN', 'la casa vieja', casa_cache_name, window=1, analyzed_phrase=['DET', 'NOUN', 'ADJ'])
+    with pytest.raises(ValueError):
+        espacy_batch([('casa', 'NOUN', ['la', 'casa', 'vieja'])], cache_name=casa_cache_name, window=1)
+
+
+def test_analysis_can_not_be_given_without_its_tokens(casa_cache_name):
+    with pytest.raises(ValueError):
+        espacy('casa', 'NOUN', 'la casa vieja', casa_cache_name, analyzed_phrase=['DET', 'NOUN', 'ADJ'])